@@ -0,0 +1,166 @@
+# alerts.py
+
+import json
+import time
+from bisect import bisect_right
+from pathlib import Path
+from typing import List, Optional, Tuple
+import ahocorasick
+from models import AlertRule, Question
+from .notification_handler import NotificationType, Notifier
+from .tracedecorator import log_usage
+from . import metrics
+
+_NO_THRESHOLD = float("-inf")
+
+
+def _normalize_text(text: str) -> str:
+    # Keywords and question text alike: lowercase, any whitespace run becomes one space.
+    return " ".join(text.lower().split())
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+class _CompiledRules:
+    """
+    One rule set compiled into shared indexes: an Aho-Corasick automaton
+    over every keyword and inverted indexes from tag to rules. A question
+    only costs one pass over its text and tags, plus a check of the rules
+    those passes turned up. Never modified once built; reloads build a new one.
+    """
+    def __init__(self, rules: List[AlertRule]):
+        self.rules = rules
+        self.needs_keyword = [bool(rule.keywords) for rule in rules]
+        self.tags_all_count = [len({tag.lower() for tag in rule.tags_all}) for rule in rules]
+        self.needs_any_tag = [bool(rule.tags_any) for rule in rules]
+        self.min_votes = [_NO_THRESHOLD if r.min_votes is None else r.min_votes for r in rules]
+        self.min_views = [_NO_THRESHOLD if r.min_views is None else r.min_views for r in rules]
+        self.automaton = self._build_automaton(rules)
+        self.tags_all_index = self._build_tag_index(rules, "tags_all")
+        self.tags_any_index = self._build_tag_index(rules, "tags_any")
+        # Rules with only thresholds (or nothing at all), by ascending min_votes.
+        unindexed = sorted((self.min_votes[i], i) for i, rule in enumerate(rules)
+                           if not (rule.keywords or rule.tags_all or rule.tags_any))
+        self.unindexed_votes = [votes for votes, _ in unindexed]
+        self.unindexed_rules = [i for _, i in unindexed]
+
+    @staticmethod
+    def _build_automaton(rules):
+        by_keyword = {}
+        for i, rule in enumerate(rules):
+            for keyword in filter(None, map(_normalize_text, rule.keywords)):
+                by_keyword.setdefault(keyword, []).append(i)
+        if not by_keyword:
+            return None
+        automaton = ahocorasick.Automaton()
+        for keyword, rule_ids in by_keyword.items():
+            automaton.add_word(keyword, (len(keyword), tuple(rule_ids)))
+        automaton.make_automaton()
+        return automaton
+
+    @staticmethod
+    def _build_tag_index(rules, field):
+        index = {}
+        for i, rule in enumerate(rules):
+            for tag in {tag.lower() for tag in getattr(rule, field)}:
+                index.setdefault(tag, []).append(i)
+        return index
+
+    def _keyword_hits(self, text: str) -> set:
+        hits = set()
+        if self.automaton is None:
+            return hits
+        last = len(text) - 1
+        for end, (length, rule_ids) in self.automaton.iter(text):
+            start = end - length + 1
+            # Whole words only: "pandas" must not fire inside "geopandas".
+            if (start == 0 or not _is_word_char(text[start - 1])) and \
+                    (end == last or not _is_word_char(text[end + 1])):
+                hits.update(rule_ids)
+        return hits
+
+    def match(self, question) -> List[int]:
+        # The newline keeps a phrase from matching across the title/excerpt boundary.
+        keyword_hits = self._keyword_hits(
+            f"{_normalize_text(question.title)}\n{_normalize_text(question.excerpt)}")
+        all_counts, any_hits = {}, set()
+        for tag in {tag.lower() for tag in question.tags}:
+            for i in self.tags_all_index.get(tag, ()):
+                all_counts[i] = all_counts.get(i, 0) + 1
+            any_hits.update(self.tags_any_index.get(tag, ()))
+        candidates = keyword_hits | all_counts.keys() | any_hits
+        candidates.update(self.unindexed_rules[:bisect_right(self.unindexed_votes, question.votes)])
+        return sorted(
+            i for i in candidates
+            if (not self.needs_keyword[i] or i in keyword_hits)
+            and all_counts.get(i, 0) == self.tags_all_count[i]
+            and (not self.needs_any_tag[i] or i in any_hits)
+            and question.votes >= self.min_votes[i]
+            and question.views >= self.min_views[i]
+        )
+
+
+class AlertRuleEngine:
+    """
+    Matches batches of new questions against alert rules. Rules come from
+    a JSON list of AlertRule objects at `rules_path`, which is re-read
+    when it changes (checked at most every `reload_interval` seconds). A
+    reload compiles the new rules aside and swaps them in whole, so a batch
+    is always evaluated against one consistent rule set; an invalid file
+    keeps the previous rules.
+    """
+    @log_usage()
+    def __init__(self, rules_path: Optional[Path] = None, notifier: Notifier = None,
+                 reload_interval: float = 5.0):
+        self.rules_path = Path(rules_path) if rules_path else None
+        self.notifier = notifier or Notifier()
+        self.reload_interval = reload_interval
+        self._compiled = _CompiledRules([])
+        self._mtime = None
+        self._checked_at = float("-inf")
+
+    @property
+    def rules(self) -> List[AlertRule]:
+        return self._compiled.rules
+
+    @log_usage()
+    def load_rules(self, rules: List[AlertRule]) -> None:
+        self._compiled = _CompiledRules(list(rules))
+
+    def reload_due(self) -> bool:
+        return self.rules_path is not None and \
+            time.monotonic() - self._checked_at >= self.reload_interval
+
+    @log_usage()
+    def reload_if_changed(self) -> bool:
+        """Reload the rules file if it changed since the last load; returns whether it did."""
+        self._checked_at = time.monotonic()
+        try:
+            mtime = self.rules_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self._mtime:
+            return False
+        self._mtime = mtime
+        try:
+            rules = [AlertRule(**rule) for rule in json.loads(self.rules_path.read_text())] \
+                if mtime is not None else []
+        except (OSError, ValueError, TypeError) as e:
+            self.notifier.notify(NotificationType.ALERT_RULES_INVALID,
+                                 path=str(self.rules_path), e=str(e))
+            return False
+        self.load_rules(rules)
+        self.notifier.notify(NotificationType.ALERT_RULES_LOADED,
+                             path=str(self.rules_path), count=len(rules))
+        return True
+
+    @log_usage()
+    def evaluate(self, questions: List[Question]) -> List[Tuple[AlertRule, Question]]:
+        compiled = self._compiled
+        with metrics.ALERT_EVAL_SECONDS.time():
+            matches = [(compiled.rules[i], question)
+                       for question in questions for i in compiled.match(question)]
+        metrics.ALERT_MATCHES.inc(len(matches))
+        return matches
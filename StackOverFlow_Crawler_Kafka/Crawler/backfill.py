@@ -0,0 +1,188 @@
+# backfill.py
+
+import asyncio
+import threading
+import time
+from typing import List, Optional
+from models import BackfillPartition
+from .coordination import PostgresLeaseManager
+from .interfaces import FetcherInterface
+from .notification_handler import NotificationType, Notifier
+from .state_store import SQLiteBackfillCheckpoints
+from .stream import QuestionStreamIterator, aclosing
+from .tracedecorator import log_usage
+
+
+class RateLimiter:
+    """
+    Shared request budget of `rate` requests per second with bursts of up to
+    `burst`. Each caller reserves the next free slot, so waiters are served
+    in arrival order from any number of tasks or threads.
+    """
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Claim a slot and return how long to wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next_slot, now - (self.burst - 1) / self.rate)
+            self._next_slot = slot + 1 / self.rate
+            return max(0.0, slot - now)
+
+    async def acquire(self) -> None:
+        await asyncio.sleep(self.reserve())
+
+
+class RateLimitedFetcher(FetcherInterface):
+    """Fetcher wrapper that spends one RateLimiter slot per page request."""
+    def __init__(self, fetcher: FetcherInterface, limiter: RateLimiter):
+        self.fetcher = fetcher
+        self.limiter = limiter
+
+    def fetch(self, page: int) -> Optional[str]:
+        time.sleep(self.limiter.reserve())
+        return self.fetcher.fetch(page)
+
+    async def fetch_async(self, page: int) -> Optional[str]:
+        await self.limiter.acquire()
+        return await self.fetcher.fetch_async(page)
+
+    async def close(self) -> None:
+        await self.fetcher.close()
+
+
+class _PartitionIncomplete(Exception):
+    pass
+
+
+class BackfillRunner:
+    """
+    Crawls listing pages [first_page, last_page] in partitions of
+    `partition_size` pages. `workers` tasks take partitions from a queue and
+    walk them with a QuestionStreamIterator; all of them share one fetcher,
+    so one RateLimiter bounds the whole job. Every page is handed to
+    `db_writer` (e.g. the WriteBehindBuffer) before the partition's
+    checkpoint moves past it, so an interrupted job resumes at the first
+    unwritten page of each partition.
+
+    An empty page ends a partition only when it is the partition's last page
+    or the start of `end_after_empty` empty pages in a row (the end of the
+    listing). An empty page followed by questions was most likely a
+    throttled response, so the partition stops there and is resumed later.
+
+    Listing pages shift while new questions arrive, so neighbouring pages
+    can repeat questions; the database upsert makes that harmless.
+
+    With `leases`, replicas running the same job split it: a worker skips
+    partitions another replica has finished, and puts those another replica
+    is crawling aside. They are retried every lease TTL, so if that replica
+    dies its partitions are taken over once its leases expire.
+    """
+    @log_usage()
+    def __init__(self, job: str, fetcher: FetcherInterface, parser, db_writer,
+                 checkpoints: SQLiteBackfillCheckpoints, notifier: Notifier = None,
+                 first_page: int = 1, last_page: int = 100,
+                 partition_size: int = 20, workers: int = 4, prefetch: int = 2,
+                 leases: PostgresLeaseManager = None, end_after_empty: int = 3):
+        self.job = job
+        self.fetcher = fetcher
+        self.parser = parser
+        self.db_writer = db_writer
+        self.checkpoints = checkpoints
+        self.notifier = notifier or Notifier()
+        self.first_page = first_page
+        self.last_page = last_page
+        self.partition_size = partition_size
+        self.workers = workers
+        self.prefetch = prefetch
+        self.leases = leases
+        self.end_after_empty = end_after_empty
+
+    @log_usage()
+    async def run(self) -> List[BackfillPartition]:
+        partitions = self._load_or_plan()
+        pending = [partition for partition in partitions if not partition.done]
+        self.notifier.notify(NotificationType.BACKFILL_STARTED, job=self.job,
+                             pending=len(pending), total=len(partitions))
+        while pending:
+            queue, leased_elsewhere = asyncio.Queue(), []
+            for partition in pending:
+                queue.put_nowait(partition)
+            await asyncio.gather(*(self._worker(queue, leased_elsewhere)
+                                   for _ in range(min(self.workers, queue.qsize()))))
+            pending = leased_elsewhere
+            if pending:
+                # Until the other replica completes them or its leases run out.
+                await asyncio.sleep(self.leases.ttl)
+        return partitions
+
+    def _load_or_plan(self) -> List[BackfillPartition]:
+        partitions = self.checkpoints.load(self.job)
+        if not partitions:
+            partitions = [
+                BackfillPartition(first_page=start, next_page=start,
+                                  last_page=min(start + self.partition_size - 1, self.last_page))
+                for start in range(self.first_page, self.last_page + 1, self.partition_size)
+            ]
+            self.checkpoints.save(self.job, partitions)
+        return partitions
+
+    async def _worker(self, queue: asyncio.Queue, leased_elsewhere: List[BackfillPartition]):
+        while not queue.empty():
+            partition = queue.get_nowait()
+            unit = f"backfill:{self.job}:{partition.first_page}"
+            if self.leases and not await self.leases.try_acquire(unit):
+                if await self.leases.is_completed(unit):
+                    partition.done = True
+                    self.checkpoints.save(self.job, [partition])
+                else:
+                    leased_elsewhere.append(partition)  # Another replica is crawling it
+                continue
+            try:
+                await self._crawl(partition)
+            except Exception as e:
+                # Progress so far is checkpointed; the next run resumes this partition.
+                self.notifier.notify(NotificationType.BACKFILL_PARTITION_FAILED,
+                                     first_page=partition.first_page,
+                                     next_page=partition.next_page, e=str(e))
+            finally:
+                if self.leases and partition.done:
+                    await self.leases.complete(unit)
+                elif self.leases:
+                    await self.leases.release([unit])
+
+    async def _crawl(self, partition: BackfillPartition):
+        stream = QuestionStreamIterator(self.fetcher, self.parser, notifier=self.notifier,
+                                        first_page=partition.next_page,
+                                        last_page=partition.last_page, prefetch=self.prefetch)
+        empty_pages = 0
+        async with aclosing(stream.pages_async()) as pages:
+            async for page, questions in pages:
+                if not questions:
+                    # The checkpoint stays before an empty page until it is known
+                    # to be past the end of the listing, not a throttled page.
+                    empty_pages += 1
+                    if empty_pages >= self.end_after_empty or page >= partition.last_page:
+                        partition.next_page = page + 1
+                        partition.done = True
+                        self.checkpoints.save(self.job, [partition])
+                        break
+                    continue
+                if empty_pages:
+                    raise _PartitionIncomplete(f"page {partition.next_page} had no questions")
+                await self.db_writer.insert_questions(questions)
+                partition.next_page = page + 1
+                partition.questions += len(questions)
+                self.checkpoints.save(self.job, [partition])
+        if partition.next_page > partition.last_page:
+            partition.done = True
+            self.checkpoints.save(self.job, [partition])
+        if not partition.done:
+            raise _PartitionIncomplete(f"page {partition.next_page} could not be fetched")
+        self.notifier.notify(NotificationType.BACKFILL_PARTITION_DONE,
+                             first_page=partition.first_page, last_page=partition.last_page,
+                             questions=partition.questions)
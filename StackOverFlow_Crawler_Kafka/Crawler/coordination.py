@@ -0,0 +1,208 @@
+# coordination.py
+
+import asyncio
+import os
+import socket
+import time
+from typing import Awaitable, Callable, Dict, List
+from .notification_handler import NotificationType, Notifier
+from .tracedecorator import log_usage
+
+LEASE_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS crawler_leases (
+        unit TEXT PRIMARY KEY,
+        owner TEXT NOT NULL,
+        token BIGINT NOT NULL DEFAULT 1,
+        expires_at TIMESTAMPTZ NOT NULL
+    );
+'''
+
+# Taking over a lease from another owner bumps its fencing token.
+_ACQUIRE = '''
+    INSERT INTO crawler_leases (unit, owner, expires_at)
+    VALUES ($1, $2, now() + make_interval(secs => $3))
+    ON CONFLICT (unit) DO UPDATE SET
+        owner = EXCLUDED.owner,
+        expires_at = EXCLUDED.expires_at,
+        token = crawler_leases.token + (crawler_leases.owner <> EXCLUDED.owner)::int
+    WHERE crawler_leases.owner = EXCLUDED.owner OR crawler_leases.expires_at < now()
+    RETURNING token
+'''
+
+_RENEW = '''
+    UPDATE crawler_leases SET expires_at = now() + make_interval(secs => $3)
+    WHERE owner = $1 AND unit = ANY($2::text[])
+    RETURNING unit
+'''
+
+# Released leases keep their owner, so the next owner's takeover bumps the token.
+_RELEASE = '''
+    UPDATE crawler_leases SET expires_at = now() - interval '1 second'
+    WHERE owner = $1 AND unit = ANY($2::text[])
+'''
+
+_COMPLETE = '''
+    UPDATE crawler_leases SET expires_at = 'infinity' WHERE owner = $1 AND unit = $2
+'''
+
+_COMPLETED = '''
+    SELECT expires_at = 'infinity' FROM crawler_leases WHERE unit = $1
+'''
+
+_LIVE_REPLICAS = '''
+    SELECT count(*) FROM crawler_leases WHERE unit LIKE 'replica:%' AND expires_at > now()
+'''
+
+
+def default_replica_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class PostgresLeaseManager:
+    """
+    Time-limited leases on units of work (a tag, a backfill partition) in
+    the `crawler_leases` table of the database all replicas share. A lease
+    is held until `ttl` seconds after its last renewal; a replica that dies
+    stops renewing and any other replica takes the unit over once it expires.
+
+    Every replica also holds a `replica:<id>` lease, so live replicas can be
+    counted and units spread evenly: `claim` gives up leases beyond this
+    replica's fair share and picks up free ones below it.
+
+    `holds` also checks the expiry locally, so a replica cut off from the
+    database stops working a unit when its lease runs out even though it
+    cannot learn that someone else took it.
+    """
+    @log_usage()
+    def __init__(self, db_adapter, replica_id: str = None, ttl: float = 30.0,
+                 notifier: Notifier = None):
+        self.db_adapter = db_adapter
+        self.replica_id = replica_id or default_replica_id()
+        self.ttl = ttl
+        self.notifier = notifier or Notifier()
+        self.tokens: Dict[str, int] = {}
+        self._expires: Dict[str, float] = {}
+        self._task = None
+
+    @property
+    def _replica_unit(self) -> str:
+        return f"replica:{self.replica_id}"
+
+    @log_usage()
+    async def init(self) -> None:
+        async with self.db_adapter.pool.acquire() as conn:
+            await conn.execute(LEASE_SCHEMA)
+        await self.try_acquire(self._replica_unit)
+
+    def holds(self, unit: str) -> bool:
+        return unit in self.tokens and self._expires[unit] > time.monotonic()
+
+    @log_usage()
+    async def try_acquire(self, unit: str) -> bool:
+        deadline = time.monotonic() + self.ttl
+        async with self.db_adapter.pool.acquire() as conn:
+            token = await conn.fetchval(_ACQUIRE, unit, self.replica_id, self.ttl)
+        if token is None:
+            return False
+        if unit not in self.tokens and not unit.startswith("replica:"):
+            self.notifier.notify(NotificationType.LEASE_ACQUIRED, unit=unit, token=token)
+        self.tokens[unit], self._expires[unit] = token, deadline
+        return True
+
+    @log_usage()
+    async def renew(self) -> List[str]:
+        """Extend every held lease; returns the units that were lost."""
+        units = list(self.tokens)
+        if not units:
+            return []
+        deadline = time.monotonic() + self.ttl
+        async with self.db_adapter.pool.acquire() as conn:
+            renewed = {r["unit"] for r in await conn.fetch(_RENEW, self.replica_id, units, self.ttl)}
+        lost = [unit for unit in units if unit not in renewed]
+        for unit in renewed:
+            self._expires[unit] = deadline
+        for unit in lost:
+            self._forget(unit)
+            if not unit.startswith("replica:"):
+                self.notifier.notify(NotificationType.LEASE_LOST, unit=unit)
+        return lost
+
+    @log_usage()
+    async def release(self, units: List[str]) -> None:
+        units = [unit for unit in units if unit in self.tokens]
+        if not units:
+            return
+        async with self.db_adapter.pool.acquire() as conn:
+            await conn.execute(_RELEASE, self.replica_id, units)
+        for unit in units:
+            self._forget(unit)
+            if not unit.startswith("replica:"):
+                self.notifier.notify(NotificationType.LEASE_RELEASED, unit=unit)
+
+    @log_usage()
+    async def complete(self, unit: str) -> None:
+        """Keep a finished unit leased for good, so no other replica redoes it."""
+        if unit not in self.tokens:
+            return
+        async with self.db_adapter.pool.acquire() as conn:
+            await conn.execute(_COMPLETE, self.replica_id, unit)
+        self._forget(unit)
+
+    @log_usage()
+    async def is_completed(self, unit: str) -> bool:
+        """Whether some replica finished `unit` (see complete)."""
+        async with self.db_adapter.pool.acquire() as conn:
+            return bool(await conn.fetchval(_COMPLETED, unit))
+
+    def _forget(self, unit: str):
+        self.tokens.pop(unit, None)
+        self._expires.pop(unit, None)
+
+    @log_usage()
+    async def claim(self, units: List[str],
+                    on_acquired: Callable[[str], Awaitable[None]] = None,
+                    on_releasing: Callable[[str], Awaitable[None]] = None) -> None:
+        """One balancing round over `units`: renew, shed the excess, take free units."""
+        if not self.holds(self._replica_unit):
+            await self.try_acquire(self._replica_unit)
+        await self.renew()
+        async with self.db_adapter.pool.acquire() as conn:
+            live = await conn.fetchval(_LIVE_REPLICAS)
+        share = -(-len(units) // max(1, live))
+        held = [unit for unit in units if unit in self.tokens]
+        for unit in held[share:]:
+            if on_releasing:
+                await on_releasing(unit)
+            await self.release([unit])
+        held = held[:share]
+        for unit in units:
+            if len(held) >= share:
+                break
+            if unit not in self.tokens and await self.try_acquire(unit):
+                held.append(unit)
+                if on_acquired:
+                    await on_acquired(unit)
+
+    def start(self, units: List[str] = (), **callbacks) -> None:
+        """Heartbeat in the background: renew every ttl/3 and rebalance `units`."""
+        self._task = asyncio.create_task(self._heartbeat(list(units), callbacks),
+                                         name="lease-heartbeat")
+
+    async def _heartbeat(self, units, callbacks):
+        while True:
+            await asyncio.sleep(self.ttl / 3)
+            try:
+                if units:
+                    await self.claim(units, **callbacks)
+                else:
+                    await self.renew()
+            except Exception as e:
+                # Leases simply run out if the database stays unreachable.
+                self.notifier.notify(NotificationType.COORDINATION_ERROR, e=str(e))
+
+    @log_usage()
+    async def close(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        await self.release(list(self.tokens))
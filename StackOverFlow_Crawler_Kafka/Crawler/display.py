@@ -8,16 +8,21 @@ from typing import List
 class QuestionDisplay(DisplayInterface):
     @staticmethod
     def display(questions: List[Question]) -> None:
-        # Display questions as defined; no changes to the presentation format.
-        for idx, question in enumerate(questions, 1):
-            print(f"{idx}. [{question.id}] {question.title}")
-            print(f"   📅 {question.timestamp}")
-            print(f"   🔗 {question.link}")
-            print(f"   📝 {question.excerpt}")
-            print(f"   🏷️ {', '.join(question.tags)}")
-            print(
-                f"   👍 Votes: {question.votes} |"
-                f" 📄 Answers: {question.answers} |"
-                f" 👀 Views: {question.views}")
+        # One write for the whole batch instead of seven prints per question.
+        if questions:
+            print(QuestionDisplay.format(questions), end="", flush=True)
 
-            print("-" * 80)
+    @staticmethod
+    def format(questions: List[Question]) -> str:
+        # Display questions as defined; no changes to the presentation format.
+        return "".join(
+            f"{idx}. [{question.id}] {question.title}\n"
+            f"   📅 {question.timestamp}\n"
+            f"   🔗 {question.link}\n"
+            f"   📝 {question.excerpt}\n"
+            f"   🏷️ {', '.join(question.tags)}\n"
+            f"   👍 Votes: {question.votes} |"
+            f" 📄 Answers: {question.answers} |"
+            f" 👀 Views: {question.views}\n"
+            f"{'-' * 80}\n"
+            for idx, question in enumerate(questions, 1))
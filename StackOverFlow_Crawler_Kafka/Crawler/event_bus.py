@@ -0,0 +1,108 @@
+# event_bus.py
+
+import logging
+import threading
+import time
+from collections import Counter, deque, namedtuple
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+# `count` is how many published events this one stands for (coalesced or rate limited).
+Event = namedtuple("Event", ["type", "at", "fields", "count"])
+
+
+class RatePolicy(NamedTuple):
+    """Deliver at most `per_second` events of a type (bursts of `burst`); the rest are counted."""
+    per_second: float
+    burst: int = 1
+
+
+class EventBus:
+    """
+    Structured event bus. `publish` only appends to an in-memory queue; a
+    daemon thread drains it every `dispatch_interval` seconds and hands the
+    events to subscribers, so console output, logging and metrics never run
+    on the publisher's hot path.
+
+    Before delivery, identical events (same type and fields) in one drain
+    are coalesced into one, and types with a RatePolicy are rate limited.
+    Events held back by the limit are added to the `count` of the next
+    event of that type that gets through. If subscribers fall more than
+    `max_queue` events behind, the oldest events are dropped.
+    """
+    def __init__(self, dispatch_interval: float = 0.05, max_queue: int = 100000,
+                 policies: Optional[Dict[object, RatePolicy]] = None):
+        self.dispatch_interval = dispatch_interval
+        self.policies = dict(policies or {})
+        self._queue = deque(maxlen=max_queue)
+        self._subscribers = []
+        self._tokens = {}
+        self._suppressed = Counter()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="event-bus", daemon=True)
+        self._thread.start()
+
+    def publish(self, event_type, fields: dict) -> None:
+        self._queue.append((event_type, time.time(), fields))
+
+    def subscribe(self, callback: Callable[[Event], None], types: Iterable = None) -> None:
+        """Call `callback(event)` for every delivered event, or only for `types`."""
+        self._subscribers.append((callback, frozenset(types) if types is not None else None))
+
+    def _run(self):
+        while not self._stopped.wait(self.dispatch_interval):
+            self.flush()
+
+    def flush(self) -> None:
+        """Deliver everything published so far."""
+        with self._lock:
+            batch = []
+            while self._queue:
+                batch.append(self._queue.popleft())
+            for event in self._coalesce(batch):
+                event = self._admit(event)
+                if event is not None:
+                    self._deliver(event)
+
+    def _coalesce(self, batch) -> List[Event]:
+        merged = {}
+        for event_type, at, fields in batch:
+            try:
+                key = (event_type, tuple(sorted(fields.items())))
+                hash(key)
+            except TypeError:
+                key = (event_type, id(fields))  # Unhashable fields are never merged
+            if key in merged:
+                merged[key] = merged[key]._replace(count=merged[key].count + 1)
+            else:
+                merged[key] = Event(event_type, at, fields, 1)
+        return list(merged.values())
+
+    def _admit(self, event: Event) -> Optional[Event]:
+        policy = self.policies.get(event.type)
+        if policy is None:
+            return event
+        now = time.monotonic()
+        tokens, last = self._tokens.get(event.type, (policy.burst, now))
+        tokens = min(policy.burst, tokens + (now - last) * policy.per_second)
+        if tokens < 1:
+            self._tokens[event.type] = (tokens, now)
+            self._suppressed[event.type] += event.count
+            return None
+        self._tokens[event.type] = (tokens - 1, now)
+        return event._replace(count=event.count + self._suppressed.pop(event.type, 0))
+
+    def _deliver(self, event: Event):
+        for callback, types in self._subscribers:
+            if types is None or event.type in types:
+                try:
+                    callback(event)
+                except Exception:
+                    # A broken subscriber must not take the bus (or other subscribers) down.
+                    logger.exception(f"Event subscriber failed on {event.type}")
+
+    def close(self) -> None:
+        self._stopped.set()
+        self.flush()
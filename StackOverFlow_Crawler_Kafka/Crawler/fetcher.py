@@ -1,41 +1,202 @@
 # fetcher.py
 
-from .interfaces import FetcherInterface
+from .interfaces import FetcherInterface, PAGE_UNCHANGED
 import requests
 from typing import Callable, Optional
 import time
 import logging
+import asyncio
+import aiohttp
+import copy
+import hashlib
+import re
 from .notification_handler import Notifier, NotificationType
 from .tracedecorator import log_usage
+from . import metrics
 logger = logging.getLogger(__name__)
 
+# aiohttp decodes brotli transparently when the Brotli package is installed.
+ACCEPT_ENCODING = "gzip, deflate, br"
+
+_POST_ID_PATTERN = re.compile(rb'data-post-id="(\d+)"')
+
+
+def body_fingerprint(body: bytes) -> bytes:
+    return hashlib.blake2b(body, digest_size=16).digest()
+
+
+def question_ids_fingerprint(body: bytes) -> bytes:
+    """
+    Fingerprint only the question ids on a listing page. Listing pages embed
+    per-request noise (relative times, tokens), so hashing the whole body rarely matches.
+    Counter changes (votes, answers, views) do not change it, so a page whose
+    questions were only voted on counts as unchanged and is not re-parsed.
+    """
+    return hashlib.blake2b(b",".join(_POST_ID_PATTERN.findall(body)), digest_size=16).digest()
+
+
+class ConditionalPageCache:
+    """
+    Per-URL ETag, Last-Modified and content fingerprint of the last fetch,
+    used to send conditional requests and to spot unchanged pages.
+    """
+    def __init__(self, fingerprint: Callable[[bytes], bytes] = body_fingerprint):
+        self.fingerprint = fingerprint
+        self._entries = {}
+
+    def request_headers(self, url: str) -> dict:
+        etag, last_modified, _ = self._entries.get(url, (None, None, None))
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        return headers
+
+    def is_unchanged(self, url: str, status: int, headers, body: bytes) -> bool:
+        if status == 304:
+            return True
+        digest = self.fingerprint(body)
+        previous = self._entries.get(url)
+        self._entries[url] = (headers.get("ETag"), headers.get("Last-Modified"), digest)
+        return previous is not None and previous[2] == digest
+
 
 class FetcherStrategy(FetcherInterface):
     @log_usage()
     def __init__(self, headers: dict,
                  url_builder: Callable[[int], str],
                  retries: int = 3, delay: int = 2,
-                 notifier: Notifier = Notifier()):
+                 notifier: Notifier = None,
+                 page_cache: Optional[ConditionalPageCache] = None):
         self.headers = headers
         self.url_builder = url_builder
         self.retries = retries
         self.delay = delay
-        self.notifier = notifier
+        self.notifier = notifier or Notifier()
+        self.page_cache = page_cache
 
     @log_usage()
     def fetch(self, page: int) -> Optional[str]:
-        for attempt in range(1, self.retries + 1):
-            try:
-                url = self.url_builder(page)
-                self.notifier.notify(NotificationType.FETCHING_URL, url=url, attempt=attempt)
-                response = requests.get(url, headers=self.headers, timeout=10)
-                response.raise_for_status()
-                return response.text
-            except requests.RequestException as e:
-                logger.warning(f"Attempt {attempt} failed: {e}")
-                if attempt == self.retries:
-                    self.notifier.notify(
-                        NotificationType.FETCH_FAILED,
-                        retries=f"{str(self.retries)} for the page {str(page)}", e=str(e))
-                time.sleep(self.delay)
+        with metrics.FETCH_SECONDS.time():
+            for attempt in range(1, self.retries + 1):
+                try:
+                    url = self.url_builder(page)
+                    self.notifier.notify(NotificationType.FETCHING_URL, url=url, attempt=attempt)
+                    response = requests.get(url, headers={**self.headers,
+                                                          **self._conditional_headers(url)},
+                                            timeout=10)
+                    response.raise_for_status()
+                    metrics.FETCH_BYTES.inc(len(response.content))
+                    if self._is_unchanged(url, response.status_code,
+                                          response.headers, response.content):
+                        return PAGE_UNCHANGED
+                    return response.text
+                except requests.RequestException as e:
+                    logger.warning(f"Attempt {attempt} failed: {e}")
+                    self._record_failed_attempt(attempt)
+                    if attempt == self.retries:
+                        self.notifier.notify(
+                            NotificationType.FETCH_FAILED,
+                            retries=f"{str(self.retries)} for the page {str(page)}", e=str(e))
+                        break
+                    time.sleep(self.delay)
         return None
+
+    def with_url_builder(self, url_builder: Callable[[int], str]) -> "FetcherStrategy":
+        """Sibling fetcher for other URLs (e.g. another tag) sharing this one's settings."""
+        sibling = copy.copy(self)
+        sibling.url_builder = url_builder
+        return sibling
+
+    def _conditional_headers(self, url):
+        return self.page_cache.request_headers(url) if self.page_cache else {}
+
+    def _is_unchanged(self, url, status, headers, body):
+        if self.page_cache is None or not self.page_cache.is_unchanged(url, status, headers, body):
+            return False
+        metrics.PAGES_UNCHANGED.inc()
+        self.notifier.notify(NotificationType.PAGE_UNCHANGED, url=url)
+        return True
+
+    def _record_failed_attempt(self, attempt):
+        if attempt < self.retries:
+            metrics.FETCH_RETRIES.inc()
+        else:
+            metrics.FETCH_FAILURES.inc()
+
+
+class AsyncFetcherStrategy(FetcherStrategy):
+    """
+    Non-blocking fetcher backed by a single long-lived aiohttp session.
+    The blocking `fetch` inherited from FetcherStrategy stays available as a fallback.
+    """
+    @log_usage()
+    def __init__(self, headers: dict,
+                 url_builder: Callable[[int], str],
+                 retries: int = 3, delay: int = 2,
+                 notifier: Notifier = None,
+                 page_cache: Optional[ConditionalPageCache] = None,
+                 pool_size: int = 10, timeout: int = 10,
+                 keepalive_timeout: int = 60):
+        super().__init__(headers, url_builder, retries=retries,
+                         delay=delay, notifier=notifier, page_cache=page_cache)
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.keepalive_timeout = keepalive_timeout
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._pool_owner: Optional["AsyncFetcherStrategy"] = None
+
+    def with_url_builder(self, url_builder: Callable[[int], str]) -> "AsyncFetcherStrategy":
+        """Sibling fetcher that reuses this fetcher's connection pool."""
+        sibling = super().with_url_builder(url_builder)
+        sibling._session = None
+        sibling._pool_owner = self._pool_owner or self
+        return sibling
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._pool_owner is not None:
+            return self._pool_owner._get_session()
+        # The session is created lazily so that it binds to the running loop.
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size,
+                                             keepalive_timeout=self.keepalive_timeout)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers={"Accept-Encoding": ACCEPT_ENCODING, **self.headers},
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                auto_decompress=True)
+        return self._session
+
+    @log_usage()
+    async def fetch_async(self, page: int) -> Optional[str]:
+        session = self._get_session()
+        with metrics.FETCH_SECONDS.time():
+            for attempt in range(1, self.retries + 1):
+                try:
+                    url = self.url_builder(page)
+                    self.notifier.notify(NotificationType.FETCHING_URL, url=url, attempt=attempt)
+                    async with session.get(url, headers=self._conditional_headers(url)) as response:
+                        response.raise_for_status()
+                        body = await response.read()
+                        metrics.FETCH_BYTES.inc(len(body))
+                        if self._is_unchanged(url, response.status, response.headers, body):
+                            return PAGE_UNCHANGED
+                        return await response.text()
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    logger.warning(f"Attempt {attempt} failed: {e}")
+                    self._record_failed_attempt(attempt)
+                    if attempt == self.retries:
+                        self.notifier.notify(
+                            NotificationType.FETCH_FAILED,
+                            retries=f"{str(self.retries)} for the page {str(page)}", e=str(e))
+                        break
+                    await asyncio.sleep(self.delay * 2 ** (attempt - 1))
+        return None
+
+    @log_usage()
+    async def close(self) -> None:
+        # Siblings never own a session; only the pool owner closes it.
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
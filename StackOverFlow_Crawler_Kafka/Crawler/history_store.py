@@ -0,0 +1,160 @@
+# history_store.py
+
+from datetime import date, datetime, time as dt_time, timedelta, timezone
+from typing import List
+from .tracedecorator import log_usage
+
+HISTORY_TABLE = "question_history"
+COUNTER_COLUMNS = ("votes", "answers", "views")
+_PARTITION_DATE_FORMAT = "%Y%m%d"
+
+
+def partition_name(day: date) -> str:
+    return f"{HISTORY_TABLE}_{day.strftime(_PARTITION_DATE_FORMAT)}"
+
+
+def _day_start(day: date) -> datetime:
+    return datetime.combine(day, dt_time.min, tzinfo=timezone.utc)
+
+
+class QuestionHistoryStore:
+    """
+    Append-only samples of question counters in `question_history`, range
+    partitioned by day (UTC) on `sampled_at`. A sample is only written when
+    a question is new or one of its counters differs from `questions`, so it
+    must run inside the upsert transaction, before the merge. Expired
+    partitions are dropped by `prune`, outside of that transaction.
+
+    Works on connections handed in by PostgresAdapter; it owns no pool.
+    """
+    def __init__(self, retention_days: int = 30, days_ahead: int = 2):
+        self.retention_days = retention_days
+        self.days_ahead = days_ahead
+        self._partitions_ready_for = None
+        self._pruned_for = None
+
+    @log_usage()
+    async def create_table(self, conn) -> None:
+        await conn.execute(f'''
+            CREATE TABLE IF NOT EXISTS {HISTORY_TABLE} (
+                question_id BIGINT NOT NULL,
+                sampled_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                votes INTEGER,
+                answers INTEGER,
+                views INTEGER
+            ) PARTITION BY RANGE (sampled_at);
+            CREATE INDEX IF NOT EXISTS {HISTORY_TABLE}_sampled_at_idx
+                ON {HISTORY_TABLE} (sampled_at);
+            CREATE INDEX IF NOT EXISTS {HISTORY_TABLE}_question_idx
+                ON {HISTORY_TABLE} (question_id, sampled_at DESC);
+        ''')
+        self._partitions_ready_for = None
+        await self.ensure_partitions(conn)
+
+    @log_usage()
+    async def ensure_partitions(self, conn) -> None:
+        """Create today's and the next `days_ahead` partitions (once a day)."""
+        today = datetime.now(timezone.utc).date()
+        if self._partitions_ready_for == today:
+            return
+        for offset in range(-1, self.days_ahead + 1):
+            day = today + timedelta(days=offset)
+            await conn.execute(f'''
+                CREATE TABLE IF NOT EXISTS {partition_name(day)}
+                PARTITION OF {HISTORY_TABLE}
+                FOR VALUES FROM ('{_day_start(day).isoformat()}')
+                TO ('{_day_start(day + timedelta(days=1)).isoformat()}');
+            ''')
+        self._partitions_ready_for = today
+
+    def prune_due(self) -> bool:
+        return bool(self.retention_days) and self._pruned_for != datetime.now(timezone.utc).date()
+
+    @log_usage()
+    async def prune(self, conn) -> List[str]:
+        """Drop partitions older than `retention_days`."""
+        today = datetime.now(timezone.utc).date()
+        dropped = await self.drop_before(conn, _day_start(today - timedelta(days=self.retention_days)))
+        self._pruned_for = today
+        return dropped
+
+    @log_usage()
+    async def append_changed(self, conn, staging_table: str) -> int:
+        """Sample every staged question that is new or whose counters changed."""
+        staged = ", ".join(("id",) + COUNTER_COLUMNS)
+        status = await conn.execute(f'''
+            INSERT INTO {HISTORY_TABLE} (question_id, {", ".join(COUNTER_COLUMNS)})
+            SELECT s.id, {", ".join(f"s.{c}" for c in COUNTER_COLUMNS)}
+            FROM (
+                SELECT DISTINCT ON (id) {staged}
+                FROM {staging_table}
+                ORDER BY id, ctid DESC
+            ) s
+            LEFT JOIN questions q ON q.id = s.id
+            WHERE q.id IS NULL
+               OR ({", ".join(f"q.{c}" for c in COUNTER_COLUMNS)})
+                  IS DISTINCT FROM ({", ".join(f"s.{c}" for c in COUNTER_COLUMNS)});
+        ''')
+        return int(status.split()[-1])
+
+    @log_usage()
+    async def drop_before(self, conn, cutoff: datetime) -> List[str]:
+        """Drop every daily partition that ends at or before `cutoff`."""
+        rows = await conn.fetch('''
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = $1
+        ''', HISTORY_TABLE)
+        dropped = []
+        for row in rows:
+            suffix = row["relname"][len(HISTORY_TABLE) + 1:]
+            try:
+                day = datetime.strptime(suffix, _PARTITION_DATE_FORMAT).date()
+            except ValueError:
+                continue  # Not one of ours
+            if _day_start(day + timedelta(days=1)) <= cutoff:
+                await conn.execute(f"DROP TABLE IF EXISTS {row['relname']}")
+                dropped.append(row["relname"])
+        return dropped
+
+    @log_usage()
+    async def fastest_rising(self, conn, hours: float = 24, limit: int = 20,
+                             metric: str = "votes") -> List[dict]:
+        """
+        Questions whose `metric` grew the most over the last `hours`. The gain
+        is measured from the last sample in the preceding window of the same
+        length, or from the first one inside the window for questions first
+        seen during it. Partition pruning keeps the scan on the window's
+        partitions; baselines come from the (question_id, sampled_at) index.
+        """
+        if metric not in COUNTER_COLUMNS:
+            raise ValueError(f"Unknown metric '{metric}', expected one of {COUNTER_COLUMNS}")
+        window_start = datetime.now(timezone.utc) - timedelta(hours=hours)
+        rows = await conn.fetch(f'''
+            SELECT latest.question_id, q.title, q.link,
+                   latest.{metric} AS current,
+                   latest.{metric} - COALESCE(baseline.{metric}, opening.{metric}) AS gain
+            FROM (
+                SELECT DISTINCT ON (question_id) question_id, {metric}
+                FROM {HISTORY_TABLE}
+                WHERE sampled_at >= $1
+                ORDER BY question_id, sampled_at DESC
+            ) latest
+            LEFT JOIN LATERAL (
+                SELECT {metric} FROM {HISTORY_TABLE} h
+                WHERE h.question_id = latest.question_id
+                  AND h.sampled_at < $1 AND h.sampled_at >= $2
+                ORDER BY h.sampled_at DESC LIMIT 1
+            ) baseline ON true
+            CROSS JOIN LATERAL (
+                SELECT {metric} FROM {HISTORY_TABLE} h
+                WHERE h.question_id = latest.question_id AND h.sampled_at >= $1
+                ORDER BY h.sampled_at LIMIT 1
+            ) opening
+            LEFT JOIN questions q ON q.id = latest.question_id
+            ORDER BY gain DESC NULLS LAST, latest.question_id DESC
+            LIMIT $3
+        ''', window_start, window_start - timedelta(hours=hours), limit)
+        return [dict(row) for row in rows]
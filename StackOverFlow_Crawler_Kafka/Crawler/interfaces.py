@@ -1,8 +1,24 @@
 # interfaces.py
 
 from abc import ABC, abstractmethod
-from typing import List, Optional, Callable
-from models import Question
+from typing import AsyncIterator, List, Optional, Callable
+import asyncio
+from models import Question, QuestionRecord, WatcherState
+
+
+class _PageUnchanged:
+    """
+    Sentinel a fetcher returns when a page is identical to its previous fetch.
+    It is falsy, so callers that only look for content simply skip it.
+    """
+    def __bool__(self):
+        return False
+
+    def __repr__(self):
+        return "PAGE_UNCHANGED"
+
+
+PAGE_UNCHANGED = _PageUnchanged()
 
 
 class FetcherInterface(ABC):
@@ -10,16 +26,42 @@ class FetcherInterface(ABC):
     def fetch(self, page: int) -> Optional[str]:
         """
         Fetch HTML content for the given page number.
-        Returns None if the fetch fails.
+        Returns None if the fetch fails, or PAGE_UNCHANGED when the fetcher
+        can tell the page has not changed since it was last fetched.
+        """
+        pass
+
+    async def fetch_async(self, page: int) -> Optional[str]:
+        """
+        Awaitable variant of fetch. Blocking fetchers run in a worker thread
+        so they never stall the event loop.
+        """
+        return await asyncio.to_thread(self.fetch, page)
+
+    async def close(self) -> None:
+        """
+        Release any connections held by the fetcher.
         """
         pass
 
 
 class ParserInterface(ABC):
     @abstractmethod
-    def parse(self, html: str) -> List[Question]:
+    def parse(self, html: str) -> List[QuestionRecord]:
         """
-        Parse the provided HTML string and return a list of Question objects.
+        Parse the provided HTML string and return a list of QuestionRecord objects.
+        """
+        pass
+
+    async def parse_async(self, html: str) -> List[QuestionRecord]:
+        """
+        Awaitable variant of parse. In-process parsers simply parse inline.
+        """
+        return self.parse(html)
+
+    def close(self) -> None:
+        """
+        Release any workers held by the parser.
         """
         pass
 
@@ -27,13 +69,24 @@ class ParserInterface(ABC):
 class ScraperInterface(ABC):
     @abstractmethod
     def scrape(self, max_questions: int,
-               stop_condition: Optional[Callable[[Question], bool]] = None) -> List[Question]:
+               stop_condition: Optional[Callable[[Question], bool]] = None,
+               on_known: Optional[Callable[[List[Question]], None]] = None) -> List[Question]:
         """
         Scrape the website and return a list of Question objects up to max_questions.
-        If a stop_condition is provided, stop scraping when the condition is met.
+        If a stop_condition is provided, stop scraping when the condition is met;
+        the fetched questions that met it are passed to `on_known`.
         """
         pass
 
+    async def scrape_async(self, max_questions: int = None,
+                           stop_condition: Optional[Callable[[Question], bool]] = None,
+                           on_known: Optional[Callable[[List[Question]], None]] = None
+                           ) -> List[Question]:
+        """
+        Awaitable variant of scrape, safe to call from the asyncio loop.
+        """
+        return await asyncio.to_thread(self.scrape, max_questions, stop_condition, on_known)
+
 
 class WatcherInterface(ABC):
     @abstractmethod
@@ -59,6 +112,35 @@ class WatcherInterface(ABC):
         pass
 
 
+class StateStoreInterface(ABC):
+    @abstractmethod
+    def load(self, key: str) -> Optional[WatcherState]:
+        """
+        Return the stored watcher state for key, or None if nothing is stored yet.
+        """
+        pass
+
+    @abstractmethod
+    def commit(self, key: str, state: WatcherState, added: List[int]) -> None:
+        """
+        Atomically persist the watcher state. `added` lists the ids that joined
+        the seen window since the previous commit.
+        """
+        pass
+
+    async def load_async(self, key: str) -> Optional[WatcherState]:
+        """
+        Awaitable variant of load. Local stores simply load inline.
+        """
+        return self.load(key)
+
+    async def commit_async(self, key: str, state: WatcherState, added: List[int]) -> None:
+        """
+        Awaitable variant of commit. Local stores simply commit inline.
+        """
+        self.commit(key, state, added)
+
+
 class DisplayInterface(ABC):
     @abstractmethod
     def display(self, questions: List[Question]) -> None:
@@ -67,6 +149,51 @@ class DisplayInterface(ABC):
         """
         pass
 
+    async def display_async(self, questions: List[Question]) -> None:
+        """
+        Awaitable variant of display that returns once every durable output
+        has accepted the batch, and raises if one did not. Plain displays
+        simply display inline.
+        """
+        self.display(questions)
+
+    async def refresh_async(self, questions: List[Question]) -> None:
+        """
+        Hand over questions that were delivered before and scraped again, so
+        outputs that track counters (votes, answers, views) can update them.
+        Most displays ignore them.
+        """
+        pass
+
+
+class SinkInterface(ABC):
+    """
+    An output for new questions (console, database, file, message bus).
+    Sinks are driven by FanOutDisplay, which decides when `write` runs, so
+    a slow or failing sink does not affect the poll loop.
+
+    A `durable` sink must not lose questions: FanOutDisplay writes to it
+    before the watcher moves its watermark, instead of queueing.
+    """
+    name = "sink"
+    durable = False
+
+    @abstractmethod
+    async def write(self, questions: List[Question]) -> None:
+        """
+        Deliver one batch of questions to the output.
+        """
+        pass
+
+    async def refresh(self, questions: List[Question]) -> None:
+        """
+        Update questions this sink was given before; see DisplayInterface.refresh_async.
+        """
+        pass
+
+    async def close(self) -> None:
+        pass
+
 
 class StreamInterface(ABC):
     """
@@ -78,3 +205,11 @@ class StreamInterface(ABC):
         Return an iterator (stream) of questions.
         """
         pass
+
+    @abstractmethod
+    def stream_async(self, stop_condition: Optional[Callable[[Question], bool]] = None
+                     ) -> AsyncIterator[Question]:
+        """
+        Return an async iterator (stream) of questions.
+        """
+        pass
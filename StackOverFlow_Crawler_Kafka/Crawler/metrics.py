@@ -0,0 +1,191 @@
+# metrics.py
+
+import bisect
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Sequence
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._lock = threading.Lock()
+
+    def render(self) -> str:
+        header = f"# HELP {self.name} {self.documentation}\n# TYPE {self.name} {self.kind}\n"
+        return header + "".join(f"{line}\n" for line in self._samples())
+
+    @abstractmethod
+    def _samples(self):
+        """
+        Return the metric's exposition lines, without the HELP/TYPE header.
+        """
+        pass
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str):
+        super().__init__(name, documentation)
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def _samples(self):
+        return [f"{self.name} {self.value}"]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str):
+        super().__init__(name, documentation)
+        self.value = 0.0
+
+    def set(self, value: float) -> None:
+        with self._lock:
+            self.value = value
+
+    def _samples(self):
+        return [f"{self.name} {self.value}"]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str,
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation)
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def _samples(self):
+        with self._lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+        lines, cumulative = [], 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            lines.append(f'{self.name}_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f'{self.name}_bucket{{le="+Inf"}} {count}')
+        lines.append(f"{self.name}_sum {total}")
+        lines.append(f"{self.name}_count {count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, documentation: str) -> Counter:
+        return self.register(Counter(name, documentation))
+
+    def gauge(self, name: str, documentation: str) -> Gauge:
+        return self.register(Gauge(name, documentation))
+
+    def histogram(self, name: str, documentation: str,
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, buckets))
+
+    def render(self) -> str:
+        return "".join(metric.render() for metric in list(self._metrics.values()))
+
+
+REGISTRY = MetricsRegistry()
+
+FETCH_SECONDS = REGISTRY.histogram("crawler_fetch_seconds", "Page fetch latency including retries.")
+FETCH_BYTES = REGISTRY.counter("crawler_fetch_bytes_total", "Decoded bytes of fetched pages.")
+FETCH_RETRIES = REGISTRY.counter("crawler_fetch_retries_total", "Failed fetch attempts that were retried.")
+FETCH_FAILURES = REGISTRY.counter("crawler_fetch_failures_total", "Fetches that exhausted all retries.")
+PAGES_UNCHANGED = REGISTRY.counter(
+    "crawler_pages_unchanged_total", "Fetches answered by 304 or an unchanged content hash.")
+PARSE_SECONDS = REGISTRY.histogram("crawler_parse_seconds", "Listing page parse latency.")
+QUESTIONS_PARSED = REGISTRY.counter("crawler_questions_parsed_total", "Questions extracted from pages.")
+PARSE_QUESTIONS_PER_SECOND = REGISTRY.gauge(
+    "crawler_parse_questions_per_second", "Parse throughput of the most recent page.")
+WATCH_SECONDS = REGISTRY.histogram("crawler_watch_seconds", "Dedupe latency of QuestionWatcher.watch.")
+NEW_QUESTIONS = REGISTRY.counter("crawler_new_questions_total", "Questions reported as new by the watcher.")
+POLL_INTERVAL_SECONDS = REGISTRY.gauge(
+    "crawler_poll_interval_seconds", "Sleep chosen before the next poll cycle.")
+DB_INSERT_SECONDS = REGISTRY.histogram("crawler_db_insert_seconds", "Postgres insert latency per batch.")
+DB_ROWS_INSERTED = REGISTRY.counter("crawler_db_rows_total", "Rows sent to Postgres.")
+DB_HISTORY_SAMPLES = REGISTRY.counter(
+    "crawler_db_history_samples_total", "Counter samples appended to question_history.")
+API_QUOTA_REMAINING = REGISTRY.gauge(
+    "crawler_api_quota_remaining", "StackExchange API requests left in today's quota.")
+ALERT_EVAL_SECONDS = REGISTRY.histogram(
+    "crawler_alert_eval_seconds", "Time to match one batch of new questions against the alert rules.")
+ALERT_MATCHES = REGISTRY.counter("crawler_alert_matches_total", "Alert rule matches.")
+ARCHIVE_PAGES = REGISTRY.counter("crawler_archive_pages_total", "Pages appended to the raw-page archive.")
+ARCHIVE_DROPPED = REGISTRY.counter(
+    "crawler_archive_dropped_total", "Pages not archived because the archive writer fell behind.")
+ARCHIVE_BYTES = REGISTRY.counter(
+    "crawler_archive_bytes_total", "Compressed bytes appended to the raw-page archive.")
+DB_POOL_WAIT_SECONDS = REGISTRY.histogram(
+    "crawler_db_pool_wait_seconds", "Time spent waiting for a Postgres pool connection.",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0))
+
+
+def record_parse(elapsed: float, questions: int) -> None:
+    PARSE_SECONDS.observe(elapsed)
+    QUESTIONS_PARSED.inc(questions)
+    if elapsed > 0:
+        PARSE_QUESTIONS_PER_SECOND.set(questions / elapsed)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.registry.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port: int, host: str = "0.0.0.0",
+                         registry: Optional[MetricsRegistry] = None) -> ThreadingHTTPServer:
+    """Serve the registry in Prometheus text format on /metrics from a daemon thread."""
+    handler = type("MetricsHandler", (_MetricsHandler,), {"registry": registry or REGISTRY})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
@@ -0,0 +1,106 @@
+# multi_watcher.py
+
+import asyncio
+from typing import Dict, List
+from models import Question
+from .coordination import PostgresLeaseManager
+from .watcher import PollingWatcher, QuestionWatcher
+from .notification_handler import Notifier
+from .tracedecorator import log_usage
+
+
+class MultiTagWatcher(PollingWatcher):
+    """
+    Watches several tags from one poll loop. Every tag keeps its own
+    QuestionWatcher (and watermark); tags are scraped concurrently and a
+    question carrying several watched tags is emitted once per cycle.
+
+    `run` takes a mapping of tag -> scraper instead of a single scraper.
+    """
+    @log_usage()
+    def __init__(self, watchers: Dict[str, QuestionWatcher], notifier: Notifier):
+        super().__init__(notifier)
+        self.watchers = watchers
+
+    @property
+    def last_id(self) -> int:
+        return max((w.last_id for w in self.watchers.values()), default=0)
+
+    @log_usage()
+    def watch(self, questions: List[Question]) -> List[Question]:
+        return self._merge([
+            watcher.watch([q for q in questions if tag in q.tags])
+            for tag, watcher in self.watchers.items()
+        ])
+
+    @log_usage()
+    def persist_state(self) -> None:
+        for watcher in self.watchers.values():
+            watcher.persist_state()
+
+    @log_usage()
+    async def persist_state_async(self) -> None:
+        for watcher in self.watchers.values():
+            await watcher.persist_state_async()
+
+    @log_usage()
+    async def restore_state(self) -> None:
+        for watcher in self.watchers.values():
+            await watcher.restore_state()
+
+    async def _poll(self, scrapers) -> List[Question]:
+        return await self._poll_tags(scrapers, list(self.watchers))
+
+    async def _poll_tags(self, scrapers, tags: List[str]) -> List[Question]:
+        per_tag = await asyncio.gather(*(self.watchers[tag]._poll(scrapers[tag]) for tag in tags))
+        self.rescraped = self._merge([self.watchers[tag].rescraped for tag in tags])
+        return self._merge(per_tag)
+
+    def _merge(self, per_tag: List[List[Question]]) -> List[Question]:
+        merged = {}
+        for questions in per_tag:
+            for question in questions:
+                merged.setdefault(question.id, question)
+        return list(merged.values())
+
+
+class CoordinatedWatcher(MultiTagWatcher):
+    """
+    MultiTagWatcher whose tags are shared between crawler replicas: each
+    tag is a lease, and a replica only polls the tags it holds. On taking a
+    tag over, the tag's watcher reloads the shared watermark (see
+    PostgresStateStore) so it resumes where the previous owner committed.
+    """
+    @log_usage()
+    def __init__(self, watchers, leases: PostgresLeaseManager, notifier: Notifier):
+        super().__init__(watchers, notifier)
+        self.leases = leases
+
+    async def _start_watching(self, scrapers, display, interval, scheduler=None):
+        tags = list(self.watchers)
+        callbacks = dict(on_acquired=self._take_over, on_releasing=self._hand_over)
+        await self.leases.claim(tags, **callbacks)
+        self.leases.start(tags, **callbacks)
+        await super()._start_watching(scrapers, display, interval, scheduler)
+
+    async def _take_over(self, tag: str):
+        await self.watchers[tag].restore_state()
+
+    async def _hand_over(self, tag: str):
+        await self.watchers[tag].persist_state_async()
+
+    def _held(self) -> List[str]:
+        return [tag for tag in self.watchers if self.leases.holds(tag)]
+
+    async def _poll(self, scrapers) -> List[Question]:
+        return await self._poll_tags(scrapers, self._held())
+
+    @log_usage()
+    async def restore_state(self) -> None:
+        for tag in self._held():
+            await self.watchers[tag].restore_state()
+
+    @log_usage()
+    async def persist_state_async(self) -> None:
+        for tag in self._held():
+            await self.watchers[tag].persist_state_async()
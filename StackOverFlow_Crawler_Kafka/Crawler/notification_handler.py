@@ -1,8 +1,13 @@
 # notification_handler.py
 
+import atexit
 import logging
+import os
+import threading
 from enum import Enum, auto
 import time
+from .event_bus import Event, EventBus, RatePolicy
+from . import metrics
 
 
 class NotificationType(Enum):
@@ -20,9 +25,75 @@ class NotificationType(Enum):
     STATE_LOADING_FAILURE = auto()
     STATE_PERSISTING_FAILURE = auto()
     QUESTION_PARSE_ERROR = auto()
+    QUESTIONS_PUBLISHED = auto()
+    PAGE_UNCHANGED = auto()
+    DB_WRITE_DEFERRED = auto()
+    DB_SPILL_REPLAYED = auto()
+    BACKFILL_STARTED = auto()
+    SINK_FAILED = auto()
+    SINK_OVERFLOW = auto()
+    BACKFILL_PARTITION_DONE = auto()
+    BACKFILL_PARTITION_FAILED = auto()
+    API_BACKOFF = auto()
+    API_QUOTA_EXHAUSTED = auto()
+    LEASE_ACQUIRED = auto()
+    LEASE_RELEASED = auto()
+    LEASE_LOST = auto()
+    COORDINATION_ERROR = auto()
+    ALERT_MATCHED = auto()
+    ALERT_RULES_LOADED = auto()
+    ALERT_RULES_INVALID = auto()
+    ARCHIVE_WRITE_FAILED = auto()
+    ARCHIVE_OVERFLOW = auto()
+
+
+# Chatty types are rate limited; the rest are only coalesced.
+DEFAULT_POLICIES = {
+    NotificationType.FETCHING_URL: RatePolicy(per_second=2, burst=5),
+    NotificationType.PAGE_UNCHANGED: RatePolicy(per_second=1, burst=5),
+    NotificationType.QUESTIONS_PUBLISHED: RatePolicy(per_second=1, burst=5),
+    NotificationType.QUESTION_PARSE_ERROR: RatePolicy(per_second=1, burst=10),
+    NotificationType.STREAMING_ERROR: RatePolicy(per_second=1, burst=5),
+    NotificationType.SINK_OVERFLOW: RatePolicy(per_second=0.2),
+    NotificationType.DB_WRITE_DEFERRED: RatePolicy(per_second=0.2),
+    NotificationType.API_QUOTA_EXHAUSTED: RatePolicy(per_second=0.1),
+    NotificationType.ARCHIVE_WRITE_FAILED: RatePolicy(per_second=0.2),
+    NotificationType.ARCHIVE_OVERFLOW: RatePolicy(per_second=0.2),
+    NotificationType.COORDINATION_ERROR: RatePolicy(per_second=0.1),
+}
 
 
 class Notifier:
+    """
+    What every component publishes through. `notify` only queues the event
+    on an EventBus (the shared one by default); printing, logging, metrics
+    and any alerting subscribers run on the bus thread, never in the caller.
+    Notifying never raises: callers decide how to recover.
+    """
+    def __init__(self, bus: EventBus = None):
+        self.bus = bus or get_event_bus()
+
+    def notify(self, notification_type: NotificationType, **kwargs):
+        self.bus.publish(notification_type, kwargs)
+
+    def flush(self) -> None:
+        """Deliver every queued event now, e.g. before exiting."""
+        self.bus.flush()
+
+
+class MetricsSubscriber:
+    """Counts delivered events per type as crawler_events_<type>_total."""
+    def __init__(self, registry: metrics.MetricsRegistry = None):
+        self.registry = registry or metrics.REGISTRY
+
+    def __call__(self, event: Event) -> None:
+        name = event.type.name.lower()
+        self.registry.counter(f"crawler_events_{name}_total",
+                              f"{event.type.name} notifications.").inc(event.count)
+
+
+class ConsoleSubscriber:
+    """Prints and logs events in the crawler's console format."""
     def __init__(self):
         # Mapping of notification types to handler methods.
         self._handlers = {
@@ -40,34 +111,128 @@ class Notifier:
             NotificationType.STREAMING_ERROR: self._handle_streaming_error,
             NotificationType.STATE_LOADING_FAILURE: self._handle_state_loading_failure,
             NotificationType.STATE_PERSISTING_FAILURE: self._handle_state_persisting_failure,
+            NotificationType.QUESTIONS_PUBLISHED: self._handle_questions_published,
+            NotificationType.PAGE_UNCHANGED: self._handle_page_unchanged,
+            NotificationType.DB_WRITE_DEFERRED: self._handle_db_write_deferred,
+            NotificationType.DB_SPILL_REPLAYED: self._handle_db_spill_replayed,
+            NotificationType.BACKFILL_STARTED: self._handle_backfill_started,
+            NotificationType.SINK_FAILED: self._handle_sink_failed,
+            NotificationType.SINK_OVERFLOW: self._handle_sink_overflow,
+            NotificationType.BACKFILL_PARTITION_DONE: self._handle_backfill_partition_done,
+            NotificationType.BACKFILL_PARTITION_FAILED: self._handle_backfill_partition_failed,
+            NotificationType.API_BACKOFF: self._handle_api_backoff,
+            NotificationType.API_QUOTA_EXHAUSTED: self._handle_api_quota_exhausted,
+            NotificationType.LEASE_ACQUIRED: self._handle_lease_acquired,
+            NotificationType.LEASE_RELEASED: self._handle_lease_released,
+            NotificationType.LEASE_LOST: self._handle_lease_lost,
+            NotificationType.COORDINATION_ERROR: self._handle_coordination_error,
+            NotificationType.ALERT_MATCHED: self._handle_alert_matched,
+            NotificationType.ALERT_RULES_LOADED: self._handle_alert_rules_loaded,
+            NotificationType.ALERT_RULES_INVALID: self._handle_alert_rules_invalid,
+            NotificationType.ARCHIVE_WRITE_FAILED: self._handle_archive_write_failed,
+            NotificationType.ARCHIVE_OVERFLOW: self._handle_archive_overflow,
 
 
         }
         self.logger = logging.getLogger(__name__)
 
-    def notify(self, notification_type: NotificationType, **kwargs):
-        handler = self._handlers.get(notification_type)
-        if handler:
-            handler(**kwargs)
-        else:
-            print(f"⚠️ Unhandled notification type: {notification_type}")
+    def __call__(self, event: Event) -> None:
+        handler = self._handlers.get(event.type)
+        if not handler:
+            print(f"⚠️ Unhandled notification type: {event.type}")
+            return
+        handler(**event.fields)
+        if event.count > 1:
+            self.logger.info(f"{event.type.name} occurred {event.count} times, reported once")
+
+    def _handle_alert_matched(self, rule: str, question_id: int, title: str, link: str):
+        print(f"🚨 [{rule}] {title}\n   🔗 {link}")
+        self.logger.info(f"Alert '{rule}' matched question {question_id}")
+
+    def _handle_alert_rules_loaded(self, path: str, count: int):
+        self.logger.info(f"Loaded {count} alert rules from {path}")
+
+    def _handle_alert_rules_invalid(self, path: str, e: str):
+        print(f"⚠️ Alert rules in {path} are invalid, keeping the previous rules")
+        self.logger.error(f"Invalid alert rules in {path}: {e}")
+
+    def _handle_archive_write_failed(self, directory: str, e: str):
+        self.logger.error(f"Could not archive page in {directory}: {e}")
+
+    def _handle_archive_overflow(self, directory: str):
+        self.logger.warning(f"Archive writer for {directory} is behind, dropped a page")
+
+    def _handle_lease_acquired(self, unit: str, token: int):
+        print(f"🤝 Now crawling '{unit}'")
+        self.logger.info(f"Acquired lease on '{unit}' (token {token})")
+
+    def _handle_lease_released(self, unit: str):
+        self.logger.info(f"Released lease on '{unit}'")
+
+    def _handle_lease_lost(self, unit: str):
+        print(f"⚠️ Lease on '{unit}' was taken over by another replica")
+        self.logger.warning(f"Lost lease on '{unit}'")
+
+    def _handle_coordination_error(self, e: str):
+        self.logger.error(f"Lease heartbeat failed: {e}")
+
+    def _handle_api_backoff(self, seconds: int):
+        self.logger.info(f"StackExchange API asked to back off for {seconds}s")
+
+    def _handle_api_quota_exhausted(self, wait: float, quota_remaining: int = None):
+        print(f"⚠️ StackExchange API unavailable for {wait:.0f}s (quota left: {quota_remaining})")
+        self.logger.warning(f"API request skipped, next allowed in {wait:.0f}s; "
+                            f"quota_remaining={quota_remaining}")
+
+    def _handle_sink_failed(self, sink: str, count: int, e: str):
+        print(f"⚠️ Output '{sink}' failed to write {count} questions")
+        self.logger.error(f"Sink '{sink}' failed to write {count} questions: {e}")
+
+    def _handle_sink_overflow(self, sink: str, dropped: int):
+        self.logger.warning(f"Sink '{sink}' queue full, dropped {dropped} oldest questions")
+
+    def _handle_backfill_started(self, job: str, pending: int, total: int):
+        print(f"📚 Backfill '{job}': {pending} of {total} partitions left")
+        self.logger.info(f"Backfill '{job}' started with {pending}/{total} partitions pending")
+
+    def _handle_backfill_partition_done(self, first_page: int, last_page: int, questions: int):
+        print(f"✅ Backfilled pages {first_page}-{last_page}: {questions} questions")
+
+    def _handle_backfill_partition_failed(self, first_page: int, next_page: int, e: str):
+        print(f"⚠️ Backfill partition starting at page {first_page} stopped at page {next_page}")
+        self.logger.error(f"Backfill partition {first_page} stopped at page {next_page}: {e}")
+
+    def _handle_db_write_deferred(self, e: str, retry_in: float, count: int = None,
+                                  target: str = "db"):
+        kept = f"{count} questions" if count is not None else "Journaled questions"
+        what = "Database" if target == "db" else f"Output '{target}'"
+        self.logger.warning(f"{what} write deferred, retrying in {retry_in:.1f}s: {e}")
+        print(f"⚠️ {what} unavailable: {kept} kept on disk until it is back")
+
+    def _handle_db_spill_replayed(self, count: int, target: str = "db"):
+        self.logger.info(f"Replayed {count} journaled questions into '{target}'")
+
+    def _handle_page_unchanged(self, url: str):
+        self.logger.info(f"Page unchanged since last fetch, skipping: {url}")
+
+    def _handle_questions_published(self, count: int, topic: str):
+        self.logger.info(f"Published {count} questions to '{topic}'")
 
     def _handle_question_parse_error(self, e: str, qid: str):
-        print((f"⚠️ Parsing Question Error, Question ID={qid}: {e.title}"))
+        print(f"⚠️ Parsing Question Error, Question ID={qid}: {e}")
         self.logger.warning(f"Failed to parse question ID: {e}")
 
     def _handle_state_persisting_failure(self, e: str):
         self.logger.error(f"Failed to persist state: {e}")
-        print((f"⚠️ Failed to persist state: {e.title}"))
-        raise
+        print(f"⚠️ Failed to persist state, retrying after the next poll: {e}")
 
     def _handle_state_loading_failure(self, e: str):
         self.logger.warning(f"State load failed: {e}")
-        print((f"⚠️ State load failed: {e.title}"))
+        print(f"⚠️ State load failed: {e}")
 
     def _handle_streaming_error(self, e: str):
         self.logger.error(f"Error while streaming questions: {e}")
-        print((f"⚠️ Error while streaming questions: {e.title}"))
+        print(f"⚠️ Error while streaming questions: {e}")
 
     def _handle_no_questions_parsed(self):
         self.logger.info("No questions parsed, ending scrape.")
@@ -79,8 +244,7 @@ class Notifier:
 
     def _handle_fetch_failed(self, retries: str, e: str):
         print(f"⚠️ Fetch failed after {retries} attempts.")
-        self.logger.error(f"Fetch failed after {retries} attempts.")
-        raise RuntimeError(f"Fetch failed after {retries} attempts: {e}")
+        self.logger.error(f"Fetch failed after {retries} attempts: {e}")
 
     def _handle_fetching_url(self, url: str, attempt: str):
         print(f"Fetching URL: {url} (Attempt {attempt})")
@@ -97,11 +261,44 @@ class Notifier:
 
     def _handle_watcher_stopped(self, e: str):
         print("\n🛑 Watcher stopped.")
-        self.logger.error(f"Watcher encountered an error: {e}")
-        raise
+        if e:
+            self.logger.error(f"Watcher encountered an error: {e}")
 
     def _handle_new_questions(self, count: int):
         print(f"\n🔔 Found {count} new questions:")
 
     def _handle_no_new_questions(self):
         print(f"⏳ No new questions. Last check: {time.strftime('%Y-%m-%d %H:%M:%S')}")
+
+
+_default_bus = None
+_default_bus_lock = threading.Lock()
+
+
+def get_event_bus() -> EventBus:
+    """The process-wide bus, with the console and metrics subscribers attached."""
+    global _default_bus
+    if _default_bus is None:
+        with _default_bus_lock:
+            if _default_bus is None:
+                bus = EventBus(policies=DEFAULT_POLICIES)
+                bus.subscribe(ConsoleSubscriber())
+                bus.subscribe(MetricsSubscriber())
+                _default_bus = bus
+    return _default_bus
+
+
+@atexit.register
+def flush_events() -> None:
+    if _default_bus is not None:
+        _default_bus.close()
+
+
+def _reset_after_fork():
+    # The bus thread does not survive fork; children (e.g. parse workers) start fresh.
+    global _default_bus, _default_bus_lock
+    _default_bus = None
+    _default_bus_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
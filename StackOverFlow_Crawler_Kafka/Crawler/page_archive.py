@@ -0,0 +1,389 @@
+# page_archive.py
+
+import asyncio
+import fcntl
+import hashlib
+import mmap
+import os
+import queue
+import struct
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional, Tuple
+import zstandard
+from models import ParsConstants, QuestionRecord
+from .interfaces import FetcherInterface
+from .notification_handler import NotificationType, Notifier
+from .parser import build_parser
+from .tracedecorator import log_usage
+from . import metrics
+
+# One index entry per page: fetched_at (unix seconds), url key, frame offset, frame length.
+INDEX_ENTRY = struct.Struct("<dQQI")
+SEGMENT_SUFFIX = ".zst"
+INDEX_SUFFIX = ".idx"
+LOCK_FILE = "writer.lock"
+
+ArchivedPage = namedtuple("ArchivedPage", ["url", "fetched_at", "body"])
+
+
+class PageArchiveError(Exception):
+    """The archive directory cannot be written, e.g. another writer holds it."""
+
+
+def url_key(url: str) -> int:
+    return int.from_bytes(hashlib.blake2b(url.encode(), digest_size=8).digest(), "little")
+
+
+def _segment_name(number: int) -> str:
+    return f"segment-{number:06d}"
+
+
+def _segment_numbers(directory: Path) -> List[int]:
+    return sorted(int(path.stem.split("-")[1]) for path in directory.glob(f"segment-*{SEGMENT_SUFFIX}"))
+
+
+def _split_payload(payload: bytes) -> Tuple[str, str]:
+    url, _, body = payload.partition(b"\n")
+    return url.decode(), body.decode()
+
+
+class PageArchiveWriter:
+    """
+    Appends raw pages to zstd-compressed segment files in `directory`.
+    Every page is its own zstd frame (the URL, a newline, then the body),
+    so any page can be read back from its offset alone; each segment has
+    an `.idx` file of fixed-size INDEX_ENTRY records in append order.
+    Segments roll over at `segment_bytes`.
+
+    `append` only queues the page; a daemon thread compresses and writes,
+    so fetchers never wait on compression or disk. If the disk falls more
+    than `queue_size` pages behind, new pages are dropped (and counted)
+    rather than stalling the crawl. The segment is always written ahead of
+    its index, and opening an archive trims whatever a crash left behind
+    past the last complete entry.
+
+    One writer per directory, enforced with a lock file: a second writer
+    (another replica, or a backfill next to the watcher) raises
+    PageArchiveError and should archive to a directory of its own.
+    """
+    @log_usage()
+    def __init__(self, directory: Path, segment_bytes: int = 256 << 20, level: int = 3,
+                 queue_size: int = 1000, notifier: Notifier = None):
+        self.directory = Path(directory)
+        self.segment_bytes = segment_bytes
+        self.notifier = notifier or Notifier()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock = self._acquire_lock()
+        self._compressor = zstandard.ZstdCompressor(level=level)
+        self._queue = queue.Queue(maxsize=queue_size)
+        numbers = _segment_numbers(self.directory)
+        self._open_segment(numbers[-1] if numbers else 1)
+        self._thread = threading.Thread(target=self._run, name="page-archive", daemon=True)
+        self._thread.start()
+
+    def _acquire_lock(self):
+        lock = open(self.directory / LOCK_FILE, "a")
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock.close()
+            raise PageArchiveError(f"Page archive {self.directory} is in use by another writer")
+        return lock
+
+    def append(self, url: str, body: str, fetched_at: float = None) -> None:
+        try:
+            self._queue.put_nowait((url, body, fetched_at or time.time()))
+        except queue.Full:
+            metrics.ARCHIVE_DROPPED.inc()
+            self.notifier.notify(NotificationType.ARCHIVE_OVERFLOW, directory=str(self.directory))
+
+    def _open_segment(self, number: int):
+        self._number = number
+        path = self.directory / _segment_name(number)
+        segment_path, index_path = path.with_suffix(SEGMENT_SUFFIX), path.with_suffix(INDEX_SUFFIX)
+        self._segment_size = self._recover(segment_path, index_path)
+        self._segment = open(segment_path, "ab")
+        self._index = open(index_path, "ab")
+
+    @staticmethod
+    def _recover(segment_path: Path, index_path: Path) -> int:
+        """Drop torn index entries and unindexed segment bytes; returns the segment size."""
+        segment_size = segment_path.stat().st_size if segment_path.exists() else 0
+        index = index_path.read_bytes() if index_path.exists() else b""
+        entries = len(index) // INDEX_ENTRY.size
+        end = 0
+        while entries:
+            _, _, offset, length = INDEX_ENTRY.unpack_from(index, (entries - 1) * INDEX_ENTRY.size)
+            if offset + length <= segment_size:
+                end = offset + length
+                break
+            entries -= 1
+        for path, size in ((index_path, entries * INDEX_ENTRY.size), (segment_path, end)):
+            with open(path, "ab") as f:
+                f.truncate(size)
+        return end
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                self._write(*item)
+                if self._queue.empty():
+                    self._flush_files()
+            except OSError as e:
+                self.notifier.notify(NotificationType.ARCHIVE_WRITE_FAILED,
+                                     directory=str(self.directory), e=str(e))
+            finally:
+                self._queue.task_done()
+
+    def _write(self, url: str, body: str, fetched_at: float):
+        frame = self._compressor.compress(url.encode() + b"\n" + body.encode())
+        if self._segment_size and self._segment_size + len(frame) > self.segment_bytes:
+            self._close_files()
+            self._open_segment(self._number + 1)
+        self._segment.write(frame)
+        self._index.write(INDEX_ENTRY.pack(fetched_at, url_key(url), self._segment_size, len(frame)))
+        self._segment_size += len(frame)
+        metrics.ARCHIVE_PAGES.inc()
+        metrics.ARCHIVE_BYTES.inc(len(frame))
+
+    def _flush_files(self):
+        self._segment.flush()  # Data before the index that points at it
+        self._index.flush()
+
+    def _close_files(self):
+        self._flush_files()
+        self._segment.close()
+        self._index.close()
+
+    @log_usage()
+    def flush(self) -> None:
+        """Block until every page appended so far is on disk."""
+        self._queue.join()
+
+    @log_usage()
+    def close(self) -> None:
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        self._close_files()
+        self._lock.close()  # Releases the flock
+
+
+def _map(path: Path):
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class _Segment:
+    """A segment and its index, both memory-mapped; entries are read on demand."""
+    def __init__(self, path: Path):
+        self.path = path.with_suffix(SEGMENT_SUFFIX)
+        self.data = _map(self.path)
+        index = _map(path.with_suffix(INDEX_SUFFIX))
+        # Entries whose frame is not (fully) in the mapping are still being written.
+        self.index, self.count = index, len(index) // INDEX_ENTRY.size
+        while self.count and sum(self.entry(self.count - 1)[2:]) > len(self.data):
+            self.count -= 1
+
+    def entry(self, i: int) -> Tuple[float, int, int, int]:
+        return INDEX_ENTRY.unpack_from(self.index, i * INDEX_ENTRY.size)
+
+    def first_at_or_after(self, fetched_at: float) -> int:
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self.entry(middle)[0] < fetched_at:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def frame(self, offset: int, length: int) -> bytes:
+        return self.data[offset:offset + length]
+
+    def close(self):
+        for mapping in (self.data, self.index):
+            if isinstance(mapping, mmap.mmap):
+                mapping.close()
+
+
+class PageArchive:
+    """
+    Read side of an archive written by PageArchiveWriter. Segments and
+    indexes are memory-mapped, so scanning an archive costs page-cache
+    reads and decompression only. Pages are appended in fetch order, which
+    makes the index sorted by time: a time range is two binary searches
+    per segment.
+    """
+    @log_usage()
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self._decompressor = zstandard.ZstdDecompressor()
+        self.segments = [_Segment(self.directory / _segment_name(number))
+                         for number in _segment_numbers(self.directory)]
+        self._by_url = None
+
+    def __len__(self) -> int:
+        return sum(segment.count for segment in self.segments)
+
+    def entries(self, since: float = None, until: float = None) -> Iterator[Tuple[_Segment, tuple]]:
+        """(segment, index entry) pairs fetched in [since, until), oldest first."""
+        for segment in self.segments:
+            if not segment.count:
+                continue
+            if since is not None and segment.entry(segment.count - 1)[0] < since:
+                continue
+            if until is not None and segment.entry(0)[0] >= until:
+                break
+            first = segment.first_at_or_after(since) if since is not None else 0
+            last = segment.first_at_or_after(until) if until is not None else segment.count
+            for i in range(first, last):
+                yield segment, segment.entry(i)
+
+    def read(self, segment: _Segment, entry: tuple) -> ArchivedPage:
+        fetched_at, _, offset, length = entry
+        url, body = _split_payload(self._decompressor.decompress(segment.frame(offset, length)))
+        return ArchivedPage(url, fetched_at, body)
+
+    def pages(self, since: float = None, until: float = None,
+              url_prefix: str = "") -> Iterator[ArchivedPage]:
+        for segment, entry in self.entries(since, until):
+            page = self.read(segment, entry)
+            if page.url.startswith(url_prefix):
+                yield page
+
+    @log_usage()
+    def latest(self, url: str) -> Optional[ArchivedPage]:
+        """The most recent copy of `url`, if it was ever archived."""
+        if self._by_url is None:
+            self._by_url = {}
+            for segment, entry in self.entries():
+                self._by_url[entry[1]] = (segment, entry)
+        located = self._by_url.get(url_key(url))
+        if located is None:
+            return None
+        page = self.read(*located)
+        return page if page.url == url else None
+
+    @log_usage()
+    def close(self) -> None:
+        for segment in self.segments:
+            segment.close()
+
+
+class ArchivingFetcher(FetcherInterface):
+    """Fetcher wrapper that archives every page body it fetches before handing it on."""
+    def __init__(self, fetcher: FetcherInterface, archive: PageArchiveWriter):
+        self.fetcher = fetcher
+        self.archive = archive
+        self._owns_archive = True
+
+    @property
+    def url_builder(self) -> Callable[[int], str]:
+        return self.fetcher.url_builder
+
+    def with_url_builder(self, url_builder: Callable[[int], str]) -> "ArchivingFetcher":
+        """Sibling fetcher (e.g. another tag) writing to the same archive."""
+        sibling = ArchivingFetcher(self.fetcher.with_url_builder(url_builder), self.archive)
+        sibling._owns_archive = False
+        return sibling
+
+    def fetch(self, page: int) -> Optional[str]:
+        return self._archive(page, self.fetcher.fetch(page))
+
+    async def fetch_async(self, page: int) -> Optional[str]:
+        return self._archive(page, await self.fetcher.fetch_async(page))
+
+    def _archive(self, page: int, body: Optional[str]) -> Optional[str]:
+        # Falsy for failures and PAGE_UNCHANGED: an unchanged page was archived when it last changed.
+        if body:
+            self.archive.append(self.fetcher.url_builder(page), body)
+        return body
+
+    async def close(self) -> None:
+        await self.fetcher.close()
+        if self._owns_archive:
+            self.archive.close()
+        else:
+            await asyncio.to_thread(self.archive.flush)
+
+
+_worker_archive = {}
+_worker_parser = None
+
+
+def _init_reparse_worker(backend: str, base_url: str, parse_constants: dict):
+    global _worker_parser
+    _worker_parser = build_parser(backend, base_url=base_url, notifier=Notifier(),
+                                  parse_constants=ParsConstants(**parse_constants))
+
+
+def _reparse_chunk(path: str, entries: List[tuple], url_prefix: str) -> List[tuple]:
+    # Workers map the segment themselves; only offsets go in and tuples come out.
+    segment = _worker_archive.get(path)
+    if segment is None:
+        segment = _worker_archive[path] = (_map(Path(path)), zstandard.ZstdDecompressor())
+    data, decompressor = segment
+    results = []
+    for fetched_at, _, offset, length in entries:
+        url, body = _split_payload(decompressor.decompress(data[offset:offset + length]))
+        if url.startswith(url_prefix):
+            results.append((url, fetched_at, [q.as_tuple() for q in _worker_parser.parse(body)]))
+    return results
+
+
+def _chunks(archive: PageArchive, since, until, chunk_pages: int):
+    chunk, chunk_path = [], None
+    for segment, entry in archive.entries(since, until):
+        if chunk and (segment.path != chunk_path or len(chunk) >= chunk_pages):
+            yield str(chunk_path), chunk
+            chunk = []
+        chunk_path = segment.path
+        chunk.append(entry)
+    if chunk:
+        yield str(chunk_path), chunk
+
+
+@log_usage()
+def reparse(archive: PageArchive, backend: str, base_url: str, parse_constants: ParsConstants,
+            workers: int = None, since: float = None, until: float = None, url_prefix: str = "",
+            chunk_pages: int = 64) -> Iterator[Tuple[str, float, List[QuestionRecord]]]:
+    """
+    Run archived pages back through a parser backend: (url, fetched_at,
+    questions) per page, in fetch order. Chunks of `chunk_pages` index
+    entries go to a pool of `workers` processes (0 parses in-process) that
+    read the pages straight from the segment files; at most a few chunks
+    per worker are in flight, so memory stays flat however big the archive.
+    """
+    initargs = (backend, base_url, parse_constants.model_dump())
+    chunks = _chunks(archive, since, until, chunk_pages)
+    if workers == 0:
+        _init_reparse_worker(*initargs)
+        results = (_reparse_chunk(path, entries, url_prefix) for path, entries in chunks)
+        yield from _to_questions(results)
+        return
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_reparse_worker,
+                             initargs=initargs) as executor:
+        pending = deque()
+        for path, entries in chunks:
+            pending.append(executor.submit(_reparse_chunk, path, entries, url_prefix))
+            if len(pending) >= workers * 4:
+                yield from _to_questions([pending.popleft().result()])
+        while pending:
+            yield from _to_questions([pending.popleft().result()])
+
+
+def _to_questions(chunk_results):
+    for results in chunk_results:
+        for url, fetched_at, records in results:
+            yield url, fetched_at, [QuestionRecord(*record) for record in records]
@@ -0,0 +1,86 @@
+# parse_pool.py
+
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+from .interfaces import ParserInterface
+from .parser import build_parser
+from .notification_handler import Notifier
+from .tracedecorator import log_usage
+from . import metrics
+# Questions cross the process boundary as plain tuples in QUESTION_FIELDS order.
+from models import QuestionRecord, ParsConstants
+
+_worker_parser = None
+
+
+def _init_worker(backend: str, base_url: str, parse_constants: dict):
+    global _worker_parser
+    _worker_parser = build_parser(backend, base_url=base_url, notifier=Notifier(),
+                                  parse_constants=ParsConstants(**parse_constants))
+
+
+def _warm_up() -> int:
+    # Touch the parser once so imports and selector compilation happen at startup.
+    _worker_parser.parse("<html><body></body></html>")
+    return os.getpid()
+
+
+def _parse_records(html: str) -> List[tuple]:
+    return [q.as_tuple() for q in _worker_parser.parse(html)]
+
+
+class ProcessPoolParser(ParserInterface):
+    """
+    Parse stage that ships raw HTML to a pool of worker processes so parsing
+    is not bound to the event loop thread (and the GIL).
+    """
+    @log_usage()
+    def __init__(self, backend: str, base_url: str,
+                 parse_constants: ParsConstants, workers: int = None):
+        self.backend = backend
+        self.base_url = base_url
+        self.parse_constants = parse_constants
+        self.workers = workers or os.cpu_count() or 1
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    @log_usage()
+    def start(self) -> None:
+        """Spawn the workers and wait until each one has built its parser."""
+        if self._executor is not None:
+            return
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(self.backend, self.base_url, self.parse_constants.model_dump()))
+        warm_up = [self._executor.submit(_warm_up) for _ in range(self.workers)]
+        for future in warm_up:
+            future.result()
+
+    @log_usage()
+    def parse(self, html: str) -> List[QuestionRecord]:
+        self.start()
+        start = time.perf_counter()
+        records = self._executor.submit(_parse_records, html).result()
+        metrics.record_parse(time.perf_counter() - start, len(records))
+        return self._to_questions(records)
+
+    @log_usage()
+    async def parse_async(self, html: str) -> List[QuestionRecord]:
+        self.start()
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        records = await loop.run_in_executor(self._executor, _parse_records, html)
+        metrics.record_parse(time.perf_counter() - start, len(records))
+        return self._to_questions(records)
+
+    def _to_questions(self, records):
+        return [QuestionRecord(*record) for record in records]
+
+    @log_usage()
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
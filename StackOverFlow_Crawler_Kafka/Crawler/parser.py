@@ -2,10 +2,12 @@
 
 from .interfaces import ParserInterface
 from bs4 import BeautifulSoup
-from models import Question, ParsConstants
+from models import QuestionRecord, ParsConstants
 from typing import List
 from .notification_handler import NotificationType, Notifier
 from .tracedecorator import log_usage
+from . import metrics
+import time
 
 
 class QuestionParserTemplateMethod(ParserInterface):
@@ -17,65 +19,172 @@ class QuestionParserTemplateMethod(ParserInterface):
         self.notifier = notifier or Notifier()
 
     @log_usage()
-    def parse(self, html: str) -> List[Question]:
-        soup = BeautifulSoup(html, "html.parser")
+    def parse(self, html: str) -> List[QuestionRecord]:
+        start = time.perf_counter()
+        results = self._parse_document(html)
+        metrics.record_parse(time.perf_counter() - start, len(results))
+        return results
+
+    def _parse_document(self, html: str) -> List[QuestionRecord]:
+        document = self._build_document(html)
         results = []
-        for q in soup.select(self.parse_constants.post_summary):
-            link_elem = q.select_one(self.parse_constants.post_title)
-            if not link_elem:
+        for q in self._select(document, self.parse_constants.post_summary):
+            link_elem = self._select_one(q, self.parse_constants.post_title)
+            if link_elem is None:
                 continue
             try:
                 qid = self._extract_questionID(link_elem)
             except (IndexError, ValueError) as e:
-                self.notifier.notify(NotificationType.QUESTION_PARSE_ERROR, qid=str(qid), e=e)
+                self.notifier.notify(NotificationType.QUESTION_PARSE_ERROR,
+                                     qid=str(self._attr(link_elem, 'href')), e=e)
                 continue
 
-            excerpt_elem = q.select_one(self.parse_constants.excerpt_elem)
-            timestamp_elem = q.select_one(self.parse_constants.timestamp_elem)
-            vote_elem = q.select_one(self.parse_constants.vote_elem)
-            answer_elem = q.select_one(self.parse_constants.answer_elem)
-            view_elem = q.select_one(self.parse_constants.view_elem)
-            item = Question(
-                id=qid,
-                title=self._extract_title(link_elem),
-                link=self._extract_link(link_elem),
-                excerpt=self._extract_excerpt(excerpt_elem),
-                tags=self._extract_questionTags(q),
-                timestamp=self._extract_timestamp(timestamp_elem),
-                votes=self._extract_votesCount(vote_elem),
-                answers=self._extracts_answersCount(answer_elem),
-                views=self._extract_viewsCount(view_elem)
+            excerpt_elem = self._select_one(q, self.parse_constants.excerpt_elem)
+            timestamp_elem = self._select_one(q, self.parse_constants.timestamp_elem)
+            vote_elem = self._select_one(q, self.parse_constants.vote_elem)
+            answer_elem = self._select_one(q, self.parse_constants.answer_elem)
+            view_elem = self._select_one(q, self.parse_constants.view_elem)
+            item = QuestionRecord(
+                qid,
+                self._extract_title(link_elem),
+                self._extract_link(link_elem),
+                self._extract_excerpt(excerpt_elem),
+                self._extract_questionTags(q),
+                self._extract_timestamp(timestamp_elem),
+                self._extract_votesCount(vote_elem),
+                self._extracts_answersCount(answer_elem),
+                self._extract_viewsCount(view_elem)
             )
             results.append(item)
         return results
 
+    # Primitive operations: the only steps a parsing backend has to provide.
+
+    def _build_document(self, html):
+        return BeautifulSoup(html, "html.parser")
+
+    def _select(self, node, selector):
+        return node.select(selector)
+
+    def _select_one(self, node, selector):
+        return node.select_one(selector)
+
+    def _text(self, elem):
+        return elem.text
+
+    def _attr(self, elem, name):
+        return elem.get(name)
+
     def _extract_questionID(self, link_elem):
-        return int(link_elem['href'].split('/')[2])
+        return int(self._attr(link_elem, 'href').split('/')[2])
 
     def _extract_title(self, link_elem):
-        return link_elem.text.strip()
+        return self._text(link_elem).strip()
 
     def _extract_link(self, link_elem):
-        return f"{self.base_url}{link_elem['href']}"
+        return f"{self.base_url}{self._attr(link_elem, 'href')}"
 
     def _extract_excerpt(self, excerpt_elem):
-        return excerpt_elem.text.strip() if excerpt_elem else ""
+        return self._text(excerpt_elem).strip() if excerpt_elem is not None else ""
 
     def _extract_timestamp(self, timestamp_elem):
-        return timestamp_elem['title'] if timestamp_elem and timestamp_elem.has_attr(
-            'title') else ""
+        title = self._attr(timestamp_elem, 'title') if timestamp_elem is not None else None
+        return title if title is not None else ""
 
     def _extract_questionTags(self, q):
-        return [tag.text.strip() for tag in q.select(".post-tag")]
+        return [self._text(tag).strip() for tag in self._select(q, self.parse_constants.tag_elem)]
 
     def _extract_viewsCount(self, view_elem):
-        return int(view_elem.text.strip().replace(',', '')
-                   ) if view_elem and view_elem.text.strip().replace(',', '').isdigit() else 0
+        return self._extract_count(view_elem, strip_commas=True)
 
     def _extracts_answersCount(self, answer_elem):
-        return int(answer_elem.text.strip()
-                   ) if answer_elem and answer_elem.text.strip().isdigit() else 0
+        return self._extract_count(answer_elem)
 
     def _extract_votesCount(self, vote_elem):
-        return int(vote_elem.text.strip()
-                   ) if vote_elem and vote_elem.text.strip().isdigit() else 0
+        return self._extract_count(vote_elem)
+
+    def _extract_count(self, elem, strip_commas=False):
+        if elem is None:
+            return 0
+        text = self._text(elem).strip()
+        if strip_commas:
+            text = text.replace(',', '')
+        return int(text) if text.isdigit() else 0
+
+
+class LxmlQuestionParser(QuestionParserTemplateMethod):
+    """
+    lxml backend; every selector in ParsConstants is compiled to XPath once.
+    lxml is imported here so the default bs4 backend does not need it.
+    """
+    @log_usage()
+    def __init__(self, base_url: str,
+                 notifier: Notifier, parse_constants: ParsConstants):
+        super().__init__(base_url, notifier, parse_constants)
+        import lxml.html
+        from lxml.cssselect import CSSSelector
+        self._document_fromstring = lxml.html.document_fromstring
+        self._compiled = {
+            selector: CSSSelector(selector, translator="html")
+            for selector in parse_constants.model_dump().values()
+        }
+
+    def _build_document(self, html):
+        return self._document_fromstring(html)
+
+    def _select(self, node, selector):
+        return self._compiled[selector](node)
+
+    def _select_one(self, node, selector):
+        matches = self._compiled[selector](node)
+        return matches[0] if matches else None
+
+    def _text(self, elem):
+        return elem.text_content()
+
+    def _attr(self, elem, name):
+        return elem.get(name)
+
+
+class SelectolaxQuestionParser(QuestionParserTemplateMethod):
+    """
+    selectolax (lexbor) backend, imported on first use like the lxml one.
+    """
+    @log_usage()
+    def __init__(self, base_url: str,
+                 notifier: Notifier, parse_constants: ParsConstants):
+        super().__init__(base_url, notifier, parse_constants)
+        from selectolax.lexbor import LexborHTMLParser
+        self._html_parser = LexborHTMLParser
+
+    def _build_document(self, html):
+        return self._html_parser(html)
+
+    def _select(self, node, selector):
+        return node.css(selector)
+
+    def _select_one(self, node, selector):
+        return node.css_first(selector)
+
+    def _text(self, elem):
+        return elem.text(deep=True)
+
+    def _attr(self, elem, name):
+        return elem.attributes.get(name)
+
+
+PARSER_BACKENDS = {
+    "bs4": QuestionParserTemplateMethod,
+    "lxml": LxmlQuestionParser,
+    "selectolax": SelectolaxQuestionParser,
+}
+
+
+def build_parser(backend: str, base_url: str, notifier: Notifier,
+                 parse_constants: ParsConstants) -> QuestionParserTemplateMethod:
+    try:
+        parser_cls = PARSER_BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown parser backend '{backend}', "
+                         f"expected one of {sorted(PARSER_BACKENDS)}")
+    return parser_cls(base_url=base_url, notifier=notifier, parse_constants=parse_constants)
@@ -0,0 +1,111 @@
+# scheduler.py
+
+import json
+import logging
+import random
+import time
+from collections import deque, namedtuple
+from datetime import datetime, timezone
+from typing import List, Optional
+from models import Question
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+PollDecision = namedtuple(
+    "PollDecision", ["at", "new_questions", "arrival_rate", "interval", "reason"])
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%SZ"
+
+
+def _parse_timestamp(value: str) -> Optional[float]:
+    try:
+        return datetime.strptime(value, TIMESTAMP_FORMAT).replace(tzinfo=timezone.utc).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptivePollScheduler:
+    """
+    Picks the next poll interval from the observed question arrival rate.
+
+    Arrival times come from the `timestamp` of new questions (ordered and
+    de-duplicated by id); when they are missing, the per-cycle count over the
+    elapsed time is used. The interval aims to see `target_fill` of a page per
+    poll, is halved when a page comes back full of new questions, backs off
+    on empty cycles, and is always clamped to [min_interval, max_interval]
+    with random jitter.
+    """
+    def __init__(self, min_interval: float, max_interval: float,
+                 initial_interval: float = None, page_size: int = 50,
+                 target_fill: float = 0.5, backoff: float = 1.5,
+                 jitter: float = 0.1, window: int = 200,
+                 history: int = 500, decision_log: str = None):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = self._clamp(initial_interval or min_interval)
+        self.page_size = page_size
+        self.target_fill = target_fill
+        self.backoff = backoff
+        self.jitter = jitter
+        self.decision_log = decision_log
+        self.decisions = deque(maxlen=history)
+        self._arrivals = deque(maxlen=window)
+        self._last_id = 0
+        self._last_cycle = None
+
+    def observe(self, new_questions: List[Question]) -> float:
+        """Record one poll cycle and return how long to sleep before the next one."""
+        now = time.time()
+        elapsed = now - self._last_cycle if self._last_cycle else None
+        self._last_cycle = now
+        self._record_arrivals(new_questions)
+        rate = self.arrival_rate(len(new_questions), elapsed)
+
+        if len(new_questions) >= self.page_size:
+            interval, reason = self.interval / 2, "page_full"
+        elif not new_questions:
+            interval, reason = self.interval * self.backoff, "empty"
+        elif rate:
+            interval, reason = self.target_fill * self.page_size / rate, "rate"
+        else:
+            interval, reason = self.interval, "hold"
+
+        self.interval = self._clamp(interval)
+        sleep_for = self._clamp(self.interval * random.uniform(1 - self.jitter, 1 + self.jitter))
+        self._record_decision(PollDecision(now, len(new_questions), rate, sleep_for, reason))
+        return sleep_for
+
+    def arrival_rate(self, new_count: int = 0, elapsed: float = None) -> Optional[float]:
+        """Questions per second over the arrival window, or for the last cycle."""
+        if len(self._arrivals) >= 2:
+            span = self._arrivals[-1][0] - self._arrivals[0][0]
+            if span > 0:
+                return (len(self._arrivals) - 1) / span
+        if elapsed:
+            return new_count / elapsed
+        return None
+
+    def _record_arrivals(self, new_questions):
+        fresh = sorted((q for q in new_questions if q.id > self._last_id), key=lambda q: q.id)
+        for question in fresh:
+            arrived = _parse_timestamp(question.timestamp)
+            if arrived is not None:
+                self._arrivals.append((arrived, question.id))
+        if fresh:
+            self._last_id = fresh[-1].id
+        # Keep the window ordered by time even if ids and timestamps disagree slightly.
+        if fresh and len(self._arrivals) > 1:
+            self._arrivals = deque(sorted(self._arrivals), maxlen=self._arrivals.maxlen)
+
+    def _record_decision(self, decision: PollDecision):
+        self.decisions.append(decision)
+        metrics.POLL_INTERVAL_SECONDS.set(decision.interval)
+        logger.info(f"Next poll in {decision.interval:.1f}s ({decision.reason}, "
+                    f"{decision.new_questions} new, rate={decision.arrival_rate})")
+        if self.decision_log:
+            with open(self.decision_log, "a") as f:
+                f.write(json.dumps(decision._asdict()) + "\n")
+
+    def _clamp(self, interval: float) -> float:
+        return max(self.min_interval, min(self.max_interval, interval))
@@ -1,9 +1,11 @@
 # scraper.py
 
-from .interfaces import ScraperInterface, FetcherInterface, ParserInterface
+from .interfaces import ScraperInterface, FetcherInterface, ParserInterface, PAGE_UNCHANGED
 from models import Question
 from typing import List, Optional, Callable
 import logging
+import asyncio
+from collections import deque
 from .notification_handler import NotificationType, Notifier
 from .tracedecorator import log_usage
 
@@ -14,10 +16,13 @@ class StackOverflowScraperFacade(ScraperInterface):
     @log_usage()
     def __init__(self, fetcher: FetcherInterface,
                  parser: ParserInterface, max_questions: int,
-                 notifier: Notifier):
+                 notifier: Notifier, concurrency: int = 1,
+                 page_size_hint: int = 50):
         self.fetcher = fetcher
         self.parser = parser
         self.max_questions = max_questions
+        self.concurrency = max(1, concurrency)
+        self.page_size_hint = max(1, page_size_hint)
         self.notifier = self._generate_notifier(notifier)
 
     def _generate_notifier(self, notifier):
@@ -25,32 +30,107 @@ class StackOverflowScraperFacade(ScraperInterface):
 
     @log_usage()
     def scrape(self, max_questions: int = None,
-               stop_condition: Optional[Callable[[Question], bool]] = None) -> List[Question]:
+               stop_condition: Optional[Callable[[Question], bool]] = None,
+               on_known: Optional[Callable[[List[Question]], None]] = None) -> List[Question]:
         questions = []
         page = 1
         limit = self._read_max_questions_limit(max_questions)
 
         while len(questions) < limit:
             html = self.fetcher.fetch(page)
-
-            if not html:
-                self.notifier.notify(NotificationType.NO_HTML_PARSED)
+            parsed = self.parser.parse(html) if html else None
+            page_questions, more = self._accept_page(html, parsed, stop_condition, on_known)
+            questions.extend(page_questions)
+            if not more:
                 break
 
-            page_questions = self.parser.parse(html)
-            if not page_questions:
-                self.notifier.notify(NotificationType.NO_QUESTIONS_PARSED)
-                break
+            page += 1
+
+        return questions[:limit]
 
-            if stop_condition:
-                page_questions = [q for q in page_questions if not stop_condition(q)]
-                if not page_questions:
+    @log_usage()
+    async def scrape_async(self, max_questions: int = None,
+                           stop_condition: Optional[Callable[[Question], bool]] = None,
+                           on_known: Optional[Callable[[List[Question]], None]] = None
+                           ) -> List[Question]:
+        """
+        Keep up to `concurrency` pages in flight (fetch followed by parse) and
+        consume them in page order while later ones are still downloading.
+        With a stop_condition the window starts at one page and doubles with
+        every page that is entirely new, so a quiet cycle costs a single fetch.
+        """
+        questions = []
+        next_page = 1
+        page_size = self.page_size_hint
+        limit = self._read_max_questions_limit(max_questions)
+        window = 1 if stop_condition else self.concurrency
+        in_flight = deque()
+
+        try:
+            while len(questions) < limit:
+                needed = self._pages_needed(limit - len(questions), page_size)
+                next_page = self._fill_window(in_flight, next_page, min(window, needed))
+                html, parsed = await in_flight.popleft()
+                page_questions, more = self._accept_page(html, parsed, stop_condition, on_known)
+                questions.extend(page_questions)
+                if not more:
                     break
 
-            questions.extend(page_questions)
-            page += 1
+                page_size = len(page_questions)
+                window = min(window * 2, self.concurrency)
+        finally:
+            await self._cancel_in_flight(in_flight)
 
         return questions[:limit]
 
+    def _pages_needed(self, remaining, page_size):
+        # Never schedule pages that the limit would throw away anyway.
+        return min(self.concurrency, max(1, -(-remaining // page_size)))
+
+    def _fill_window(self, in_flight, next_page, window):
+        while len(in_flight) < window:
+            in_flight.append(asyncio.ensure_future(self._fetch_and_parse(next_page)))
+            next_page += 1
+        return next_page
+
+    async def _fetch_and_parse(self, page):
+        html = await self.fetcher.fetch_async(page)
+        return html, (await self.parser.parse_async(html) if html else None)
+
+    async def _cancel_in_flight(self, in_flight):
+        for task in in_flight:
+            task.cancel()
+        await asyncio.gather(*in_flight, return_exceptions=True)
+        in_flight.clear()
+
+    def _accept_page(self, html, page_questions, stop_condition, on_known=None):
+        """
+        Filter one parsed page. Returns the questions to keep and whether
+        scraping should continue with the next page.
+        """
+        if html is PAGE_UNCHANGED:
+            # Nothing on this page changed since the last fetch: stop without parsing.
+            return [], False
+
+        if not html:
+            self.notifier.notify(NotificationType.NO_HTML_PARSED)
+            return [], False
+
+        if not page_questions:
+            self.notifier.notify(NotificationType.NO_QUESTIONS_PARSED)
+            return [], False
+
+        if stop_condition:
+            kept, known = [], []
+            for q in page_questions:
+                (known if stop_condition(q) else kept).append(q)
+            if known and on_known:
+                on_known(known)
+            # Once a page reaches a question that meets the stop condition,
+            # later pages cannot hold anything we still need.
+            return kept, len(kept) == len(page_questions)
+
+        return page_questions, True
+
     def _read_max_questions_limit(self, max_questions):
         return max_questions if max_questions is not None else self.max_questions
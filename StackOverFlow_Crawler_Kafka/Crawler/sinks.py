@@ -0,0 +1,218 @@
+# sinks.py
+
+import asyncio
+import sys
+from pathlib import Path
+from typing import List
+from models import Question, question_json
+from .alerts import AlertRuleEngine
+from .display import QuestionDisplay
+from .interfaces import DisplayInterface, SinkInterface
+from .notification_handler import NotificationType, Notifier
+from .tracedecorator import log_usage
+from . import metrics
+
+
+class ConsoleSink(SinkInterface):
+    name = "console"
+
+    async def write(self, questions: List[Question]) -> None:
+        sys.stdout.write(QuestionDisplay.format(questions))
+        sys.stdout.flush()
+
+
+class PostgresSink(SinkInterface):
+    """Hands batches to a PostgresAdapter or, preferably, a WriteBehindBuffer (journaled)."""
+    name = "postgres"
+    durable = True
+
+    def __init__(self, db_writer):
+        self.db_writer = db_writer
+
+    async def write(self, questions: List[Question]) -> None:
+        await self.db_writer.insert_questions(questions)
+
+    async def refresh(self, questions: List[Question]) -> None:
+        # The upsert only rewrites rows whose counters moved, and samples them into the history.
+        await self.db_writer.insert_questions(questions)
+
+
+class JsonlFileSink(SinkInterface):
+    """Appends one JSON object per question to a local file."""
+    name = "jsonl"
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+    async def write(self, questions: List[Question]) -> None:
+        lines = b"".join(question_json(q) + b"\n" for q in questions)
+        await asyncio.to_thread(self._append, lines)
+
+    def _append(self, lines: bytes):
+        with open(self.path, "ab") as f:
+            f.write(lines)
+
+
+class KafkaSink(SinkInterface):
+    """
+    Hands batches to a KafkaQuestionSink or, preferably, a WriteBehindBuffer
+    in front of it (journaled), so a broker outage does not stall polling.
+    """
+    name = "kafka"
+    durable = True
+
+    def __init__(self, kafka_writer):
+        self.kafka_writer = kafka_writer
+
+    async def write(self, questions: List[Question]) -> None:
+        await self.kafka_writer.insert_questions(questions)
+
+
+class AlertSink(SinkInterface):
+    """Matches new questions against the alert rules; each match becomes an ALERT_MATCHED event."""
+    name = "alerts"
+
+    def __init__(self, engine: AlertRuleEngine, notifier: Notifier = None):
+        self.engine = engine
+        self.notifier = notifier or Notifier()
+
+    async def write(self, questions: List[Question]) -> None:
+        if self.engine.reload_due():
+            # Compiling thousands of rules is kept off the event loop.
+            await asyncio.to_thread(self.engine.reload_if_changed)
+        for rule, question in self.engine.evaluate(questions):
+            self.notifier.notify(NotificationType.ALERT_MATCHED, rule=rule.name,
+                                 question_id=question.id, title=question.title,
+                                 link=question.link)
+
+
+class _SinkMetrics:
+    def __init__(self, name: str):
+        prefix = f"crawler_sink_{name}"
+        self.queue_depth = metrics.REGISTRY.gauge(
+            f"{prefix}_queue_depth", f"Questions waiting for the {name} sink.")
+        self.written = metrics.REGISTRY.counter(
+            f"{prefix}_written_total", f"Questions delivered by the {name} sink.")
+        self.dropped = metrics.REGISTRY.counter(
+            f"{prefix}_dropped_total", f"Questions dropped because the {name} queue was full.")
+        self.failures = metrics.REGISTRY.counter(
+            f"{prefix}_failures_total", f"Batches the {name} sink failed to write.")
+        self.write_seconds = metrics.REGISTRY.histogram(
+            f"{prefix}_write_seconds", f"Batch write latency of the {name} sink.")
+
+
+class _SinkWorker:
+    """One sink's bounded queue and the task that drains it in batches."""
+    def __init__(self, sink: SinkInterface, notifier: Notifier,
+                 queue_size: int, batch_size: int):
+        self.sink = sink
+        self.notifier = notifier
+        self.batch_size = batch_size
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.metrics = _SinkMetrics(sink.name)
+        self.task = None
+
+    def offer(self, questions: List[Question]) -> None:
+        dropped = 0
+        for question in questions:
+            if self.queue.full():
+                # Shed the oldest question rather than block the poll loop.
+                self.queue.get_nowait()
+                self.queue.task_done()
+                dropped += 1
+            self.queue.put_nowait(question)
+        if dropped:
+            self.metrics.dropped.inc(dropped)
+            self.notifier.notify(NotificationType.SINK_OVERFLOW, sink=self.sink.name, dropped=dropped)
+        self.metrics.queue_depth.set(self.queue.qsize())
+
+    async def write(self, batch: List[Question]) -> None:
+        try:
+            with self.metrics.write_seconds.time():
+                await self.sink.write(batch)
+            self.metrics.written.inc(len(batch))
+        except Exception as e:
+            self.metrics.failures.inc()
+            self.notifier.notify(NotificationType.SINK_FAILED, sink=self.sink.name,
+                                 count=len(batch), e=str(e))
+            raise
+
+    async def run(self):
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < self.batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            try:
+                await self.write(batch)
+            except Exception:
+                pass  # A broken best-effort sink loses its batch; the other sinks are unaffected.
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+                self.metrics.queue_depth.set(self.queue.qsize())
+
+
+class FanOutDisplay(DisplayInterface):
+    """
+    Fans every batch of new questions out to several sinks.
+
+    Best-effort sinks (console, jsonl, alerts) each have their own bounded
+    queue (oldest questions are dropped when it is full), batch size and
+    drain task, so a slow or failing one cannot hold up polling or the
+    other sinks.
+
+    Durable sinks (postgres, kafka) are never queued: `display_async`
+    writes the batch to them directly and only returns once all of them
+    accepted it (once their write-behind journal has it), so the watcher
+    persists its watermark only past questions that are safe. Only then
+    is the batch queued for the best-effort sinks, so a batch the watcher
+    will poll again after a durable failure is not shown twice.
+    """
+    @log_usage()
+    def __init__(self, sinks: List[SinkInterface], notifier: Notifier = None,
+                 queue_size: int = 10000, batch_size: int = 500):
+        self.notifier = notifier or Notifier()
+        self.workers = [_SinkWorker(sink, self.notifier, queue_size, batch_size) for sink in sinks]
+        self._queued = [worker for worker in self.workers if not worker.sink.durable]
+        self._durable = [worker for worker in self.workers if worker.sink.durable]
+
+    @log_usage()
+    async def start(self) -> None:
+        for worker in self._queued:
+            worker.task = asyncio.create_task(worker.run(), name=f"sink-{worker.sink.name}")
+
+    def display(self, questions: List[Question]) -> None:
+        """Queue the batch for the best-effort sinks only; see display_async."""
+        for worker in self._queued:
+            worker.offer(questions)
+
+    async def display_async(self, questions: List[Question]) -> None:
+        results = await asyncio.gather(*(worker.write(questions) for worker in self._durable),
+                                       return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+        self.display(questions)
+
+    async def refresh_async(self, questions: List[Question]) -> None:
+        results = await asyncio.gather(*(worker.sink.refresh(questions) for worker in self.workers),
+                                       return_exceptions=True)
+        for worker, result in zip(self.workers, results):
+            if isinstance(result, Exception):
+                self.notifier.notify(NotificationType.SINK_FAILED, sink=worker.sink.name,
+                                     count=len(questions), e=str(result))
+
+    @log_usage()
+    async def close(self, timeout: float = 10.0) -> None:
+        """Give every queued sink up to `timeout` seconds to drain, then stop and close them all."""
+        drains = [worker.queue.join() for worker in self._queued]
+        try:
+            await asyncio.wait_for(asyncio.gather(*drains), timeout)
+        except asyncio.TimeoutError:
+            pass
+        for worker in self._queued:
+            if worker.task:
+                worker.task.cancel()
+        await asyncio.gather(*(w.task for w in self._queued if w.task), return_exceptions=True)
+        for worker in self.workers:
+            await worker.sink.close()
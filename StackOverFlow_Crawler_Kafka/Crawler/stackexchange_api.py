@@ -0,0 +1,268 @@
+# stackexchange_api.py
+
+import asyncio
+import html
+import json
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, List, Optional
+from urllib.parse import urlencode
+from models import QuestionRecord
+from .fetcher import AsyncFetcherStrategy
+from .interfaces import ParserInterface
+from .notification_handler import NotificationType, Notifier
+from .tracedecorator import log_usage
+from . import metrics
+
+API_BASE_URL = "https://api.stackexchange.com/2.3"
+
+# What a fetcher serves for pages past the last one (`has_more` was false).
+NO_MORE_PAGES = '{"items":[],"has_more":false}'
+
+_CREATION_DATE_PATTERN = re.compile(r'"creation_date":\s*(\d+)')
+# QuestionRecord.timestamp, as StackExchangeApiParser formats creation_date.
+_TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%SZ"
+_TAG_PATTERN = re.compile(r"<[^>]+>")
+
+
+def api_url_builder(tag: str, site: str = "stackoverflow", page_size: int = 100,
+                    key: str = "", api_filter: str = "default",
+                    base_url: str = API_BASE_URL) -> Callable[[int], str]:
+    """URL builder for /questions tagged `tag`, newest first."""
+    query = {"order": "desc", "sort": "creation", "tagged": tag, "site": site,
+             "pagesize": page_size, "filter": api_filter}
+    if key:
+        query["key"] = key
+    prefix = f"{base_url}/questions?{urlencode(query)}"
+    return lambda p: f"{prefix}&page={p}"
+
+
+def _wrapper_fields(body: str) -> dict:
+    # The wrapper's scalar fields (has_more, quota_*, backoff) follow the
+    # items array, so only that tail is decoded; the parser decodes the items.
+    tail = body[body.rfind("]") + 1:].lstrip(",")
+    try:
+        fields = json.loads("{" + tail)
+    except ValueError:
+        fields = {}
+    if "has_more" not in fields:
+        fields = json.loads(body)
+    if not isinstance(fields, dict):
+        raise ValueError("not a response wrapper")
+    return fields
+
+
+def _creation_date(timestamp: str) -> Optional[int]:
+    try:
+        parsed = datetime.strptime(timestamp, _TIMESTAMP_FORMAT)
+    except ValueError:
+        return None
+    return int(parsed.replace(tzinfo=timezone.utc).timestamp())
+
+
+class ApiBudget:
+    """
+    Request budget shared by every fetcher of one API key: the time before
+    which the `backoff` the API asked for forbids new requests, and the
+    last reported quota.
+    """
+    def __init__(self):
+        self.not_before = 0.0
+        self.quota_remaining = None
+        self.quota_max = None
+        self._lock = threading.Lock()
+
+    def wait_time(self) -> float:
+        return max(0.0, self.not_before - time.monotonic())
+
+    def record(self, fields: dict) -> Optional[float]:
+        """Take the wrapper fields of a response; returns the backoff it asked for, if any."""
+        with self._lock:
+            self.quota_remaining = fields.get("quota_remaining", self.quota_remaining)
+            self.quota_max = fields.get("quota_max", self.quota_max)
+            backoff = fields.get("backoff")
+            if backoff:
+                self.not_before = max(self.not_before, time.monotonic() + backoff)
+            if self.quota_remaining == 0:
+                # The daily quota resets at midnight UTC.
+                now = datetime.now(timezone.utc)
+                midnight = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+                self.not_before = max(self.not_before,
+                                      time.monotonic() + (midnight - now).total_seconds())
+            return backoff
+
+
+class StackExchangeApiFetcher(AsyncFetcherStrategy):
+    """
+    Fetches listing pages from the StackExchange API (`/2.3/questions`)
+    instead of the HTML site. Pages are JSON documents of up to 100
+    questions, which StackExchangeApiParser maps onto QuestionRecords.
+
+    Paging is quota aware: every request honours the `backoff` of earlier
+    responses (shared through an ApiBudget), a wait longer than `max_wait`
+    (e.g. an exhausted daily quota) fails the fetch instead of stalling the
+    poll loop, and pages after one with `has_more: false` are answered
+    locally with an empty page.
+
+    With `use_fromdate`, page 1 of every cycle asks only for questions
+    created since the newest one committed so far (minus `fromdate_slack`
+    seconds), so quiet polls return almost nothing. `committed_timestamp`
+    reads that from the watcher's persisted state (WatcherState
+    .newest_timestamp), so the filter survives restarts and never skips
+    questions a failed emit still has to deliver; without it, the newest
+    question this fetcher has served is used.
+
+    A response that is not a JSON wrapper (e.g. an HTML error page from a
+    proxy) counts as a failed fetch.
+    """
+    @log_usage()
+    def __init__(self, headers: dict, url_builder: Callable[[int], str],
+                 retries: int = 3, delay: int = 2, notifier: Notifier = None,
+                 pool_size: int = 10, timeout: int = 10,
+                 budget: ApiBudget = None, max_wait: float = 60.0,
+                 use_fromdate: bool = True, fromdate_slack: int = 300):
+        super().__init__(headers, url_builder, retries=retries, delay=delay,
+                         notifier=notifier or Notifier(), pool_size=pool_size, timeout=timeout)
+        self.budget = budget or ApiBudget()
+        self.max_wait = max_wait
+        self.use_fromdate = use_fromdate
+        self.fromdate_slack = fromdate_slack
+        self.page_url = url_builder
+        self.url_builder = self._api_url
+        self.committed_timestamp: Optional[Callable[[], str]] = None
+        self._newest_creation = None
+        self._fromdate = None
+        self._last_page = None
+
+    def with_url_builder(self, url_builder: Callable[[int], str]) -> "StackExchangeApiFetcher":
+        """Sibling fetcher (e.g. another tag) sharing the connection pool and the API budget."""
+        sibling = super().with_url_builder(url_builder)
+        sibling.page_url = url_builder
+        sibling.url_builder = sibling._api_url
+        sibling.committed_timestamp = None
+        sibling._newest_creation = sibling._fromdate = sibling._last_page = None
+        return sibling
+
+    def _api_url(self, page: int) -> str:
+        url = self.page_url(page)
+        return f"{url}&fromdate={self._fromdate}" if self._fromdate else url
+
+    def _start_page(self, page: int) -> None:
+        if page == 1:
+            # A new cycle: move the date filter forward. Later pages of the
+            # cycle keep the same filter, so paging stays consistent.
+            self._last_page = None
+            if self.use_fromdate:
+                newest = self._newest_for_fromdate()
+                self._fromdate = newest - self.fromdate_slack if newest is not None else None
+
+    def _newest_for_fromdate(self) -> Optional[int]:
+        if self.committed_timestamp is not None:
+            return _creation_date(self.committed_timestamp())
+        return self._newest_creation
+
+    def _past_last_page(self, page: int) -> bool:
+        return self._last_page is not None and page > self._last_page
+
+    def _budget_wait(self) -> Optional[float]:
+        """Seconds to wait before the next request, or None if it is too long to wait."""
+        wait = self.budget.wait_time()
+        if wait > self.max_wait:
+            self.notifier.notify(NotificationType.API_QUOTA_EXHAUSTED, wait=wait,
+                                 quota_remaining=self.budget.quota_remaining)
+            return None
+        return wait
+
+    @log_usage()
+    def fetch(self, page: int) -> Optional[str]:
+        self._start_page(page)
+        if self._past_last_page(page):
+            return NO_MORE_PAGES
+        wait = self._budget_wait()
+        if wait is None:
+            return None
+        time.sleep(wait)
+        return self._inspect(page, super().fetch(page))
+
+    @log_usage()
+    async def fetch_async(self, page: int) -> Optional[str]:
+        self._start_page(page)
+        if self._past_last_page(page):
+            return NO_MORE_PAGES
+        wait = self._budget_wait()
+        if wait is None:
+            return None
+        await asyncio.sleep(wait)
+        return self._inspect(page, await super().fetch_async(page))
+
+    def _inspect(self, page: int, body: Optional[str]) -> Optional[str]:
+        if not body:
+            return body
+        try:
+            fields = _wrapper_fields(body)
+        except ValueError as e:
+            metrics.FETCH_FAILURES.inc()
+            self.notifier.notify(NotificationType.FETCH_FAILED, retries=1,
+                                 e=f"page {page}: not a JSON API response ({e})")
+            return None
+        backoff = self.budget.record(fields)
+        if self.budget.quota_remaining is not None:
+            metrics.API_QUOTA_REMAINING.set(self.budget.quota_remaining)
+        if backoff:
+            self.notifier.notify(NotificationType.API_BACKOFF, seconds=backoff)
+        if not fields.get("has_more", False):
+            self._last_page = page if self._last_page is None else min(self._last_page, page)
+        dates = _CREATION_DATE_PATTERN.findall(body)
+        if dates:
+            newest = max(map(int, dates))
+            self._newest_creation = max(newest, self._newest_creation or 0)
+        return body
+
+
+class StackExchangeApiParser(ParserInterface):
+    """
+    Maps `/2.3/questions` items onto QuestionRecords with the same values
+    the HTML parsers produce. The API has no excerpt field: with a filter
+    that includes `body` (e.g. `withbody`) the excerpt is cut from it,
+    otherwise it is left empty.
+    """
+    @log_usage()
+    def __init__(self, notifier: Notifier = None, excerpt_length: int = 200):
+        self.notifier = notifier or Notifier()
+        self.excerpt_length = excerpt_length
+
+    @log_usage()
+    def parse(self, document: str) -> List[QuestionRecord]:
+        start = time.perf_counter()
+        results = []
+        for item in json.loads(document).get("items", ()):
+            try:
+                results.append(self._record(item))
+            except (KeyError, TypeError, ValueError) as e:
+                self.notifier.notify(NotificationType.QUESTION_PARSE_ERROR,
+                                     qid=str(item.get("question_id")), e=str(e))
+        metrics.record_parse(time.perf_counter() - start, len(results))
+        return results
+
+    def _record(self, item: dict) -> QuestionRecord:
+        return QuestionRecord(
+            int(item["question_id"]),
+            html.unescape(item["title"]),
+            item["link"],
+            self._excerpt(item.get("body")),
+            item.get("tags", ()),
+            datetime.fromtimestamp(item["creation_date"], timezone.utc).strftime("%Y-%m-%d %H:%M:%SZ"),
+            item.get("score", 0),
+            item.get("answer_count", 0),
+            item.get("view_count", 0),
+        )
+
+    def _excerpt(self, body: Optional[str]) -> str:
+        if not body:
+            return ""
+        text = " ".join(html.unescape(_TAG_PATTERN.sub(" ", body)).split())
+        if len(text) <= self.excerpt_length:
+            return text
+        return text[:self.excerpt_length].rstrip() + "…"
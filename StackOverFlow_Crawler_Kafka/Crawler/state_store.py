@@ -0,0 +1,318 @@
+# state_store.py
+
+import json
+import os
+import sqlite3
+import tempfile
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterable, List, Optional
+import asyncpg
+from models import BackfillPartition, WatcherState
+from .coordination import LEASE_SCHEMA
+from .interfaces import StateStoreInterface
+from .tracedecorator import log_usage
+
+
+class StateStoreError(Exception):
+    """A remote state store failed or refused a commit."""
+
+
+class SeenWindow:
+    """
+    Bounded window of the most recently seen question ids. Ids that fall out
+    of the window raise `floor`; anything at or below the floor counts as seen.
+    """
+    def __init__(self, capacity: int, floor: int = 0, ids: Iterable[int] = ()):
+        self.capacity = capacity
+        self.floor = floor
+        self._order = deque()
+        self._ids = set()
+        for question_id in sorted(ids):
+            self.add(question_id)
+
+    def __contains__(self, question_id: int) -> bool:
+        return question_id <= self.floor or question_id in self._ids
+
+    def __iter__(self):
+        return iter(self._order)
+
+    def __len__(self):
+        return len(self._order)
+
+    def add(self, question_id: int) -> bool:
+        """Add an id; returns False if it was already seen."""
+        if question_id in self:
+            return False
+        self._ids.add(question_id)
+        self._order.append(question_id)
+        while len(self._order) > self.capacity:
+            evicted = self._order.popleft()
+            self._ids.discard(evicted)
+            self.floor = max(self.floor, evicted)
+        return True
+
+
+class FileStateStore(StateStoreInterface):
+    """
+    JSON state file replaced atomically (write to a temp file, fsync, rename).
+    Also reads the legacy format, a bare last-seen id.
+    """
+    @log_usage()
+    def __init__(self, storage_path: Path):
+        self.storage_path = Path(storage_path)
+
+    @log_usage()
+    def load(self, key: str) -> Optional[WatcherState]:
+        if not self.storage_path.exists():
+            return None
+        content = self.storage_path.read_text().strip()
+        if content.isdigit():
+            last_id = int(content)
+            return WatcherState(last_id=last_id, floor=last_id)
+        return WatcherState(**json.loads(content))
+
+    @log_usage()
+    def commit(self, key: str, state: WatcherState, added: List[int]) -> None:
+        directory = self.storage_path.parent
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{self.storage_path.name}.")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(state.model_dump_json())
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.storage_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+
+class _SQLiteStore:
+    """Autocommit SQLite connection in WAL mode with explicit write transactions."""
+    schema = ""
+
+    @log_usage()
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.schema)
+
+    @contextmanager
+    def _transaction(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.conn
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    @log_usage()
+    def close(self) -> None:
+        self.conn.close()
+
+
+class SQLiteStateStore(_SQLiteStore, StateStoreInterface):
+    """
+    Watermarks and seen-id windows in a SQLite database in WAL mode; every
+    commit is a single transaction.
+    """
+    schema = '''
+        CREATE TABLE IF NOT EXISTS watermarks (
+            key TEXT PRIMARY KEY,
+            last_id INTEGER NOT NULL,
+            floor INTEGER NOT NULL,
+            newest_timestamp TEXT NOT NULL DEFAULT '',
+            updated_at REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS seen_ids (
+            key TEXT NOT NULL,
+            id INTEGER NOT NULL,
+            PRIMARY KEY (key, id)
+        ) WITHOUT ROWID;
+    '''
+
+    @log_usage()
+    def __init__(self, db_path: str):
+        super().__init__(db_path)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(watermarks)")}
+        if "newest_timestamp" not in columns:
+            # Databases created before the column was added
+            self.conn.execute("ALTER TABLE watermarks ADD COLUMN newest_timestamp TEXT NOT NULL DEFAULT ''")
+
+    @log_usage()
+    def load(self, key: str) -> Optional[WatcherState]:
+        row = self.conn.execute(
+            "SELECT last_id, floor, newest_timestamp FROM watermarks WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        seen = [r[0] for r in self.conn.execute(
+            "SELECT id FROM seen_ids WHERE key = ? AND id > ? ORDER BY id", (key, row[1]))]
+        return WatcherState(last_id=row[0], floor=row[1], seen=seen, newest_timestamp=row[2])
+
+    @log_usage()
+    def commit(self, key: str, state: WatcherState, added: List[int]) -> None:
+        with self._transaction() as conn:
+            conn.execute('''
+                INSERT INTO watermarks (key, last_id, floor, newest_timestamp, updated_at)
+                VALUES (?, ?, ?, ?, julianday('now'))
+                ON CONFLICT (key) DO UPDATE SET
+                    last_id = excluded.last_id,
+                    floor = excluded.floor,
+                    newest_timestamp = excluded.newest_timestamp,
+                    updated_at = excluded.updated_at
+            ''', (key, state.last_id, state.floor, state.newest_timestamp))
+            conn.executemany("INSERT OR IGNORE INTO seen_ids (key, id) VALUES (?, ?)",
+                             [(key, question_id) for question_id in added])
+            conn.execute("DELETE FROM seen_ids WHERE key = ? AND id <= ?", (key, state.floor))
+
+
+class SQLiteBackfillCheckpoints(_SQLiteStore):
+    """
+    Per-partition progress of backfill jobs. A partition's `next_page` is
+    only advanced after that page's questions were handed to the writer.
+    """
+    schema = '''
+        CREATE TABLE IF NOT EXISTS backfill_partitions (
+            job TEXT NOT NULL,
+            first_page INTEGER NOT NULL,
+            last_page INTEGER NOT NULL,
+            next_page INTEGER NOT NULL,
+            done INTEGER NOT NULL DEFAULT 0,
+            questions INTEGER NOT NULL DEFAULT 0,
+            updated_at REAL NOT NULL,
+            PRIMARY KEY (job, first_page)
+        );
+    '''
+
+    @log_usage()
+    def load(self, job: str) -> List[BackfillPartition]:
+        rows = self.conn.execute('''
+            SELECT first_page, last_page, next_page, done, questions
+            FROM backfill_partitions WHERE job = ? ORDER BY first_page
+        ''', (job,))
+        return [BackfillPartition(first_page=r[0], last_page=r[1], next_page=r[2],
+                                  done=bool(r[3]), questions=r[4]) for r in rows]
+
+    @log_usage()
+    def save(self, job: str, partitions: List[BackfillPartition]) -> None:
+        with self._transaction() as conn:
+            conn.executemany('''
+                INSERT INTO backfill_partitions
+                    (job, first_page, last_page, next_page, done, questions, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, julianday('now'))
+                ON CONFLICT (job, first_page) DO UPDATE SET
+                    last_page = excluded.last_page,
+                    next_page = excluded.next_page,
+                    done = excluded.done,
+                    questions = excluded.questions,
+                    updated_at = excluded.updated_at
+            ''', [(job, p.first_page, p.last_page, p.next_page, int(p.done), p.questions)
+                  for p in partitions])
+
+
+class PostgresStateStore(StateStoreInterface):
+    """
+    Watermarks and seen-id windows shared by every crawler replica, in the
+    Postgres database they already write questions to. Watermarks only move
+    forward. With a `lease_owner`, a commit for a key is only accepted while
+    that owner holds the key's lease in `crawler_leases`, so a replica that
+    lost a tag to another one cannot overwrite the new owner's progress.
+
+    Runs on the crawler's event loop with the PostgresAdapter's pool. A
+    blocking call cannot wait for that loop from inside it, so `init` reads
+    the committed state of `keys` up front and `load` (watcher construction)
+    returns that snapshot; from then on state moves through `load_async` and
+    `commit_async`, and `commit` raises StateStoreError.
+    """
+    schema = LEASE_SCHEMA + '''
+        CREATE TABLE IF NOT EXISTS crawler_watermarks (
+            key TEXT PRIMARY KEY,
+            last_id BIGINT NOT NULL,
+            floor BIGINT NOT NULL,
+            updated_by TEXT,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        );
+        ALTER TABLE crawler_watermarks ADD COLUMN IF NOT EXISTS newest_timestamp TEXT NOT NULL DEFAULT '';
+        CREATE TABLE IF NOT EXISTS crawler_seen_ids (
+            key TEXT NOT NULL,
+            id BIGINT NOT NULL,
+            PRIMARY KEY (key, id)
+        );
+    '''
+
+    @log_usage()
+    def __init__(self, db_adapter, lease_owner: str = None):
+        self.db_adapter = db_adapter
+        self.lease_owner = lease_owner
+        self._initial = {}
+
+    @log_usage()
+    async def init(self, keys: Iterable[str] = ()) -> None:
+        async with self.db_adapter.pool.acquire() as conn:
+            await conn.execute(self.schema)
+        for key in keys:
+            self._initial[key] = await self.load_async(key)
+
+    @log_usage()
+    def load(self, key: str) -> Optional[WatcherState]:
+        return self._initial.get(key)
+
+    @log_usage()
+    def commit(self, key: str, state: WatcherState, added: List[int]) -> None:
+        raise StateStoreError("PostgresStateStore only commits asynchronously (commit_async)")
+
+    @log_usage()
+    async def load_async(self, key: str) -> Optional[WatcherState]:
+        try:
+            async with self.db_adapter.pool.acquire() as conn:
+                row = await conn.fetchrow(
+                    "SELECT last_id, floor, newest_timestamp FROM crawler_watermarks WHERE key = $1", key)
+                if row is None:
+                    return None
+                seen = await conn.fetch(
+                    "SELECT id FROM crawler_seen_ids WHERE key = $1 AND id > $2 ORDER BY id",
+                    key, row["floor"])
+        except asyncpg.PostgresError as e:
+            raise StateStoreError(str(e)) from e
+        return WatcherState(last_id=row["last_id"], floor=row["floor"], seen=[r["id"] for r in seen],
+                            newest_timestamp=row["newest_timestamp"])
+
+    @log_usage()
+    async def commit_async(self, key: str, state: WatcherState, added: List[int]) -> None:
+        try:
+            async with self.db_adapter.pool.acquire() as conn:
+                async with conn.transaction():
+                    accepted = await conn.fetchval('''
+                        INSERT INTO crawler_watermarks (key, last_id, floor, updated_by, newest_timestamp)
+                        SELECT $1, $2, $3, $4, $5
+                        WHERE $4::text IS NULL OR EXISTS (
+                            SELECT 1 FROM crawler_leases
+                            WHERE unit = $1 AND owner = $4 AND expires_at > now())
+                        ON CONFLICT (key) DO UPDATE SET
+                            last_id = GREATEST(crawler_watermarks.last_id, EXCLUDED.last_id),
+                            floor = GREATEST(crawler_watermarks.floor, EXCLUDED.floor),
+                            newest_timestamp = GREATEST(crawler_watermarks.newest_timestamp,
+                                                        EXCLUDED.newest_timestamp),
+                            updated_by = EXCLUDED.updated_by,
+                            updated_at = now()
+                        RETURNING key
+                    ''', key, state.last_id, state.floor, self.lease_owner, state.newest_timestamp)
+                    if accepted is None:
+                        raise StateStoreError(f"'{self.lease_owner}' no longer holds the lease on '{key}'")
+                    await conn.execute('''
+                        INSERT INTO crawler_seen_ids (key, id)
+                        SELECT $1, unnest($2::bigint[])
+                        ON CONFLICT DO NOTHING
+                    ''', key, added)
+                    await conn.execute("DELETE FROM crawler_seen_ids WHERE key = $1 AND id <= $2",
+                                       key, state.floor)
+        except asyncpg.PostgresError as e:
+            raise StateStoreError(str(e)) from e
+
+    def close(self) -> None:
+        pass  # The pool belongs to the adapter
@@ -1,45 +1,130 @@
 # stream.py
 
 from .interfaces import StreamInterface
+from collections import deque
+from contextlib import asynccontextmanager
 from itertools import islice, count
-from typing import Callable, Iterable, Optional
-from models import Question
+from typing import AsyncIterator, Callable, Iterable, List, Optional, Tuple
+from models import Question, QuestionRecord, as_question
+import asyncio
 import logging
 from .notification_handler import NotificationType, Notifier
 from .tracedecorator import log_usage
 logger = logging.getLogger(__name__)
 
 
+@asynccontextmanager
+async def aclosing(agen):
+    """contextlib.aclosing, which only exists from Python 3.10 on."""
+    try:
+        yield agen
+    finally:
+        await agen.aclose()
+
+
 class QuestionStreamIterator(StreamInterface):
+    """
+    Lazily streams questions page by page. Both variants stop at the first
+    page that cannot be fetched or holds no questions, at the first question
+    meeting `stop_condition`, or after `max_questions`.
+
+    The async variant keeps the next `prefetch` pages downloading and
+    parsing while the current one is consumed, and yields each question as
+    soon as its page is ready.
+    """
     @log_usage()
-    def __init__(self, fetcher, parser, max_questions=50, notifier: Notifier = Notifier):
+    def __init__(self, fetcher, parser, max_questions=50, notifier: Notifier = None,
+                 first_page: int = 1, last_page: Optional[int] = None, prefetch: int = 2):
         self.fetcher = fetcher
         self.parser = parser
         self.max_questions = max_questions
         self.notifier = notifier or Notifier()
+        self.first_page = first_page
+        self.last_page = last_page
+        self.prefetch = prefetch
 
     @log_usage()
     def stream(
         self,
         stop_condition: Optional[Callable[[Question], bool]] = None
     ) -> Iterable[Question]:
+        return islice(self._iterate(stop_condition), self.max_questions)
+
+    def _iterate(self, stop_condition=None):
         try:
-            page_generator = self._get_page_content_generator()
-            parsed_questions = self._parse_questions(page_generator, stop_condition)
-            return islice(parsed_questions, self.max_questions)
+            for page in self._get_page_content_generator():
+                if not page:
+                    return
+                questions = self.parser.parse(page)
+                if not questions:
+                    return
+                for q in questions:
+                    if stop_condition is not None and stop_condition(q):
+                        return
+                    # Stream consumers get full Question models; records stay internal.
+                    yield as_question(q)
         except Exception as e:
-            self.notifier.notify(NotificationType.STREAMING_ERROR, str(e))
-
-    @log_usage()
-    def _parse_questions(self, page_generator, stop_condition=None):
-        return (
-            q
-            for page in page_generator
-            if page
-            for q in self.parser.parse(page)
-            if stop_condition is None or not stop_condition(q)
-        )
+            self.notifier.notify(NotificationType.STREAMING_ERROR, e=str(e))
 
     @log_usage()
     def _get_page_content_generator(self):
-        return (self.fetcher.fetch(p) for p in count(1))
+        return (self.fetcher.fetch(p) for p in self._page_numbers())
+
+    def _page_numbers(self):
+        if self.last_page is None:
+            return count(self.first_page)
+        return range(self.first_page, self.last_page + 1)
+
+    async def pages_async(self) -> AsyncIterator[Tuple[int, List[QuestionRecord]]]:
+        """
+        Yield (page, questions) for every page from first_page to last_page,
+        fetching up to `prefetch` pages ahead; stops early at the first page
+        that could not be fetched.
+        """
+        pages = iter(self._page_numbers())
+        in_flight = deque()
+        try:
+            self._fill_window(in_flight, pages)
+            while in_flight:
+                page, task = in_flight.popleft()
+                self._fill_window(in_flight, pages)
+                questions = await task
+                if questions is None:
+                    return
+                yield page, questions
+        finally:
+            for _, task in in_flight:
+                task.cancel()
+            await asyncio.gather(*(task for _, task in in_flight), return_exceptions=True)
+
+    def _fill_window(self, in_flight, pages):
+        while len(in_flight) <= self.prefetch:
+            page = next(pages, None)
+            if page is None:
+                return
+            in_flight.append((page, asyncio.ensure_future(self._fetch_and_parse(page))))
+
+    async def _fetch_and_parse(self, page):
+        html = await self.fetcher.fetch_async(page)
+        return await self.parser.parse_async(html) if html else None
+
+    async def stream_async(
+        self,
+        stop_condition: Optional[Callable[[Question], bool]] = None
+    ) -> AsyncIterator[Question]:
+        emitted = 0
+        try:
+            # aclosing cancels the prefetched pages as soon as we stop early.
+            async with aclosing(self.pages_async()) as pages:
+                async for _, questions in pages:
+                    if not questions:
+                        return
+                    for q in questions:
+                        if stop_condition is not None and stop_condition(q):
+                            return
+                        yield as_question(q)
+                        emitted += 1
+                        if emitted >= self.max_questions:
+                            return
+        except Exception as e:
+            self.notifier.notify(NotificationType.STREAMING_ERROR, e=str(e))
@@ -1,49 +1,204 @@
 # tracedecorator.py
 
+import atexit
 import inspect
-from functools import wraps
-from datetime import datetime
 import os
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from functools import wraps
+
+TRACE_ENABLED = os.getenv("TRACE_ENABLED", "1") != "0"
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "10000"))
+TRACE_FLUSH_INTERVAL = float(os.getenv("TRACE_FLUSH_INTERVAL", "1.0"))
+TRACE_MAX_BYTES = int(os.getenv("TRACE_MAX_BYTES", str(10 * 1024 * 1024)))
+TRACE_BACKUP_COUNT = int(os.getenv("TRACE_BACKUP_COUNT", "3"))
+
+
+def _parse_sample_rates(spec: str) -> dict:
+    # "QuestionWatcher.watch=0.1,parse=0.5" -> {"QuestionWatcher.watch": 0.1, "parse": 0.5}
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, rate = item.partition("=")
+        rates[name.strip()] = float(rate)
+    return rates
+
+
+TRACE_SAMPLE_RATES = _parse_sample_rates(os.getenv("TRACE_SAMPLE_RATES", ""))
+
+
+class TraceWriter:
+    """
+    Background trace writer. Callers only append to a bounded ring buffer
+    (oldest entries are dropped when it is full); a daemon thread formats and
+    writes them in batches and rotates the file once it exceeds max_bytes.
+    """
+    def __init__(self, log_file: str, buffer_size: int = TRACE_BUFFER_SIZE,
+                 flush_interval: float = TRACE_FLUSH_INTERVAL,
+                 max_bytes: int = TRACE_MAX_BYTES,
+                 backup_count: int = TRACE_BACKUP_COUNT):
+        self.log_file = log_file
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._buffer = deque(maxlen=buffer_size)
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._ensure_trailing_newline()
+        self._thread = threading.Thread(target=self._run, name="trace-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, entry: tuple) -> None:
+        self._buffer.append(entry)
+
+    def _run(self):
+        while not self._stopped.wait(self.flush_interval):
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            lines = []
+            while self._buffer:
+                lines.append(_format_entry(self._buffer.popleft()))
+            if not lines:
+                return
+            with open(self.log_file, "a") as f:
+                f.write("\n".join(lines) + "\n")
+                size = f.tell()
+            if self.max_bytes and size >= self.max_bytes:
+                self._rotate()
+
+    def _rotate(self):
+        for i in range(self.backup_count - 1, 0, -1):
+            src = f"{self.log_file}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.log_file}.{i + 1}")
+        if self.backup_count > 0:
+            os.replace(self.log_file, f"{self.log_file}.1")
+        else:
+            os.remove(self.log_file)
+
+    def _ensure_trailing_newline(self):
+        # Ensure that the new log entries start on a new line
+        if os.path.exists(self.log_file):
+            with open(self.log_file, "rb+") as f:
+                f.seek(0, os.SEEK_END)
+                if f.tell() > 0:  # Only if the file is not empty
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        f.write(b"\n")
+
+    def close(self) -> None:
+        self._stopped.set()
+        self.flush()
+
+
+def _format_entry(entry):
+    timestamp, event, caller, qualname, detail = entry
+    line = f"{datetime.fromtimestamp(timestamp).isoformat()} | {event} {caller}.{qualname}"
+    if event == "ENTER":
+        return line + " |"
+    return f"{line} | {detail}" if detail else line
+
+
+_writers = {}
+_writers_lock = threading.Lock()
 
 
-def log_usage(log_file="usage.log"):
+def get_trace_writer(log_file: str) -> TraceWriter:
+    writer = _writers.get(log_file)
+    if writer is None:
+        with _writers_lock:
+            writer = _writers.get(log_file)
+            if writer is None:
+                writer = _writers[log_file] = TraceWriter(log_file)
+    return writer
+
+
+@atexit.register
+def flush_traces() -> None:
+    for writer in list(_writers.values()):
+        writer.close()
+
+
+def _reset_after_fork():
+    # Writer threads do not survive fork; children (e.g. parse workers) start fresh.
+    global _writers_lock
+    _writers.clear()
+    _writers_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _resolve_sample_rate(func, sample_rate):
+    if sample_rate is not None:
+        return sample_rate
+    for name in (func.__qualname__, func.__name__):
+        if name in TRACE_SAMPLE_RATES:
+            return TRACE_SAMPLE_RATES[name]
+    return TRACE_SAMPLE_RATES.get("*", 1.0)
+
+
+def log_usage(log_file="usage.log", sample_rate=None):
     def decorator(func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            current_time = datetime.now().isoformat()
+        rate = _resolve_sample_rate(func, sample_rate)
+        if not TRACE_ENABLED or rate <= 0:
+            # Disabled tracing leaves the function untouched: zero call overhead.
+            return func
+
+        qualname = func.__qualname__
+        now = time.time
+        sampled = (lambda: True) if rate >= 1 else (lambda: random.random() < rate)
+
+        def log(event, caller, detail=None):
+            get_trace_writer(log_file).write((now(), event, caller, qualname, detail))
+
+        def caller_of(args):
             # Determine caller name (using the class name or "Module")
-            caller = args[0].__class__.__name__ if args and hasattr(
-                args[0], '__class__') else "Module"
-            params = inspect.signature(func).bind(*args, **kwargs).arguments
-
-            def log(message):
-                # Ensure that the new log entry starts on a new line
-                if os.path.exists(log_file):
-                    with open(log_file, "rb+") as f:
-                        f.seek(0, os.SEEK_END)
-                        if f.tell() > 0:  # Only if the file is not empty
-                            f.seek(-1, os.SEEK_END)
-                            last_char = f.read(1)
-                            if last_char != b"\n":
-                                f.write(b"\n")
-                # Write the actual log message followed by a newline.
-                with open(log_file, "a") as f:
-                    f.write(message + "\n")
-
-            log(f"{current_time} | ENTER {caller}.{func.__qualname__} |"
-                # f"Params: {params}"
-                )
+            return args[0].__class__.__name__ if args else "Module"
 
+        if inspect.iscoroutinefunction(func):
+            # Coroutines are logged around the awaited body, not around the
+            # creation of the coroutine object.
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if not sampled():
+                    return await func(*args, **kwargs)
+                caller = caller_of(args)
+                log("ENTER", caller)
+                try:
+                    result = await func(*args, **kwargs)
+                except KeyboardInterrupt:
+                    log("INTERRUPTED", caller)
+                    raise
+                except Exception as e:
+                    log("ERROR", caller, f"{type(e).__name__}: {e}")
+                    raise
+
+                log("EXIT", caller)
+                return result
+
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not sampled():
+                return func(*args, **kwargs)
+            caller = caller_of(args)
+            log("ENTER", caller)
             try:
                 result = func(*args, **kwargs)
             except KeyboardInterrupt:
-                log(f"{datetime.now().isoformat()} | INTERRUPTED {caller}.{func.__qualname__}")
+                log("INTERRUPTED", caller)
                 raise
             except Exception as e:
-                log(f"{datetime.now().isoformat()} | ERROR {caller}.{func.__qualname__} | {type(e).__name__}: {e}")
+                log("ERROR", caller, f"{type(e).__name__}: {e}")
                 raise
 
-            log(f"{datetime.now().isoformat()} | EXIT {caller}.{func.__qualname__}")
+            log("EXIT", caller)
             return result
 
         return wrapper
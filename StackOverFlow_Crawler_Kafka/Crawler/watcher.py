@@ -1,85 +1,200 @@
 # watcher.py
 
-from .interfaces import WatcherInterface
+from abc import abstractmethod
+from .interfaces import WatcherInterface, StateStoreInterface
+from .state_store import FileStateStore, SeenWindow, StateStoreError
 from pathlib import Path
 from typing import List
-from models import Question
+from models import Question, WatcherState
+import sqlite3
 from .notification_handler import NotificationType, Notifier
 from .tracedecorator import log_usage
+from . import metrics
 import asyncio  # Added for async support
 
+STATE_ERRORS = (OSError, sqlite3.Error, StateStoreError)
 
-class QuestionWatcher(WatcherInterface):
+
+class PollingWatcher(WatcherInterface):
+    """
+    The poll loop shared by QuestionWatcher and MultiTagWatcher: poll,
+    emit the new questions, persist the watermark once the display took
+    them, refresh the counters of known ones, sleep. Subclasses provide
+    `_poll` and the state methods.
+    """
     @log_usage()
-    def __init__(self, storage_path: Path, notifier: Notifier):
-        self.storage_path = storage_path
-        self.last_id = self._load_state()
+    def __init__(self, notifier: Notifier):
         self.notifier = notifier or Notifier()
+        self.rescraped: List[Question] = []
+
+    @abstractmethod
+    async def _poll(self, scraper) -> List[Question]:
+        """Scrape, and return the new questions; known ones go to `self.rescraped`."""
+
+    @abstractmethod
+    async def restore_state(self) -> None:
+        """Fall back to the last committed state."""
+
+    @abstractmethod
+    async def persist_state_async(self) -> None:
+        """Commit the current state."""
 
     @log_usage()
-    def _load_state(self) -> int:
+    async def run(self, scraper, display, interval: int = 60,
+                  scheduler=None) -> None:  # Made async
+        self.notifier.notify(NotificationType.CRAWLER_STARTED)
         try:
-            return int(self.storage_path.read_text()) if self.storage_path.exists() else 0
-        except (ValueError, IOError) as e:
-            self.notifier.notify(NotificationType.STATE_LOADING_FAILURE, e)
-            return 0
+            await self._start_watching(scraper, display, interval, scheduler)  # Async call
+        except (KeyboardInterrupt, asyncio.CancelledError):
+            # A requested stop: keep what was seen so far and let it unwind.
+            self.notifier.notify(NotificationType.WATCHER_STOPPED, e="")
+            await self.persist_state_async()
+            raise
+        except Exception as e:
+            self.notifier.notify(NotificationType.WATCHER_STOPPED, e=str(e))
+            raise
 
     @log_usage()
-    def watch(self, questions: List[Question]) -> List[Question]:
-        new_questions = self._get_new_questions(questions)
+    async def _start_watching(self, scraper, display, interval, scheduler=None):  # Made async
+        while True:
+            new_questions = await self._poll(scraper)
+            await self._emit(new_questions, display)
+            await self._refresh(display)
+
+            # An adaptive scheduler picks the next interval from the arrival rate
+            await asyncio.sleep(scheduler.observe(new_questions) if scheduler else interval)
+
+    async def _emit(self, new_questions, display):
         if new_questions:
-            self.last_id = self._get_max_question_id(new_questions)
+            self.notifier.notify(
+                NotificationType.NEW_QUESTIONS,
+                count=len(new_questions)
+            )
+            sorted_questions = self._sorted_questions(new_questions)
+            try:
+                await display.display_async(sorted_questions)
+            except Exception:
+                # A durable output did not take the batch (already reported):
+                # fall back to the committed state so the next poll fetches it again.
+                await self.restore_state()
+                return
+
+            await self.persist_state_async()
+        else:
+            self.notifier.notify(NotificationType.NO_NEW_QUESTIONS)
+
+    async def _refresh(self, display):
+        if self.rescraped:
+            try:
+                await display.refresh_async(self.rescraped)
+            except Exception:
+                pass  # Counter updates are best effort; the failing sink reported it
+
+    @log_usage()
+    def _sorted_questions(self, new_questions):
+        return sorted(new_questions, key=lambda q: q.id)
+
+
+class QuestionWatcher(PollingWatcher):
+    @log_usage()
+    def __init__(self, storage_path: Path, notifier: Notifier,
+                 initial_limit: int = 50, max_backlog: int = 2000,
+                 state_store: StateStoreInterface = None, state_key: str = None,
+                 seen_window: int = 5000):
+        super().__init__(notifier)
+        self.storage_path = storage_path
+        self.state_store = state_store or FileStateStore(storage_path)
+        self.state_key = state_key or Path(storage_path).stem
+        state = self._load_state()
+        self.last_id = state.last_id
+        self.newest_timestamp = state.newest_timestamp
+        self.seen = SeenWindow(seen_window, floor=state.floor, ids=state.seen)
+        self._unpersisted_ids = []
+        self.initial_limit = initial_limit
+        self.max_backlog = max_backlog
+
+    @log_usage()
+    def _load_state(self) -> WatcherState:
+        try:
+            # A store without state for this key falls back to the legacy last-id file.
+            return (self.state_store.load(self.state_key)
+                    or FileStateStore(self.storage_path).load(self.state_key)
+                    or WatcherState())
+        except (ValueError,) + STATE_ERRORS as e:
+            self.notifier.notify(NotificationType.STATE_LOADING_FAILURE, e=str(e))
+            return WatcherState()
+
+    @log_usage()
+    def watch(self, questions: List[Question]) -> List[Question]:
+        with metrics.WATCH_SECONDS.time():
+            new_questions = self._get_new_questions(questions)
+            if new_questions:
+                self.last_id = self._get_max_question_id(new_questions)
+                self.newest_timestamp = max(self.newest_timestamp,
+                                            max(q.timestamp for q in new_questions))
+        metrics.NEW_QUESTIONS.inc(len(new_questions))
         return new_questions
 
     @log_usage()
     def _get_max_question_id(self, new_questions):
-        return max(q.id for q in new_questions) if new_questions else self.last_id
+        return max(self.last_id, max(q.id for q in new_questions)) if new_questions else self.last_id
 
     @log_usage()
     def _get_new_questions(self, questions):
-        return [q for q in questions if q.id > self.last_id]
+        # Exact dedupe against the seen window, so late or out-of-order
+        # questions below the watermark are still picked up.
+        new_questions = [q for q in questions if self.seen.add(q.id)]
+        self._unpersisted_ids.extend(q.id for q in new_questions)
+        return new_questions
 
     @log_usage()
-    def persist_state(self) -> None:
+    async def restore_state(self) -> None:
+        """Reload the stored state, e.g. after another replica has been watching this key."""
         try:
-            self.storage_path.write_text(str(self.last_id))
-        except IOError as e:
-            self.notifier.notify(NotificationType.STATE_PERSISTING_FAILURE, e)
+            state = await self.state_store.load_async(self.state_key) or WatcherState()
+        except STATE_ERRORS as e:
+            self.notifier.notify(NotificationType.STATE_LOADING_FAILURE, e=str(e))
+            return
+        self.last_id = state.last_id
+        self.newest_timestamp = state.newest_timestamp
+        self.seen = SeenWindow(self.seen.capacity, floor=state.floor, ids=state.seen)
+        self._unpersisted_ids = []
+
+    def _current_state(self) -> WatcherState:
+        return WatcherState(last_id=self.last_id, floor=self.seen.floor, seen=list(self.seen),
+                            newest_timestamp=self.newest_timestamp)
 
     @log_usage()
-    async def run(self, scraper, display, db_adapter=None, interval: int = 60) -> None:  # Made async
-        self.notifier.notify(NotificationType.CRAWLER_STARTED)
+    def persist_state(self) -> None:
         try:
-            await self._start_watching(scraper, display, db_adapter, interval)  # Async call
-        except KeyboardInterrupt:
-            self.notifier.notify(NotificationType.WATCHER_STOPPED, e=str(''))
-            self.persist_state()
-        except Exception as e:
-            self.notifier.notify(NotificationType.WATCHER_STOPPED, e=str(e))
+            self.state_store.commit(self.state_key, self._current_state(), self._unpersisted_ids)
+            self._unpersisted_ids = []
+        except STATE_ERRORS as e:
+            # The ids stay in _unpersisted_ids, so the next commit retries them.
+            self.notifier.notify(NotificationType.STATE_PERSISTING_FAILURE, e=str(e))
 
     @log_usage()
-    async def _start_watching(self, scraper, display, db_adapter, interval):  # Made async
-        while True:
-            questions = scraper.scrape(max_questions=50)
-            new_questions = self.watch(questions)
-
-            if new_questions:
-                self.notifier.notify(
-                    NotificationType.NEW_QUESTIONS,
-                    count=len(new_questions)
-                )
-                sorted_questions = self._sorted_questions(new_questions)
-                display.display(sorted_questions)
-
-                if db_adapter:
-                    await db_adapter.insert_questions(new_questions)  # Proper async call
+    async def persist_state_async(self) -> None:
+        try:
+            await self.state_store.commit_async(self.state_key, self._current_state(),
+                                                self._unpersisted_ids)
+            self._unpersisted_ids = []
+        except STATE_ERRORS as e:
+            self.notifier.notify(NotificationType.STATE_PERSISTING_FAILURE, e=str(e))
 
-                self.persist_state()
-            else:
-                self.notifier.notify(NotificationType.NO_NEW_QUESTIONS)
+    async def _poll(self, scraper) -> List[Question]:
+        # Known questions on the fetched pages are kept aside for their counters.
+        rescraped = []
+        questions = await scraper.scrape_async(max_questions=self._scrape_limit(),
+                                               stop_condition=self._is_known,
+                                               on_known=rescraped.extend)
+        self.rescraped = rescraped
+        return self.watch(questions)
 
-            await asyncio.sleep(interval)  # Replaced time.sleep with async version
+    def _is_known(self, question: Question) -> bool:
+        return question.id in self.seen
 
-    @log_usage()
-    def _sorted_questions(self, new_questions):
-        return sorted(new_questions, key=lambda q: q.id)
+    def _scrape_limit(self) -> int:
+        # Without a watermark there is nothing to page back to: take one batch.
+        # With one, the stop condition ends paging; max_backlog only guards runaways.
+        return self.max_backlog if self.last_id else self.initial_limit
@@ -0,0 +1,216 @@
+# write_behind.py
+
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from pathlib import Path
+from typing import Iterator, List
+from models import Question, QuestionRecord, question_json
+from .notification_handler import NotificationType, Notifier
+from .tracedecorator import log_usage
+from . import metrics
+
+
+class WriteBehindBuffer:
+    """
+    Write-behind queue between the watcher and Postgres (or any other
+    target with an async `insert_questions`, e.g. KafkaQuestionSink). Drop-in
+    for the target's `insert_questions`, which only appends the batch to a
+    local journal (fsynced) and queues it; a background task writes queued
+    questions once `max_batch` are waiting or the oldest is `max_age`
+    seconds old. `name` labels its metrics and notifications.
+
+    Every question hits the journal before `insert_questions` returns, so
+    nothing is lost across crashes or database outages:
+
+    - direct mode: batches come from memory; once the queue is drained the
+      journal is rotated to `<journal>.replay` and removed after the insert
+      succeeds.
+    - spill mode: entered when an insert fails or more than `max_pending`
+      questions are queued (backpressure). Memory is released and new
+      questions only go to the journal; the replay file is re-inserted with
+      exponential backoff and direct mode resumes once the journal is empty.
+
+    Upserts are idempotent, so replaying a partly written file is harmless;
+    Kafka consumers see a replayed batch again (at-least-once).
+    """
+    @log_usage()
+    def __init__(self, db_adapter, journal_path: Path, notifier: Notifier = None,
+                 max_batch: int = 500, max_age: float = 2.0, max_pending: int = 10000,
+                 retry_delay: float = 1.0, max_retry_delay: float = 60.0, name: str = "db"):
+        self.db_adapter = db_adapter
+        self.name = name
+        self._pending_gauge = metrics.REGISTRY.gauge(
+            f"crawler_{name}_write_behind_pending",
+            f"Questions queued in memory for the next {name} flush.")
+        self._journaled = metrics.REGISTRY.counter(
+            f"crawler_{name}_write_behind_journaled_total",
+            f"Questions appended to the {name} write-behind journal.")
+        self.journal_path = Path(journal_path)
+        self.replay_path = self.journal_path.with_name(self.journal_path.name + ".replay")
+        self.notifier = notifier or Notifier()
+        self.max_batch = max_batch
+        self.max_age = max_age
+        self.max_pending = max_pending
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self._pending = deque()
+        self._oldest_at = None
+        self._terminate_torn_line()
+        self._spilling = self._has_journal()
+        self._failures = 0
+        self._retry_at = 0.0
+        self._closing = False
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    @log_usage()
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    @log_usage()
+    async def insert_questions(self, questions: List[Question]) -> None:
+        """Journal and queue a batch; never waits on the database."""
+        if not questions:
+            return
+        self._append(self.journal_path, questions)
+        if self._spilling:
+            pass  # Already journaled; the replay picks it up
+        elif len(self._pending) + len(questions) > self.max_pending:
+            # Backpressure: drain from disk instead of growing the queue
+            self._enter_spill_mode()
+            self._retry_at = 0.0
+        else:
+            if not self._pending:
+                self._oldest_at = time.monotonic()
+            self._pending.extend(questions)
+        self._pending_gauge.set(len(self._pending))
+        self._wakeup.set()
+
+    @log_usage()
+    async def close(self) -> None:
+        """Flush what can be flushed; anything left stays in the journal for the next start."""
+        self._closing = True
+        self._wakeup.set()
+        if self._task:
+            await self._task
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await self._wait_for_work()
+            if self._spilling:
+                if time.monotonic() >= self._retry_at or self._closing:
+                    await self._replay()
+                if self._closing:
+                    return
+            elif self._pending:
+                await self._flush_batch()
+            elif self._closing:
+                return
+
+    async def _wait_for_work(self):
+        while not self._closing:
+            now = time.monotonic()
+            if self._spilling:
+                deadline = self._retry_at
+            elif len(self._pending) >= self.max_batch:
+                return
+            elif self._pending:
+                deadline = self._oldest_at + self.max_age
+            else:
+                deadline = None
+            if deadline is not None and now >= deadline:
+                return
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(),
+                                       None if deadline is None else deadline - now)
+            except asyncio.TimeoutError:
+                return
+
+    async def _flush_batch(self):
+        batch = [self._pending.popleft() for _ in range(min(self.max_batch, len(self._pending)))]
+        self._oldest_at = time.monotonic() if self._pending else None
+        if not self._pending:
+            # Everything journaled so far is either inserted or in this batch.
+            os.replace(self.journal_path, self.replay_path)
+        try:
+            await self.db_adapter.insert_questions(batch)
+        except Exception as e:
+            self.notifier.notify(NotificationType.DB_WRITE_DEFERRED, target=self.name,
+                                 count=len(batch) + len(self._pending), e=str(e),
+                                 retry_in=self._back_off())
+            self._enter_spill_mode()
+            return
+        if not self._pending:
+            self.replay_path.unlink(missing_ok=True)
+        self._pending_gauge.set(len(self._pending))
+
+    async def _replay(self):
+        """Re-insert journaled questions; returns to direct mode once the journal is empty."""
+        while self._has_journal():
+            if not self.replay_path.exists():
+                os.replace(self.journal_path, self.replay_path)
+            replayed = 0
+            try:
+                for batch in self._read_batches(self.replay_path):
+                    await self.db_adapter.insert_questions(batch)
+                    replayed += len(batch)
+            except Exception as e:
+                self.notifier.notify(NotificationType.DB_WRITE_DEFERRED, target=self.name,
+                                     e=str(e), retry_in=self._back_off())
+                return
+            self.replay_path.unlink()
+            self.notifier.notify(NotificationType.DB_SPILL_REPLAYED, target=self.name, count=replayed)
+        self._spilling = False
+        self._failures = 0
+        self._pending_gauge.set(len(self._pending))
+
+    def _enter_spill_mode(self):
+        # Queued questions are all in the journal or the replay file already.
+        self._pending.clear()
+        self._oldest_at = None
+        self._spilling = True
+        self._pending_gauge.set(0)
+
+    def _back_off(self) -> float:
+        self._failures += 1
+        delay = min(self.max_retry_delay, self.retry_delay * 2 ** (self._failures - 1))
+        self._retry_at = time.monotonic() + delay
+        return delay
+
+    def _terminate_torn_line(self):
+        # A crash mid-append leaves a partial last line; later appends must not extend it.
+        if self.journal_path.exists() and self.journal_path.stat().st_size > 0:
+            with open(self.journal_path, "rb+") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    f.write(b"\n")
+
+    def _has_journal(self) -> bool:
+        return self.replay_path.exists() or (
+            self.journal_path.exists() and self.journal_path.stat().st_size > 0)
+
+    def _append(self, path: Path, questions: List[Question]):
+        with open(path, "ab") as f:
+            f.write(b"".join(question_json(q) + b"\n" for q in questions))
+            f.flush()
+            os.fsync(f.fileno())
+        self._journaled.inc(len(questions))
+
+    def _read_batches(self, path: Path) -> Iterator[List[QuestionRecord]]:
+        batch = []
+        with open(path) as f:
+            for line in f:
+                try:
+                    batch.append(QuestionRecord(**json.loads(line)))
+                except (ValueError, TypeError):
+                    continue  # Torn last line from a crash mid-append
+                if len(batch) >= self.max_batch:
+                    yield batch
+                    batch = []
+        if batch:
+            yield batch
@@ -0,0 +1,355 @@
+# run_benchmarks.py
+"""
+Offline micro-benchmarks for the crawl hot paths.
+
+    python benchmarks/run_benchmarks.py --output bench.json
+    python benchmarks/run_benchmarks.py --compare bench.json
+
+Every benchmark runs against the checked-in listing pages and StackExchange
+API responses in fixtures/, so no network, Postgres or Kafka is needed.
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent))
+
+from Crawler.alerts import AlertRuleEngine  # noqa: E402
+from Crawler.db_adapter import PostgresAdapter  # noqa: E402
+from Crawler.event_bus import EventBus  # noqa: E402
+from Crawler.kafka_sink import InMemoryKafkaBroker, InMemoryKafkaProducer, KafkaQuestionSink  # noqa: E402
+from Crawler.notification_handler import ConsoleSubscriber, NotificationType, Notifier  # noqa: E402
+from Crawler.page_archive import PageArchive, PageArchiveWriter  # noqa: E402
+from Crawler.parser import PARSER_BACKENDS, build_parser  # noqa: E402
+from Crawler.stackexchange_api import StackExchangeApiParser  # noqa: E402
+from Crawler.state_store import SeenWindow  # noqa: E402
+from Crawler.tracedecorator import log_usage  # noqa: E402
+from Crawler.watcher import QuestionWatcher  # noqa: E402
+from models import AlertRule, ParsConstants, Question, QuestionRecord  # noqa: E402
+
+FIXTURES = BENCH_DIR / "fixtures"
+BASE_URL = "https://stackoverflow.com"
+
+
+def load_pages():
+    return [path.read_text() for path in sorted(FIXTURES.glob("tagged_python_page*.html"))]
+
+
+def measure(func, repeat, number):
+    """Run func `number` times per round for `repeat` rounds; report per-call seconds."""
+    rounds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        rounds.append((time.perf_counter() - start) / number)
+    return {
+        "min": min(rounds),
+        "median": statistics.median(rounds),
+        "mean": statistics.fmean(rounds),
+        "ops_per_sec": 1 / min(rounds) if min(rounds) else None,
+        "repeat": repeat,
+        "number": number,
+    }
+
+
+def bench_parse(pages, repeat):
+    results, reference = {}, None
+    for backend in PARSER_BACKENDS:
+        parser = build_parser(backend, BASE_URL, Notifier(), ParsConstants())
+        parsed = [parser.parse(html) for html in pages]
+        if reference is None:
+            reference = parsed
+        elif parsed != reference:
+            raise AssertionError(f"Parser backend '{backend}' disagrees with '{next(iter(PARSER_BACKENDS))}'")
+        results[f"parse[{backend}]"] = measure(
+            lambda: [parser.parse(html) for html in pages], repeat, number=3)
+    return results, [q for page in reference for q in page]
+
+
+def bench_api_parse(questions, repeat):
+    documents = [path.read_text() for path in sorted(FIXTURES.glob("api_questions_python_page*.json"))]
+    parser = StackExchangeApiParser(Notifier())
+    parsed = [q for document in documents for q in parser.parse(document)]
+    # The API has no excerpt without a body filter; everything else must match the HTML parse.
+    if [q.as_tuple()[:3] + q.as_tuple()[4:] for q in parsed] != \
+            [q.as_tuple()[:3] + q.as_tuple()[4:] for q in questions]:
+        raise AssertionError("API parser disagrees with the HTML parsers")
+    return {"parse[api-json]": measure(lambda: [parser.parse(d) for d in documents], repeat, number=3)}
+
+
+def bench_question_model(questions, repeat):
+    rows = [q.to_question().model_dump() for q in questions]
+    values = [q.as_tuple() for q in questions]
+    return {
+        "question_model": measure(lambda: [Question(**row) for row in rows], repeat, number=20),
+        "question_record": measure(lambda: [QuestionRecord(*v) for v in values], repeat, number=20),
+        "question_record.to_question": measure(
+            lambda: [q.to_question() for q in questions], repeat, number=20),
+        "question_model.model_dump_json": measure(
+            lambda: [q.to_question().model_dump_json() for q in questions], repeat, number=20),
+        "question_record.to_json": measure(
+            lambda: [q.to_json() for q in questions], repeat, number=20),
+    }
+
+
+def bench_watch(questions, repeat):
+    backlog = questions * 20
+    with tempfile.TemporaryDirectory() as tmp:
+        watcher = QuestionWatcher(Path(tmp) / "last_seen_id.txt", Notifier())
+        middle = sorted(q.id for q in backlog)[len(backlog) // 2]
+
+        def run():
+            watcher.last_id = middle
+            watcher.seen = SeenWindow(watcher.seen.capacity, floor=middle)
+            watcher.watch(backlog)
+
+        return {"watch_dedupe": measure(run, repeat, number=20)}
+
+
+class _Traced:
+    @log_usage()
+    def traced(self, value):
+        return value
+
+    def plain(self, value):
+        return value
+
+
+def bench_log_usage(repeat):
+    target = _Traced()
+    return {
+        "log_usage[traced]": measure(lambda: target.traced(1), repeat, number=10000),
+        "log_usage[plain]": measure(lambda: target.plain(1), repeat, number=10000),
+    }
+
+
+def bench_notify(repeat):
+    # The dispatch thread never wakes during the run, so `notify` is measured alone.
+    bus = EventBus(dispatch_interval=3600)
+    notifier = Notifier(bus)
+
+    def publish_and_flush():
+        for page in range(1000):
+            notifier.notify(NotificationType.PAGE_UNCHANGED, url=f"{BASE_URL}/?page={page % 10}")
+        bus.flush()
+
+    results = {"notify": measure(lambda: notifier.notify(NotificationType.PAGE_UNCHANGED, url=BASE_URL),
+                                 repeat, number=10000)}
+    bus.flush()
+    bus.subscribe(ConsoleSubscriber(), types=[NotificationType.PAGE_UNCHANGED])
+    results["event_bus.flush[1000 events]"] = measure(publish_and_flush, repeat, number=5)
+    bus.close()
+    return results
+
+
+def _alert_rules(questions, count, seed=7):
+    """`count` reproducible rules over the fixture vocabulary plus synthetic words that never match."""
+    rng = random.Random(seed)
+    words = sorted({w for q in questions for w in re.findall(r"[a-z][a-z0-9]{3,}", q.title.lower())})
+    words += [f"kw{i}" for i in range(len(words) * 20)]
+    tags = sorted({t for q in questions for t in q.tags}) + [f"tag{i}" for i in range(20000)]
+    rules = []
+    for i in range(count):
+        kind = rng.randrange(4)
+        rules.append(AlertRule(
+            name=f"rule-{i}",
+            keywords=rng.sample(words, rng.randint(1, 3)) if kind in (0, 1) else [],
+            tags_all=rng.sample(tags, rng.randint(1, 2)) if kind in (1, 2) else [],
+            tags_any=rng.sample(tags, rng.randint(1, 4)) if kind == 3 else [],
+            min_votes=rng.choice((None, 0, 1, 5)),
+        ))
+    return rules
+
+
+def _naive_alert_matches(rules, questions):
+    """One regex search per rule and question: the baseline the engine replaces."""
+    patterns = [[re.compile(rf"(?<!\w){re.escape(k.lower())}(?!\w)") for k in rule.keywords]
+                for rule in rules]
+    matches = []
+    for question in questions:
+        text = "\n".join(" ".join(field.lower().split()) for field in (question.title, question.excerpt))
+        tags = {tag.lower() for tag in question.tags}
+        for rule, keywords in zip(rules, patterns):
+            if (not keywords or any(p.search(text) for p in keywords)) \
+                    and {tag.lower() for tag in rule.tags_all} <= tags \
+                    and (not rule.tags_any or tags & {tag.lower() for tag in rule.tags_any}) \
+                    and (rule.min_votes is None or question.votes >= rule.min_votes) \
+                    and (rule.min_views is None or question.views >= rule.min_views):
+                matches.append((rule.name, question.id))
+    return matches
+
+
+def bench_alerts(questions, repeat):
+    questions = [q.to_question() for q in questions]
+    rules = _alert_rules(questions, 10000)
+    engine = AlertRuleEngine(notifier=Notifier())
+    engine.load_rules(rules)
+    matched = [(rule.name, question.id) for rule, question in engine.evaluate(questions)]
+    if matched != _naive_alert_matches(rules, questions):
+        raise AssertionError("Alert engine disagrees with the naive per-rule matcher")
+    return {
+        "alerts.compile[10k rules]": measure(lambda: engine.load_rules(rules), repeat, number=1),
+        "alerts.evaluate[10k rules]": measure(lambda: engine.evaluate(questions), repeat, number=20),
+        "alerts.naive[10k rules]": measure(
+            lambda: _naive_alert_matches(rules, questions), repeat, number=1),
+    }
+
+
+def bench_archive(pages, repeat):
+    with tempfile.TemporaryDirectory() as tmp:
+        writer = PageArchiveWriter(Path(tmp) / "archive")
+        urls = [f"{BASE_URL}/questions/tagged/python?page={i}" for i in range(500)]
+
+        def append_all():
+            for i, url in enumerate(urls):
+                writer.append(url, pages[i % len(pages)])
+            writer.flush()
+
+        results = {"archive.append[500 pages]": measure(append_all, repeat, number=1)}
+        writer.close()
+        archive = PageArchive(Path(tmp) / "archive")
+        if archive.latest(urls[1]).body != pages[1 % len(pages)]:
+            raise AssertionError("Archived page does not round-trip")
+        results["archive.scan[500 pages]"] = measure(
+            lambda: sum(len(page.body) for page in archive.pages()),
+            repeat, number=1)
+        archive.close()
+        return results
+
+
+class _StandInConnection:
+    """Minimal asyncpg connection stand-in: accepts statements and counts rows."""
+    def __init__(self):
+        self.rows = 0
+
+    @asynccontextmanager
+    async def transaction(self):
+        yield
+
+    async def executemany(self, query, args):
+        self.rows += len(list(args))
+
+    async def execute(self, query, *args):
+        return "OK"
+
+    async def copy_records_to_table(self, table_name, records, columns=None):
+        self.rows += len(list(records))
+
+
+class _StandInPool:
+    def __init__(self):
+        self.connection = _StandInConnection()
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield self.connection
+
+
+def bench_insert(questions, repeat):
+    batch = questions * 10
+    loop = asyncio.new_event_loop()
+    results = {}
+    try:
+        # Client-side cost only (record building, statement dispatch) for each path.
+        for mode, threshold in (("executemany", len(batch) + 1), ("copy", 0)):
+            adapter = PostgresAdapter(dsn="postgresql://stand-in", copy_threshold=threshold)
+            adapter.pool = _StandInPool()
+            results[f"insert_questions[stand-in,{mode}]"] = measure(
+                lambda: loop.run_until_complete(adapter.insert_questions(batch)), repeat, number=20)
+        return results
+    finally:
+        loop.close()
+
+
+def bench_kafka(questions, repeat):
+    batch = questions * 10
+    loop = asyncio.new_event_loop()
+    results = {}
+    try:
+        # Producer-side cost (serialize, batch, compress) against the in-memory broker;
+        # no linger, batches are cut by size.
+        for compression_type in ("none", "zstd", "lz4"):
+            broker = InMemoryKafkaBroker()
+            sink = KafkaQuestionSink(
+                "in-memory", "questions", notifier=Notifier(), linger_ms=0,
+                compression_type=None if compression_type == "none" else compression_type,
+                producer_factory=lambda **kw: InMemoryKafkaProducer(broker, **kw))
+            loop.run_until_complete(sink.start())
+            results[f"kafka.send_questions[in-memory,{compression_type}]"] = measure(
+                lambda: loop.run_until_complete(sink.send_questions(batch)), repeat, number=5)
+            loop.run_until_complete(sink.close())
+        return results
+    finally:
+        loop.close()
+
+
+def run_all(repeat):
+    pages = load_pages()
+    results, questions = bench_parse(pages, repeat)
+    results.update(bench_api_parse(questions, repeat))
+    results.update(bench_question_model(questions, repeat))
+    results.update(bench_watch(questions, repeat))
+    results.update(bench_log_usage(repeat))
+    results.update(bench_notify(repeat))
+    results.update(bench_alerts(questions, repeat))
+    results.update(bench_archive(pages, repeat))
+    results.update(bench_insert(questions, repeat))
+    results.update(bench_kafka(questions, repeat))
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, baseline_path):
+    baseline = json.loads(Path(baseline_path).read_text())["results"]
+    for name, result in current.items():
+        if name in baseline:
+            ratio = result["min"] / baseline[name]["min"]
+            print(f"{name:40s} {ratio:6.2f}x  ({baseline[name]['min'] * 1e6:10.1f}us -> "
+                  f"{result['min'] * 1e6:10.1f}us)")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--output", help="write results as JSON to this file")
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    arg_parser.add_argument("--compare", help="baseline JSON file to compare against")
+    args = arg_parser.parse_args()
+
+    results = run_all(args.repeat)
+    report = {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "results": results,
+    }
+    for name, result in results.items():
+        print(f"{name:40s} min {result['min'] * 1e6:10.1f}us  median {result['median'] * 1e6:10.1f}us")
+    if args.compare:
+        compare(results, args.compare)
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
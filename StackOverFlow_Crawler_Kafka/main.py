@@ -1,58 +1,408 @@
 # main.py
 
-from Crawler.fetcher import FetcherStrategy
-from Crawler.parser import QuestionParserTemplateMethod
+from Crawler.fetcher import (FetcherStrategy, AsyncFetcherStrategy, ConditionalPageCache,
+                             body_fingerprint, question_ids_fingerprint)
+from Crawler.parser import build_parser
+from Crawler.parse_pool import ProcessPoolParser
 from Crawler.scraper import StackOverflowScraperFacade
 from Crawler.watcher import QuestionWatcher
-from Crawler.display import QuestionDisplay
+from Crawler.multi_watcher import CoordinatedWatcher, MultiTagWatcher
+from Crawler.coordination import PostgresLeaseManager, default_replica_id
+from Crawler.sinks import (AlertSink, ConsoleSink, FanOutDisplay, JsonlFileSink, KafkaSink,
+                           PostgresSink)
+from Crawler.alerts import AlertRuleEngine
 from Crawler.notification_handler import Notifier
 from pathlib import Path
 from models import Constants, ParsConstants
+import argparse
 import os
 import asyncio  # Added for async main
 from Crawler.db_adapter import PostgresAdapter
+from Crawler.history_store import QuestionHistoryStore
+from Crawler.kafka_sink import KafkaQuestionSink
+from Crawler.write_behind import WriteBehindBuffer
+from Crawler.backfill import BackfillRunner, RateLimitedFetcher, RateLimiter
+from Crawler.metrics import start_metrics_server
+from Crawler.scheduler import AdaptivePollScheduler
+from Crawler.state_store import (FileStateStore, PostgresStateStore, SQLiteStateStore,
+                                 SQLiteBackfillCheckpoints)
+from Crawler.stackexchange_api import StackExchangeApiFetcher, StackExchangeApiParser, api_url_builder
+from Crawler.page_archive import ArchivingFetcher, PageArchive, PageArchiveWriter, reparse
+from datetime import datetime
+from urllib.parse import quote
 
 
-def initiate_kafka():
+def initiate_kafka(constants):
     print("✅ Starting crawler with config:")
     print(f"Kafka: {os.getenv('KAFKA_BOOTSTRAP_SERVERS')}")
     print(f"Topic: {os.getenv('KAFKA_TOPIC')}")
-    print(f"Interval: {os.getenv('SCRAPE_INTERVAL', '60')}s")
+    print(f"Interval: {constants.interval}s")
 
 
 async def main():  # Made async
-    initiate_kafka()
     constants = Constants()
+    initiate_kafka(constants)
     notifier_object = Notifier()
-    fetcher = FetcherStrategy(
-        headers={"User-Agent": constants.user_agent},
-        url_builder=_build_url(constants.base_url, constants.tag),
-        notifier=notifier_object,
-        retries=int(constants.interval),
-        delay=int(constants.delay)
-    )
-    parser = QuestionParserTemplateMethod(base_url=constants.base_url,
-                                          parse_constants=ParsConstants(),
-                                          notifier=notifier_object)
-    scraper = StackOverflowScraperFacade(fetcher, parser, notifier=notifier_object,
-                                         max_questions=int(constants.max_questions))
-    watcher = QuestionWatcher(storage_path=_get_storage_path(), notifier=notifier_object)
-    display = QuestionDisplay()
-
-    db_adapter = PostgresAdapter()
+    if int(constants.metrics_port):
+        start_metrics_server(int(constants.metrics_port))
+    tags = _read_tags(constants)
+    fetcher = _build_fetcher(constants, notifier_object)
+    parser = _build_parser(constants, notifier_object)
+    db_adapter = _build_db_adapter(constants)
     await db_adapter.init()  # Async init
+    state_store = await _build_state_store(constants, db_adapter, tags)
+    # One watermark and scraper per tag; all of them share the fetcher's connection pool
+    watchers = {
+        tag: QuestionWatcher(storage_path=_get_storage_path(tag), notifier=notifier_object,
+                             initial_limit=int(constants.max_questions),
+                             max_backlog=int(constants.max_backlog),
+                             state_store=state_store or FileStateStore(_get_storage_path(tag)),
+                             state_key=tag, seen_window=int(constants.seen_window))
+        for tag in tags
+    }
+    scrapers = {
+        tag: StackOverflowScraperFacade(
+            _tag_fetcher(constants, fetcher, tag, watchers[tag]), parser,
+            notifier=notifier_object,
+            max_questions=int(constants.max_questions),
+            concurrency=int(constants.fetch_concurrency),
+            page_size_hint=_page_size(constants))
+        for tag in tags
+    }
+    leases = await _build_leases(constants, db_adapter, notifier_object)
+    if leases:
+        # Replicas split the tags between them, even a single one (for failover)
+        watcher, scraper = CoordinatedWatcher(watchers, leases, notifier=notifier_object), scrapers
+    elif len(tags) == 1:
+        watcher, scraper = watchers[tags[0]], scrapers[tags[0]]
+    else:
+        watcher, scraper = MultiTagWatcher(watchers, notifier=notifier_object), scrapers
+
+    # The poll loop only hands questions to the write-behind buffer, never to Postgres directly
+    db_writer = _build_db_writer(constants, db_adapter, notifier_object, Path(constants.db_journal))
+    await db_writer.start()
+
+    kafka_sink = _build_kafka_sink(constants, notifier_object)
+    kafka_writer = None
+    if kafka_sink:
+        await kafka_sink.start()
+        # Journaled like Postgres, so a broker outage does not hold the watermark back
+        kafka_writer = _build_db_writer(constants, kafka_sink, notifier_object,
+                                        Path(constants.kafka_journal), name="kafka")
+        await kafka_writer.start()
+
+    # Best-effort outputs get their own queue; durable ones take each batch before the watermark moves
+    display = _build_output(constants, notifier_object, db_writer, kafka_writer)
+    await display.start()
 
     # Run the async watcher
-    await watcher.run(scraper, display, db_adapter=db_adapter, interval=int(constants.interval))
+    try:
+        await watcher.run(scraper, display, interval=int(constants.interval),
+                          scheduler=_build_scheduler(constants))
+    finally:
+        await display.close()
+        await fetcher.close()
+        parser.close()
+        if state_store:
+            state_store.close()
+        await db_writer.close()
+        if leases:
+            await leases.close()
+        await db_adapter.close()
+        if kafka_writer:
+            await kafka_writer.close()
+        if kafka_sink:
+            await kafka_sink.close()
+        notifier_object.flush()
+
+
+async def backfill(args):
+    constants = Constants()
+    notifier_object = Notifier()
+    # Backfill pages are crawled once and reach back in time: no conditional requests, no fromdate
+    fetcher = RateLimitedFetcher(
+        _build_fetcher(constants, notifier_object, conditional=False).with_url_builder(
+            _build_url(constants, args.tag)),
+        RateLimiter(args.rate, burst=args.workers))
+    parser = _build_parser(constants, notifier_object)
+    checkpoints = SQLiteBackfillCheckpoints(constants.state_db)
+
+    db_adapter = _build_db_adapter(constants)
+    await db_adapter.init()
+    journal = Path(constants.db_journal)
+    db_writer = _build_db_writer(constants, db_adapter, notifier_object,
+                                 journal.with_name(f"backfill_{journal.name}"))
+    await db_writer.start()
+    leases = await _build_leases(constants, db_adapter, notifier_object)
+    if leases:
+        leases.start()  # Keep partition leases alive while they are crawled
+
+    runner = BackfillRunner(args.job or f"{args.tag}:{args.first_page}-{args.last_page}",
+                            fetcher, parser, db_writer, checkpoints, notifier=notifier_object,
+                            first_page=args.first_page, last_page=args.last_page,
+                            partition_size=args.partition_size, workers=args.workers,
+                            prefetch=int(constants.stream_prefetch), leases=leases)
+    try:
+        partitions = await runner.run()
+        notifier_object.flush()  # Partition reports first, then the summary
+        done = sum(p.done for p in partitions)
+        print(f"Backfill finished {done}/{len(partitions)} partitions, "
+              f"{sum(p.questions for p in partitions)} questions")
+    finally:
+        await fetcher.close()
+        parser.close()
+        await db_writer.close()
+        if leases:
+            await leases.close()
+        await db_adapter.close()
+        checkpoints.close()
+        notifier_object.flush()
+
+
+async def reparse_archive(args):
+    constants = Constants()
+    notifier_object = Notifier()
+    if not (args.archive or constants.page_archive):
+        raise SystemExit("reparse needs --archive or PAGE_ARCHIVE")
+    archive = PageArchive(Path(args.archive or constants.page_archive))
+    pages = reparse(archive, constants.parser_backend, constants.base_url, ParsConstants(),
+                    workers=args.workers, since=_timestamp(args.since), until=_timestamp(args.until),
+                    url_prefix=constants.base_url if args.url_prefix is None else args.url_prefix)
+
+    # Straight to the adapter: the archive is the journal, and archived counters must not
+    # overwrite live ones (update_content leaves them alone)
+    db_adapter = _build_db_adapter(constants)
+    await db_adapter.init()
+    page_count = question_count = 0
+    try:
+        # Pages are parsed by worker processes; only the hand-off runs on the loop
+        while batch := await asyncio.to_thread(_next_pages, pages, 100):
+            questions = [q for _, _, page_questions in batch for q in page_questions]
+            await db_adapter.update_content(questions)
+            page_count += len(batch)
+            question_count += len(questions)
+        print(f"Reparsed {page_count} archived pages, {question_count} questions")
+    finally:
+        pages.close()
+        archive.close()
+        await db_adapter.close()
+        notifier_object.flush()
+
+
+def _next_pages(pages, count):
+    return [page for _, page in zip(range(count), pages)]
+
+
+def _timestamp(value):
+    return datetime.fromisoformat(value).timestamp() if value else None
+
+
+def _parse_args(argv=None):
+    arg_parser = argparse.ArgumentParser(description="StackOverflow question crawler")
+    commands = arg_parser.add_subparsers(dest="command")
+    commands.add_parser("watch", help="poll for new questions (default)")
+    backfill_parser = commands.add_parser(
+        "backfill", help="crawl a range of older listing pages into Postgres (resumable)")
+    backfill_parser.add_argument("--tag", default=Constants().tag)
+    backfill_parser.add_argument("--first-page", type=int, default=1)
+    backfill_parser.add_argument("--last-page", type=int, required=True)
+    backfill_parser.add_argument("--partition-size", type=int, default=20,
+                                 help="pages per checkpointed partition")
+    backfill_parser.add_argument("--workers", type=int, default=4)
+    backfill_parser.add_argument("--rate", type=float, default=1.0,
+                                 help="page requests per second shared by all workers")
+    backfill_parser.add_argument("--job", help="checkpoint key; defaults to <tag>:<first>-<last>")
+    reparse_parser = commands.add_parser(
+        "reparse", help="re-extract questions from the raw-page archive into Postgres (no network)")
+    reparse_parser.add_argument("--archive", help="archive directory; defaults to PAGE_ARCHIVE")
+    reparse_parser.add_argument("--since", help="first fetch time to replay (ISO 8601)")
+    reparse_parser.add_argument("--until", help="replay pages fetched before this time (ISO 8601)")
+    reparse_parser.add_argument("--url-prefix", help="only pages under this URL; defaults to BASE_URL")
+    reparse_parser.add_argument("--workers", type=int,
+                                help="parse processes (0 parses in-process); defaults to the CPU count")
+    return arg_parser.parse_args(argv)
+
+
+def _build_output(constants, notifier, db_writer, kafka_writer):
+    available = {
+        "console": ConsoleSink,
+        "postgres": lambda: PostgresSink(db_writer),
+        "jsonl": lambda: JsonlFileSink(Path(constants.sink_jsonl_path)),
+        "kafka": lambda: KafkaSink(kafka_writer) if kafka_writer else None,
+        "alerts": lambda: AlertSink(_build_alert_engine(constants, notifier), notifier),
+    }
+    names = [name.strip() for name in constants.output_sinks.split(",") if name.strip()]
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise ValueError(f"Unknown output sinks {unknown} in OUTPUT_SINKS, "
+                         f"expected any of {sorted(available)}")
+    sinks = [sink for sink in (available[name]() for name in names) if sink is not None]
+    return FanOutDisplay(sinks, notifier=notifier,
+                         queue_size=int(constants.sink_queue_size),
+                         batch_size=int(constants.sink_batch_size))
+
+
+def _build_alert_engine(constants, notifier):
+    engine = AlertRuleEngine(Path(constants.alert_rules), notifier=notifier,
+                             reload_interval=float(constants.alert_reload_interval))
+    engine.reload_if_changed()
+    return engine
+
+
+def _build_db_writer(constants, db_adapter, notifier, journal_path, name="db"):
+    return WriteBehindBuffer(db_adapter, journal_path=journal_path, notifier=notifier,
+                             max_batch=int(constants.db_batch_size),
+                             max_age=float(constants.db_batch_age),
+                             max_pending=int(constants.db_max_pending), name=name)
+
+
+def _build_scheduler(constants):
+    if constants.adaptive_polling == "0":
+        return None
+    return AdaptivePollScheduler(min_interval=float(constants.min_interval),
+                                 max_interval=float(constants.max_interval),
+                                 initial_interval=float(constants.interval),
+                                 page_size=int(constants.max_questions),
+                                 jitter=float(constants.poll_jitter),
+                                 decision_log=constants.poll_decision_log or None)
+
+
+async def _build_state_store(constants, db_adapter, tags):
+    if constants.coordination == "postgres" or constants.state_backend == "postgres":
+        # Coordinated replicas share the watermark; commits are fenced by the tag's lease
+        lease_owner = _replica_id(constants) if constants.coordination == "postgres" else None
+        state_store = PostgresStateStore(db_adapter, lease_owner=lease_owner)
+        await state_store.init(tags)  # The watchers' starting state
+        return state_store
+    # The file backend keeps one JSON file per tag, so it is built per watcher
+    if constants.state_backend == "file":
+        return None
+    return SQLiteStateStore(constants.state_db)
+
+
+async def _build_leases(constants, db_adapter, notifier):
+    if constants.coordination != "postgres":
+        return None
+    leases = PostgresLeaseManager(db_adapter, replica_id=_replica_id(constants),
+                                  ttl=float(constants.lease_ttl), notifier=notifier)
+    await leases.init()
+    return leases
+
+
+def _replica_id(constants):
+    return constants.replica_id or default_replica_id()
+
+
+def _build_db_adapter(constants):
+    history = None
+    if constants.db_history != "0":
+        history = QuestionHistoryStore(retention_days=int(constants.history_retention_days))
+    return PostgresAdapter(history=history)
+
+
+def _build_kafka_sink(constants, notifier):
+    bootstrap_servers = os.getenv('KAFKA_BOOTSTRAP_SERVERS')
+    if not bootstrap_servers:
+        return None
+    return KafkaQuestionSink(bootstrap_servers=bootstrap_servers,
+                             topic=os.getenv('KAFKA_TOPIC', 'stackoverflow_questions'),
+                             notifier=notifier,
+                             compression_type=constants.kafka_compression,
+                             linger_ms=int(constants.kafka_linger_ms),
+                             max_batch_size=int(constants.kafka_max_batch_bytes))
+
+
+def _build_fetcher(constants, notifier, conditional=True):
+    fetcher = _build_source_fetcher(constants, notifier, conditional)
+    if constants.page_archive:
+        archive = PageArchiveWriter(Path(constants.page_archive),
+                                    segment_bytes=int(constants.page_archive_segment_mb) << 20,
+                                    level=int(constants.page_archive_level), notifier=notifier)
+        return ArchivingFetcher(fetcher, archive)
+    return fetcher
+
+
+def _tag_fetcher(constants, fetcher, tag, watcher):
+    tag_fetcher = fetcher.with_url_builder(_build_url(constants, tag))
+    source = tag_fetcher.fetcher if isinstance(tag_fetcher, ArchivingFetcher) else tag_fetcher
+    if isinstance(source, StackExchangeApiFetcher):
+        # fromdate follows the committed watermark, so it survives restarts and failed emits
+        source.committed_timestamp = lambda: watcher.newest_timestamp
+    return tag_fetcher
+
+
+def _build_source_fetcher(constants, notifier, conditional):
+    fetcher_kwargs = dict(
+        headers={"User-Agent": constants.user_agent},
+        url_builder=_build_url(constants, constants.tag),
+        notifier=notifier,
+        retries=int(constants.retries),
+        delay=int(constants.delay),
+        page_cache=_build_page_cache(constants) if conditional else None
+    )
+    if constants.crawl_source == "api":
+        # The API has no validators to revalidate; polls narrow by fromdate instead
+        del fetcher_kwargs["page_cache"]
+        return StackExchangeApiFetcher(pool_size=int(constants.http_pool_size),
+                                       max_wait=float(constants.api_max_wait),
+                                       use_fromdate=conditional,
+                                       fromdate_slack=int(constants.api_fromdate_slack),
+                                       **fetcher_kwargs)
+    if constants.fetcher_backend == "sync":
+        return FetcherStrategy(**fetcher_kwargs)
+    return AsyncFetcherStrategy(pool_size=int(constants.http_pool_size), **fetcher_kwargs)
+
+
+def _build_page_cache(constants):
+    if constants.conditional_fetch == "0":
+        return None
+    fingerprints = {"body": body_fingerprint, "question_ids": question_ids_fingerprint}
+    if constants.page_fingerprint not in fingerprints:
+        raise ValueError(f"Unknown PAGE_FINGERPRINT '{constants.page_fingerprint}', "
+                         f"expected one of {sorted(fingerprints)}")
+    return ConditionalPageCache(fingerprint=fingerprints[constants.page_fingerprint])
+
+
+def _build_parser(constants, notifier):
+    if constants.crawl_source == "api":
+        # JSON pages need no DOM parsing, so they never go to the process pool
+        return StackExchangeApiParser(notifier=notifier)
+    if int(constants.parse_workers) > 0:
+        parser = ProcessPoolParser(constants.parser_backend,
+                                   base_url=constants.base_url,
+                                   parse_constants=ParsConstants(),
+                                   workers=int(constants.parse_workers))
+        parser.start()  # Warm up the workers before the first poll
+        return parser
+    return build_parser(constants.parser_backend,
+                        base_url=constants.base_url,
+                        parse_constants=ParsConstants(),
+                        notifier=notifier)
+
+
+def _read_tags(constants):
+    return [tag.strip() for tag in constants.tags.split(",") if tag.strip()]
+
+
+def _get_storage_path(tag):
+    return Path(f"last_seen_id_{tag}.txt")
 
 
-def _get_storage_path():
-    return Path("last_seen_id_python.txt")
+def _build_url(constants, tag):
+    if constants.crawl_source == "api":
+        return api_url_builder(tag, site=constants.api_site, page_size=int(constants.api_page_size),
+                               key=constants.api_key, api_filter=constants.api_filter)
+    # Tags like c# or c++ must not turn into a URL fragment or a space
+    path = quote(tag, safe="")
+    return lambda p: f"{constants.base_url}/questions/tagged/{path}?page={p}"
 
 
-def _build_url(base_url, tag):
-    return lambda p: f"{base_url}/questions/tagged/{tag}?page={p}"
+def _page_size(constants):
+    return int(constants.api_page_size) if constants.crawl_source == "api" else 50
 
 
 if __name__ == "__main__":
-    asyncio.run(main())  # Proper async entry point
+    cli_args = _parse_args()
+    commands = {"backfill": backfill, "reparse": reparse_archive}
+    command = commands.get(cli_args.command)
+    asyncio.run(command(cli_args) if command else main())  # Proper async entry point
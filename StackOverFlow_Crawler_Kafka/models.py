@@ -1,7 +1,10 @@
 # models.py
 
 from pydantic import BaseModel
-from typing import List
+from pydantic_core import to_json
+from typing import List, Optional, Union
+import os
+import sys
 
 
 class Question(BaseModel):
@@ -16,14 +19,162 @@ class Question(BaseModel):
     views: int
 
 
+QUESTION_FIELDS = tuple(Question.model_fields)
+
+
+class QuestionRecord:
+    """
+    Slotted question for the scrape -> dedupe -> emit pipeline. Fields are
+    already typed by the parser, so nothing is validated; tags are interned
+    and kept as a tuple. Kafka, the journal and the jsonl sink serialize it
+    directly (`to_json`); full `Question` models are only built for stream
+    consumers, via `to_question`.
+    """
+    __slots__ = QUESTION_FIELDS
+
+    def __init__(self, id: int, title: str, link: str, excerpt: str, tags,
+                 timestamp: str, votes: int, answers: int, views: int):
+        self.id = id
+        self.title = title
+        self.link = link
+        self.excerpt = excerpt
+        self.tags = tuple(map(sys.intern, tags))
+        self.timestamp = timestamp
+        self.votes = votes
+        self.answers = answers
+        self.views = views
+
+    @classmethod
+    def from_question(cls, question: Question) -> "QuestionRecord":
+        return cls(*(getattr(question, field) for field in QUESTION_FIELDS))
+
+    def as_tuple(self) -> tuple:
+        return (self.id, self.title, self.link, self.excerpt, self.tags,
+                self.timestamp, self.votes, self.answers, self.views)
+
+    def as_dict(self) -> dict:
+        return {"id": self.id, "title": self.title, "link": self.link, "excerpt": self.excerpt,
+                "tags": list(self.tags), "timestamp": self.timestamp, "votes": self.votes,
+                "answers": self.answers, "views": self.views}
+
+    def to_json(self) -> bytes:
+        # Same bytes as Question.model_dump_json(), without building (and validating) the model.
+        return to_json(self.as_dict())
+
+    def to_question(self) -> Question:
+        return Question(**self.as_dict())
+
+    def __eq__(self, other):
+        if not isinstance(other, QuestionRecord):
+            return NotImplemented
+        return self.as_tuple() == other.as_tuple()
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"QuestionRecord(id={self.id}, title={self.title!r})"
+
+
+def as_question(question: Union[Question, QuestionRecord]) -> Question:
+    return question.to_question() if isinstance(question, QuestionRecord) else question
+
+
+def question_json(question: Union[Question, QuestionRecord]) -> bytes:
+    return question.to_json() if isinstance(question, QuestionRecord) else to_json(question)
+
+
+class WatcherState(BaseModel):
+    last_id: int = 0
+    # Every id <= floor counts as seen; ids above it are checked against `seen`.
+    floor: int = 0
+    seen: List[int] = []
+    # Newest `timestamp` (creation time) among the committed questions; the
+    # API fetcher starts its `fromdate` filter there.
+    newest_timestamp: str = ""
+
+
+class BackfillPartition(BaseModel):
+    first_page: int
+    last_page: int
+    # First page not yet written; the partition resumes here.
+    next_page: int
+    done: bool = False
+    questions: int = 0
+
+
+class AlertRule(BaseModel):
+    """
+    Fires for a question that meets every condition the rule sets: any of
+    `keywords` (whole words or phrases; case and runs of whitespace do not
+    matter) in the title or excerpt, all of `tags_all`, any of `tags_any`
+    (tags are case-insensitive), and the thresholds.
+    """
+    name: str
+    keywords: List[str] = []
+    tags_all: List[str] = []
+    tags_any: List[str] = []
+    min_votes: Optional[int] = None
+    min_views: Optional[int] = None
+
+
 class Constants(BaseModel):
     user_agent: str = "Mozilla/5.0"
     base_url: str = "https://stackoverflow.com"
     tag: str = "python"
-    interval: str = "3"
+    tags: str = os.getenv("CRAWL_TAGS", "python")
+    # Fixed poll interval, and where the adaptive scheduler starts from
+    interval: str = os.getenv("SCRAPE_INTERVAL", "60")
     retries: str = "3"
     delay: str = "2"
     max_questions: str = "50"
+    adaptive_polling: str = os.getenv("ADAPTIVE_POLLING", "1")
+    min_interval: str = os.getenv("MIN_POLL_INTERVAL", "3")
+    max_interval: str = os.getenv("MAX_POLL_INTERVAL", "300")
+    poll_jitter: str = os.getenv("POLL_JITTER", "0.1")
+    poll_decision_log: str = os.getenv("POLL_DECISION_LOG", "")
+    max_backlog: str = os.getenv("MAX_BACKLOG", "2000")
+    state_backend: str = os.getenv("STATE_BACKEND", "sqlite")
+    state_db: str = os.getenv("STATE_DB", "crawler_state.db")
+    seen_window: str = os.getenv("SEEN_WINDOW", "5000")
+    coordination: str = os.getenv("COORDINATION", "none")
+    replica_id: str = os.getenv("REPLICA_ID", "")
+    lease_ttl: str = os.getenv("LEASE_TTL", "30")
+    crawl_source: str = os.getenv("CRAWL_SOURCE", "html")
+    api_site: str = os.getenv("SE_API_SITE", "stackoverflow")
+    api_key: str = os.getenv("SE_API_KEY", "")
+    api_page_size: str = os.getenv("SE_API_PAGE_SIZE", "100")
+    api_filter: str = os.getenv("SE_API_FILTER", "default")
+    api_fromdate_slack: str = os.getenv("SE_API_FROMDATE_SLACK", "300")
+    api_max_wait: str = os.getenv("SE_API_MAX_WAIT", "60")
+    fetcher_backend: str = os.getenv("FETCHER_BACKEND", "async")
+    http_pool_size: str = os.getenv("HTTP_POOL_SIZE", "10")
+    fetch_concurrency: str = os.getenv("FETCH_CONCURRENCY", "4")
+    conditional_fetch: str = os.getenv("CONDITIONAL_FETCH", "1")
+    # "question_ids" skips more pages but misses vote/answer/view changes
+    page_fingerprint: str = os.getenv("PAGE_FINGERPRINT", "body")
+    page_archive: str = os.getenv("PAGE_ARCHIVE", "")
+    page_archive_segment_mb: str = os.getenv("PAGE_ARCHIVE_SEGMENT_MB", "256")
+    page_archive_level: str = os.getenv("PAGE_ARCHIVE_LEVEL", "3")
+    stream_prefetch: str = os.getenv("STREAM_PREFETCH", "2")
+    parser_backend: str = os.getenv("PARSER_BACKEND", "bs4")
+    parse_workers: str = os.getenv("PARSE_WORKERS", "0")
+    metrics_port: str = os.getenv("METRICS_PORT", "9100")
+    output_sinks: str = os.getenv("OUTPUT_SINKS", "console,postgres,kafka")
+    alert_rules: str = os.getenv("ALERT_RULES", "alert_rules.json")
+    alert_reload_interval: str = os.getenv("ALERT_RELOAD_INTERVAL", "5")
+    sink_jsonl_path: str = os.getenv("SINK_JSONL_PATH", "questions.jsonl")
+    sink_queue_size: str = os.getenv("SINK_QUEUE_SIZE", "10000")
+    sink_batch_size: str = os.getenv("SINK_BATCH_SIZE", "500")
+    db_journal: str = os.getenv("DB_JOURNAL", "db_journal.jsonl")
+    kafka_journal: str = os.getenv("KAFKA_JOURNAL", "kafka_journal.jsonl")
+    db_batch_size: str = os.getenv("DB_BATCH_SIZE", "500")
+    db_batch_age: str = os.getenv("DB_BATCH_AGE", "2")
+    db_max_pending: str = os.getenv("DB_MAX_PENDING", "10000")
+    db_history: str = os.getenv("DB_HISTORY", "0")
+    history_retention_days: str = os.getenv("HISTORY_RETENTION_DAYS", "30")
+    kafka_compression: str = os.getenv("KAFKA_COMPRESSION", "zstd")
+    kafka_linger_ms: str = os.getenv("KAFKA_LINGER_MS", "50")
+    kafka_max_batch_bytes: str = os.getenv("KAFKA_MAX_BATCH_BYTES", "65536")
 
 
 class ParsConstants(BaseModel):
@@ -34,3 +185,4 @@ class ParsConstants(BaseModel):
     vote_elem: str = ".s-post-summary--stats-item:nth-child(1) span"
     answer_elem: str = ".s-post-summary--stats-item:nth-child(2) span"
     view_elem: str = ".s-post-summary--stats-item:nth-child(3) span"
+    tag_elem: str = ".post-tag"
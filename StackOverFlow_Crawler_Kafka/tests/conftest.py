@@ -0,0 +1,47 @@
+# conftest.py
+
+import asyncio
+import os
+import sys
+import uuid
+from pathlib import Path
+
+import pytest
+
+# The crawler modules import each other as top-level packages (`from models
+# import ...`), as when main.py runs from StackOverFlow_Crawler_Kafka/.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+FIXTURES = Path(__file__).resolve().parent.parent / "benchmarks" / "fixtures"
+
+
+@pytest.fixture
+def fixtures_dir() -> Path:
+    return FIXTURES
+
+
+async def _execute(dsn: str, statement: str):
+    import asyncpg
+    conn = await asyncpg.connect(dsn)
+    try:
+        await conn.execute(statement)
+    finally:
+        await conn.close()
+
+
+@pytest.fixture
+def postgres_dsn() -> str:
+    """
+    DSN of a throwaway schema in the database at TEST_DATABASE_DSN, dropped
+    afterwards; tests that need Postgres are skipped without it.
+    """
+    dsn = os.getenv("TEST_DATABASE_DSN")
+    if not dsn:
+        pytest.skip("TEST_DATABASE_DSN is not set")
+    schema = f"crawler_test_{uuid.uuid4().hex[:12]}"
+    asyncio.run(_execute(dsn, f"CREATE SCHEMA {schema}"))
+    try:
+        # asyncpg passes unknown DSN parameters on as server settings.
+        yield f"{dsn}{'&' if '?' in dsn else '?'}search_path={schema}"
+    finally:
+        asyncio.run(_execute(dsn, f"DROP SCHEMA {schema} CASCADE"))
@@ -0,0 +1,46 @@
+# test_alerts.py
+
+from Crawler.alerts import AlertRuleEngine
+from Crawler.notification_handler import Notifier
+from models import AlertRule, QuestionRecord
+
+
+def make_question(title, excerpt="", tags=("python",), votes=0):
+    return QuestionRecord(1, title, "/questions/1", excerpt, list(tags),
+                          "2025-01-01 00:00:00Z", votes, 0, 10)
+
+
+def matches(rules, question):
+    engine = AlertRuleEngine(notifier=Notifier())
+    engine.load_rules(rules)
+    return [rule.name for rule, _ in engine.evaluate([question])]
+
+
+def test_phrases_match_across_whitespace_and_case():
+    rules = [AlertRule(name="merge", keywords=["Merge  Them"])]
+    assert matches(rules, make_question("How do I MERGE   them\tin pandas?")) == ["merge"]
+    assert matches(rules, make_question("Title", "then merge\nthem by key")) == ["merge"]
+
+
+def test_phrases_do_not_span_title_and_excerpt():
+    rules = [AlertRule(name="merge", keywords=["merge them"])]
+    assert matches(rules, make_question("Two frames to merge", "them and more")) == []
+
+
+def test_keywords_match_whole_words_only():
+    rules = [AlertRule(name="pandas", keywords=["pandas"])]
+    assert matches(rules, make_question("geopandas projection")) == []
+    assert matches(rules, make_question("pandas: groupby")) == ["pandas"]
+
+
+def test_tags_match_regardless_of_case():
+    rules = [AlertRule(name="all", tags_all=["Python", "asyncio"]),
+             AlertRule(name="any", tags_any=["DJANGO", "flask"])]
+    question = make_question("Title", tags=["PYTHON", "AsyncIO", "Django"])
+    assert matches(rules, question) == ["all", "any"]
+
+
+def test_thresholds_combine_with_keywords():
+    rules = [AlertRule(name="hot", keywords=["asyncio"], min_votes=5)]
+    assert matches(rules, make_question("asyncio deadlock", votes=4)) == []
+    assert matches(rules, make_question("asyncio deadlock", votes=5)) == ["hot"]
@@ -0,0 +1,153 @@
+# test_backfill.py
+
+import asyncio
+
+import pytest
+
+from Crawler.backfill import BackfillRunner
+from Crawler.notification_handler import NotificationType
+from Crawler.state_store import SQLiteBackfillCheckpoints
+from models import QuestionRecord
+
+QUESTIONS_PER_PAGE = 3
+
+
+class RecordingNotifier:
+    def __init__(self):
+        self.events = []
+
+    def notify(self, notification_type, **kwargs):
+        self.events.append((notification_type, kwargs))
+
+    def flush(self):
+        pass
+
+    def types(self):
+        return [notification_type for notification_type, _ in self.events]
+
+
+class PageFetcher:
+    """
+    Listing of `pages` pages. Pages in `failing` cannot be fetched, pages in
+    `empty` come back without questions (as a throttled response does).
+    """
+    def __init__(self, pages=8, failing=(), empty=()):
+        self.pages = pages
+        self.failing = set(failing)
+        self.empty = set(empty)
+        self.requested = []
+
+    async def fetch_async(self, page):
+        self.requested.append(page)
+        if page in self.failing:
+            return None
+        return "empty" if page in self.empty or page > self.pages else f"page-{page}"
+
+    async def close(self):
+        pass
+
+
+class PageParser:
+    async def parse_async(self, html):
+        if html == "empty":
+            return []
+        page = int(html.split("-")[1])
+        return [QuestionRecord(page * 100 + i, f"Question {i}", f"/questions/{page * 100 + i}",
+                               "excerpt", ["python"], "2020-01-01 00:00:00Z", 0, 0, 1)
+                for i in range(QUESTIONS_PER_PAGE)]
+
+
+class PageWriter:
+    """db_writer stand-in; fails the batch of every page in `failing`."""
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.pages = []
+
+    async def insert_questions(self, questions):
+        page = questions[0].id // 100
+        if page in self.failing:
+            raise ConnectionError("database is down")
+        self.pages.append(page)
+
+
+@pytest.fixture
+def checkpoint_path(tmp_path):
+    return str(tmp_path / "backfill.db")
+
+
+def run_backfill(checkpoint_path, fetcher, writer, notifier=None, **kwargs):
+    options = dict(first_page=1, last_page=8, partition_size=4, workers=2, prefetch=1)
+    options.update(kwargs)
+    checkpoints = SQLiteBackfillCheckpoints(checkpoint_path)
+    try:
+        runner = BackfillRunner("python", fetcher, PageParser(), writer, checkpoints,
+                                notifier=notifier or RecordingNotifier(), **options)
+        return asyncio.run(runner.run())
+    finally:
+        checkpoints.close()
+
+
+def progress(partitions):
+    return [(p.first_page, p.last_page, p.next_page, p.done) for p in partitions]
+
+
+def test_completes_every_partition_and_checkpoints_it(checkpoint_path):
+    writer = PageWriter()
+    partitions = run_backfill(checkpoint_path, PageFetcher(), writer)
+
+    assert sorted(writer.pages) == list(range(1, 9))
+    assert progress(partitions) == [(1, 4, 5, True), (5, 8, 9, True)]
+    assert all(p.questions == 4 * QUESTIONS_PER_PAGE for p in partitions)
+
+    # A finished job does not fetch anything again.
+    fetcher = PageFetcher()
+    run_backfill(checkpoint_path, fetcher, writer)
+    assert fetcher.requested == []
+
+
+def test_resumes_at_the_first_page_that_could_not_be_fetched(checkpoint_path):
+    writer, notifier = PageWriter(), RecordingNotifier()
+    partitions = run_backfill(checkpoint_path, PageFetcher(failing={6}), writer, notifier)
+
+    assert progress(partitions) == [(1, 4, 5, True), (5, 8, 6, False)]
+    assert NotificationType.BACKFILL_PARTITION_FAILED in notifier.types()
+
+    fetcher = PageFetcher()
+    partitions = run_backfill(checkpoint_path, fetcher, writer)
+    assert sorted(fetcher.requested) == [6, 7, 8]
+    assert sorted(writer.pages) == list(range(1, 9))
+    assert progress(partitions) == [(1, 4, 5, True), (5, 8, 9, True)]
+    assert partitions[1].questions == 4 * QUESTIONS_PER_PAGE
+
+
+def test_checkpoint_stays_before_a_page_the_writer_did_not_take(checkpoint_path):
+    writer = PageWriter(failing={3})
+    partitions = run_backfill(checkpoint_path, PageFetcher(), writer)
+    assert progress(partitions)[0] == (1, 4, 3, False)
+
+    writer.failing.clear()
+    fetcher = PageFetcher()
+    run_backfill(checkpoint_path, fetcher, writer)
+    assert sorted(fetcher.requested) == [3, 4]
+    assert sorted(writer.pages) == list(range(1, 9))
+
+
+def test_an_empty_page_followed_by_questions_is_retried(checkpoint_path):
+    # Page 2 came back empty, most likely throttled: do not skip past it.
+    writer = PageWriter()
+    partitions = run_backfill(checkpoint_path, PageFetcher(empty={2}), writer)
+    assert progress(partitions)[0] == (1, 4, 2, False)
+
+    fetcher = PageFetcher()
+    partitions = run_backfill(checkpoint_path, fetcher, writer)
+    assert sorted(fetcher.requested) == [2, 3, 4]
+    assert progress(partitions)[0] == (1, 4, 5, True)
+
+
+def test_consecutive_empty_pages_end_the_listing(checkpoint_path):
+    # The listing only has 5 pages; the rest of the range is past its end.
+    fetcher, writer = PageFetcher(pages=5), PageWriter()
+    partitions = run_backfill(checkpoint_path, fetcher, writer, last_page=12, end_after_empty=3)
+
+    assert sorted(writer.pages) == [1, 2, 3, 4, 5]
+    assert all(p.done for p in partitions)
@@ -0,0 +1,129 @@
+# test_coordination.py
+"""Lease semantics live in SQL, so these run against TEST_DATABASE_DSN (skipped without it)."""
+
+import asyncio
+
+import pytest
+
+from Crawler.coordination import PostgresLeaseManager
+from Crawler.db_adapter import PostgresAdapter
+from Crawler.notification_handler import NotificationType
+
+TTL = 0.5
+TAGS = ["python", "pandas", "django", "numpy"]
+
+
+class RecordingNotifier:
+    def __init__(self):
+        self.events = []
+
+    def notify(self, notification_type, **kwargs):
+        self.events.append((notification_type, kwargs))
+
+    def flush(self):
+        pass
+
+
+@pytest.fixture
+def with_replicas(postgres_dsn):
+    """Run `scenario(a, b)` with two replicas sharing one database."""
+    def run(scenario):
+        async def main():
+            adapter = PostgresAdapter(dsn=postgres_dsn)
+            await adapter.init()
+            replicas = [PostgresLeaseManager(adapter, replica_id=name, ttl=TTL, notifier=RecordingNotifier())
+                        for name in ("a", "b")]
+            try:
+                for replica in replicas:
+                    await replica.init()
+                return await scenario(*replicas)
+            finally:
+                await adapter.close()
+        return asyncio.run(main())
+    return run
+
+
+def units(replica):
+    return sorted(unit for unit in replica.tokens if not unit.startswith("replica:"))
+
+
+def test_a_live_lease_is_exclusive(with_replicas):
+    async def scenario(a, b):
+        assert await a.try_acquire("python")
+        assert not await b.try_acquire("python")
+        # Re-acquiring your own lease keeps its fencing token.
+        assert await a.try_acquire("python")
+        assert a.tokens["python"] == 1 and a.holds("python")
+        assert not b.holds("python")
+
+    with_replicas(scenario)
+
+
+def test_renewal_keeps_the_lease_past_its_ttl(with_replicas):
+    async def scenario(a, b):
+        await a.try_acquire("python")
+        for _ in range(3):
+            await asyncio.sleep(TTL / 2)
+            assert await a.renew() == []
+        assert a.holds("python")
+        assert not await b.try_acquire("python")
+
+    with_replicas(scenario)
+
+
+def test_an_expired_lease_is_stolen_with_a_new_token(with_replicas):
+    async def scenario(a, b):
+        await a.try_acquire("python")
+        await asyncio.sleep(TTL * 1.5)
+        # The expiry is also tracked locally, so `a` stops working the unit on its own.
+        assert not a.holds("python")
+        assert await b.try_acquire("python")
+        assert b.tokens["python"] == 2
+        assert await a.renew() == ["python"]
+        assert "python" not in a.tokens
+        assert (NotificationType.LEASE_LOST, {"unit": "python"}) in a.notifier.events
+
+    with_replicas(scenario)
+
+
+def test_a_released_lease_is_free_at_once(with_replicas):
+    async def scenario(a, b):
+        await a.try_acquire("python")
+        await a.release(["python"])
+        assert await b.try_acquire("python")
+        assert b.tokens["python"] == 2
+
+    with_replicas(scenario)
+
+
+def test_a_completed_unit_is_never_taken_again(with_replicas):
+    async def scenario(a, b):
+        await a.try_acquire("backfill:python:1")
+        await a.complete("backfill:python:1")
+        await asyncio.sleep(TTL * 1.5)
+        assert await b.is_completed("backfill:python:1")
+        assert not await b.try_acquire("backfill:python:1")
+        assert not await b.is_completed("backfill:python:21")
+
+    with_replicas(scenario)
+
+
+def test_claim_splits_units_between_live_replicas(with_replicas):
+    async def scenario(a, b):
+        # `b` registered in init; take it out until its replica lease expires.
+        await b.release(list(b.tokens))
+        await a.claim(TAGS)
+        assert units(a) == sorted(TAGS)
+
+        await b.claim(TAGS)
+        await a.claim(TAGS)  # Sheds its excess now that there are two replicas
+        await b.claim(TAGS)
+        assert len(units(a)) == len(units(b)) == 2
+        assert sorted(units(a) + units(b)) == sorted(TAGS)
+
+        # `b` stops renewing: `a` takes its tags over once they expire.
+        await asyncio.sleep(TTL * 1.5)
+        await a.claim(TAGS)
+        assert units(a) == sorted(TAGS)
+
+    with_replicas(scenario)
@@ -0,0 +1,161 @@
+# test_kafka_sink.py
+
+import asyncio
+import json
+
+import pytest
+
+from Crawler.kafka_sink import InMemoryKafkaBroker, InMemoryKafkaProducer, KafkaQuestionSink
+from Crawler.notification_handler import NotificationType
+from models import QuestionRecord
+
+TOPIC = "stackoverflow_questions"
+
+
+class RecordingNotifier:
+    def __init__(self):
+        self.events = []
+
+    def notify(self, notification_type, **kwargs):
+        self.events.append((notification_type, kwargs))
+
+    def flush(self):
+        pass
+
+
+def make_question(question_id, votes=0):
+    return QuestionRecord(question_id, f"Question {question_id}", f"/questions/{question_id}",
+                          "excerpt", ["python"], "2025-01-01 00:00:00Z", votes, 0, 10)
+
+
+def make_sink(broker, notifier=None, **kwargs):
+    return KafkaQuestionSink("in-memory", TOPIC, notifier=notifier or RecordingNotifier(),
+                             producer_factory=lambda **kw: InMemoryKafkaProducer(broker, **kw),
+                             **kwargs)
+
+
+def published(broker):
+    """Every record on the topic as (partition, question id, votes), in log order."""
+    return [(partition, int(key), json.loads(value)["votes"])
+            for partition in broker.partitions
+            for key, value in broker.records(TOPIC, partition)]
+
+
+def count_appends(broker):
+    """Record the number of records in every batch the broker accepts."""
+    appends = []
+    append_batch = broker.append_batch
+
+    def counting_append(*args):
+        appends.append(len(args[4]))
+        return append_batch(*args)
+
+    broker.append_batch = counting_append
+    return appends
+
+
+async def send_all(sink, *batches):
+    await sink.start()
+    for batch in batches:
+        await sink.send_questions(batch)
+    await sink.close()
+
+
+def test_questions_keep_per_key_order_on_one_partition():
+    broker = InMemoryKafkaBroker(partitions=3)
+    updates = [make_question(question_id, votes) for votes in range(3) for question_id in range(1, 21)]
+    asyncio.run(send_all(make_sink(broker, linger_ms=0), updates[:30], updates[30:]))
+
+    records = published(broker)
+    assert len(records) == len(updates)
+    for question_id in range(1, 21):
+        own = [(partition, votes) for partition, key, votes in records if key == question_id]
+        assert len({partition for partition, _ in own}) == 1
+        assert [votes for _, votes in own] == [0, 1, 2]
+    assert len({partition for partition, _, _ in records}) > 1
+
+
+def test_send_questions_waits_for_delivery_and_notifies():
+    broker, notifier = InMemoryKafkaBroker(), RecordingNotifier()
+    questions = [make_question(question_id) for question_id in range(1, 6)]
+
+    async def run():
+        sink = make_sink(broker, notifier, linger_ms=10_000)
+        await sink.start()
+        # The linger timer holds the batch for 10s; send_questions must not return before it is written.
+        task = asyncio.create_task(sink.send_questions(questions))
+        await asyncio.sleep(0.05)
+        assert not task.done()
+        await sink.producer.flush()
+        await task
+        await sink.close()
+
+    asyncio.run(run())
+    assert sorted(key for _, key, _ in published(broker)) == [1, 2, 3, 4, 5]
+    assert notifier.events == [(NotificationType.QUESTIONS_PUBLISHED, {"count": 5, "topic": TOPIC})]
+
+
+def test_idempotent_producer_resend_is_not_duplicated():
+    broker = InMemoryKafkaBroker(partitions=1)
+    questions = [make_question(question_id) for question_id in range(1, 4)]
+
+    async def send_batch(producer):
+        deliveries = [await producer.send(TOPIC, value=q, key=q.id) for q in questions]
+        await producer.flush()
+        return [(await delivery).offset for delivery in deliveries]
+
+    async def run():
+        sink = make_sink(broker, linger_ms=0)
+        await sink.start()
+        first = await send_batch(sink.producer)
+        # A retry after a lost acknowledgement resends the same batch with the same sequence numbers.
+        sink.producer._sequences[(TOPIC, 0)] = 0
+        retried = await send_batch(sink.producer)
+        await sink.close()
+        return first, retried
+
+    first, retried = asyncio.run(run())
+    assert [key for _, key, _ in published(broker)] == [1, 2, 3]
+    assert first == retried == [0, 1, 2]
+
+
+def test_producer_without_idempotence_duplicates_resend():
+    broker = InMemoryKafkaBroker(partitions=1)
+    producer = InMemoryKafkaProducer(broker, enable_idempotence=False)
+
+    async def run():
+        for _ in range(2):
+            producer._sequences[(TOPIC, 0)] = 0
+            await producer.send(TOPIC, value=b"v", key=b"1")
+            await producer.flush()
+
+    asyncio.run(run())
+    assert len(broker.records(TOPIC, 0)) == 2
+
+
+@pytest.mark.parametrize("compression_type", [None, "zstd", "lz4"])
+def test_batches_fill_up_to_max_batch_size(compression_type):
+    broker = InMemoryKafkaBroker(partitions=1)
+    appends = count_appends(broker)
+    questions = [make_question(question_id) for question_id in range(1, 501)]
+    size = len(questions[0].to_json())
+    asyncio.run(send_all(make_sink(broker, compression_type=compression_type,
+                                   linger_ms=5, max_batch_size=50 * size), questions))
+
+    assert sum(appends) == len(questions)
+    # Full batches are cut by size, not one request per question.
+    assert len(appends) <= len(questions) // 50 + 1
+    if compression_type:
+        assert broker.compressed_bytes < broker.raw_bytes / 2
+    else:
+        assert broker.compressed_bytes == broker.raw_bytes
+
+
+def test_linger_collects_a_small_batch_into_one_request():
+    broker = InMemoryKafkaBroker(partitions=1)
+    appends = count_appends(broker)
+    asyncio.run(send_all(make_sink(broker, linger_ms=20),
+                         [make_question(question_id) for question_id in range(1, 11)]))
+
+    assert appends == [10]
+    assert [key for _, key, _ in published(broker)] == list(range(1, 11))
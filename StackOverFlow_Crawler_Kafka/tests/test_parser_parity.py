@@ -0,0 +1,44 @@
+# test_parser_parity.py
+
+import pytest
+
+from Crawler.notification_handler import Notifier
+from Crawler.parser import PARSER_BACKENDS, build_parser
+from models import ParsConstants
+
+BASE_URL = "https://stackoverflow.com"
+PAGES = ["tagged_python_page1.html", "tagged_python_page2.html", "tagged_python_empty.html"]
+OPTIONAL_MODULES = {"lxml": "lxml.cssselect", "selectolax": "selectolax.lexbor"}
+
+
+def parse_fixtures(backend, fixtures_dir):
+    if backend in OPTIONAL_MODULES:
+        pytest.importorskip(OPTIONAL_MODULES[backend])
+    parser = build_parser(backend, BASE_URL, Notifier(), ParsConstants())
+    return [[q.as_tuple() for q in parser.parse((fixtures_dir / page).read_text(encoding="utf-8"))]
+            for page in PAGES]
+
+
+def test_bs4_reference_extraction(fixtures_dir):
+    page1, page2, empty = parse_fixtures("bs4", fixtures_dir)
+    assert (len(page1), len(page2), len(empty)) == (50, 50, 0)
+    assert page1[0] == (
+        78500000,
+        "How do I parse <html> & stuff number 0?",
+        "https://stackoverflow.com/questions/78500000/how-to-do-thing-0",
+        "I have a list of dicts and want to   merge them & sort by key 0. What is the best way…",
+        ("pandas", "asyncio", "python"),
+        "2024-05-01 10:20:33Z",
+        0, 0, 0,
+    )
+    assert page1[1][6:] == (1, 1, 0)
+
+
+@pytest.mark.parametrize("backend", [b for b in PARSER_BACKENDS if b != "bs4"])
+def test_backend_matches_bs4(backend, fixtures_dir):
+    assert parse_fixtures(backend, fixtures_dir) == parse_fixtures("bs4", fixtures_dir)
+
+
+def test_unknown_backend_lists_choices():
+    with pytest.raises(ValueError, match="bs4"):
+        build_parser("html5lib", BASE_URL, Notifier(), ParsConstants())
@@ -0,0 +1,133 @@
+# test_scraper.py
+
+import asyncio
+
+import pytest
+
+from Crawler.scraper import StackOverflowScraperFacade
+from models import QuestionRecord
+
+PAGE_SIZE = 50
+
+
+def make_page(page):
+    first = 1_000_000 - (page - 1) * PAGE_SIZE
+    return [QuestionRecord(question_id, f"Question {question_id}", f"/questions/{question_id}",
+                           "excerpt", ["python"], "2025-01-01 00:00:00Z", 0, 0, 1)
+            for question_id in range(first, first - PAGE_SIZE, -1)]
+
+
+class SlowFetcher:
+    """
+    Serves `pages` listing pages (newest first) after `delays[page]` seconds;
+    records which pages were started, finished and cancelled.
+    """
+    def __init__(self, pages=10, delays=None, empty=()):
+        self.pages = pages
+        self.delays = delays or {}
+        self.empty = set(empty)
+        self.started, self.finished, self.cancelled = [], [], []
+        self.in_flight = self.max_in_flight = 0
+
+    async def fetch_async(self, page):
+        self.started.append(page)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delays.get(page, 0.01))
+        except asyncio.CancelledError:
+            self.cancelled.append(page)
+            raise
+        finally:
+            self.in_flight -= 1
+        self.finished.append(page)
+        return "" if page in self.empty or page > self.pages else f"page-{page}"
+
+    def fetch(self, page):
+        self.started.append(page)
+        return "" if page in self.empty or page > self.pages else f"page-{page}"
+
+
+class PageParser:
+    def parse(self, html):
+        return make_page(int(html.split("-")[1]))
+
+    async def parse_async(self, html):
+        return self.parse(html)
+
+
+def make_scraper(fetcher, concurrency=4, max_questions=1000):
+    return StackOverflowScraperFacade(fetcher, PageParser(), max_questions=max_questions,
+                                      notifier=None, concurrency=concurrency, page_size_hint=PAGE_SIZE)
+
+
+def ids(questions):
+    return [q.id for q in questions]
+
+
+def test_pages_come_out_in_page_order_when_later_pages_finish_first():
+    # Every page finishes before the one above it.
+    fetcher = SlowFetcher(pages=4, delays={1: 0.08, 2: 0.06, 3: 0.04, 4: 0.02})
+    questions = asyncio.run(make_scraper(fetcher).scrape_async(max_questions=4 * PAGE_SIZE))
+
+    assert ids(questions) == ids(make_page(1) + make_page(2) + make_page(3) + make_page(4))
+    assert fetcher.finished == [4, 3, 2, 1]
+    assert fetcher.max_in_flight == 4
+
+
+def test_window_never_exceeds_concurrency():
+    fetcher = SlowFetcher(pages=20)
+    questions = asyncio.run(make_scraper(fetcher, concurrency=3).scrape_async(max_questions=20 * PAGE_SIZE))
+
+    assert len(questions) == 20 * PAGE_SIZE
+    assert fetcher.max_in_flight == 3
+
+
+def test_limit_schedules_only_the_pages_it_needs():
+    fetcher = SlowFetcher(pages=10)
+    questions = asyncio.run(make_scraper(fetcher, concurrency=8).scrape_async(max_questions=120))
+
+    assert ids(questions) == ids(make_page(1) + make_page(2) + make_page(3))[:120]
+    assert sorted(fetcher.started) == [1, 2, 3]
+    assert fetcher.cancelled == []
+
+
+def test_empty_page_cancels_the_pages_still_in_flight():
+    fetcher = SlowFetcher(pages=10, empty={2}, delays={3: 5, 4: 5})
+    questions = asyncio.run(asyncio.wait_for(make_scraper(fetcher).scrape_async(), 2))
+
+    assert ids(questions) == ids(make_page(1))
+    assert sorted(fetcher.cancelled) == [3, 4]
+    assert fetcher.in_flight == 0
+
+
+def test_stop_condition_ends_paging_and_cancels_later_pages():
+    # Page 3 holds the first known question; page 4 is still downloading when it is consumed.
+    known = make_page(3)[10].id
+    fetcher = SlowFetcher(pages=10, delays={3: 0.05, 4: 5, 5: 5, 6: 5})
+    on_known = []
+    scraper = make_scraper(fetcher, concurrency=4)
+    questions = asyncio.run(asyncio.wait_for(scraper.scrape_async(
+        stop_condition=lambda q: q.id <= known, on_known=on_known.extend), 2))
+
+    assert ids(questions) == ids(make_page(1) + make_page(2) + make_page(3)[:10])
+    assert ids(on_known) == ids(make_page(3)[10:])
+    # The window starts at one page and doubles: 1, then 2-3, then 4-6.
+    assert sorted(fetcher.started) == [1, 2, 3, 4, 5, 6]
+    assert sorted(fetcher.cancelled) == [4, 5, 6]
+
+
+def test_stop_condition_on_the_first_page_costs_one_fetch():
+    fetcher = SlowFetcher(pages=10)
+    scraper = make_scraper(fetcher, concurrency=8)
+    questions = asyncio.run(scraper.scrape_async(stop_condition=lambda q: True))
+
+    assert questions == []
+    assert fetcher.started == [1]
+
+
+@pytest.mark.parametrize("max_questions", [30, 120, 500])
+def test_sequential_scrape_returns_the_same_questions(max_questions):
+    expected = ids(make_scraper(SlowFetcher(pages=4), concurrency=1).scrape(max_questions=max_questions))
+    pipelined = asyncio.run(make_scraper(SlowFetcher(pages=4)).scrape_async(max_questions=max_questions))
+    assert ids(pipelined) == expected
@@ -0,0 +1,138 @@
+# test_stackexchange_api.py
+
+import asyncio
+import json
+
+import pytest
+
+from Crawler.fetcher import AsyncFetcherStrategy
+from Crawler.notification_handler import NotificationType
+from Crawler.scraper import StackOverflowScraperFacade
+from Crawler.stackexchange_api import (NO_MORE_PAGES, StackExchangeApiFetcher,
+                                       StackExchangeApiParser, api_url_builder)
+
+PAGES = {
+    1: "api_questions_python_page1.json",  # has_more: true
+    2: "api_questions_python_page2.json",  # has_more: false, backoff: 10
+}
+
+
+class RecordingNotifier:
+    def __init__(self):
+        self.events = []
+
+    def notify(self, notification_type, **kwargs):
+        self.events.append((notification_type, kwargs))
+
+    def flush(self):
+        pass
+
+    def types(self):
+        return [notification_type for notification_type, _ in self.events]
+
+
+@pytest.fixture
+def responses(fixtures_dir, monkeypatch):
+    """Serves recorded API responses by page in place of the HTTP client; records requested URLs."""
+    served = {page: (fixtures_dir / name).read_text(encoding="utf-8") for page, name in PAGES.items()}
+    requested = []
+
+    async def fetch_async(fetcher, page):
+        requested.append(fetcher.url_builder(page))
+        return served.get(page)
+
+    monkeypatch.setattr(AsyncFetcherStrategy, "fetch_async", fetch_async)
+    return served, requested
+
+
+def build_fetcher(notifier, **kwargs):
+    return StackExchangeApiFetcher(headers={}, url_builder=api_url_builder("python"),
+                                   notifier=notifier, **kwargs)
+
+
+def test_items_are_parsed_like_the_html_pages(responses):
+    fetcher = build_fetcher(RecordingNotifier())
+    body = asyncio.run(fetcher.fetch_async(1))
+    questions = StackExchangeApiParser(notifier=RecordingNotifier()).parse(body)
+    assert len(questions) == 50
+    assert questions[0].as_tuple() == (
+        78500000,
+        "How do I parse <html> & stuff number 0?",
+        "https://stackoverflow.com/questions/78500000/how-to-do-thing-0",
+        "",
+        ("pandas", "asyncio", "python"),
+        "2024-05-01 10:20:33Z",
+        0, 0, 0,
+    )
+    assert fetcher.budget.quota_remaining == 9987
+
+
+def test_paging_stops_after_has_more_false(responses):
+    _, requested = responses
+    fetcher = build_fetcher(RecordingNotifier())
+    scraper = StackOverflowScraperFacade(fetcher, StackExchangeApiParser(notifier=RecordingNotifier()),
+                                         max_questions=500, notifier=None, page_size_hint=50)
+    questions = asyncio.run(scraper.scrape_async())
+    assert len(questions) == 100
+    assert len(requested) == 2
+    # Later pages of the cycle are answered locally.
+    assert asyncio.run(fetcher.fetch_async(3)) == NO_MORE_PAGES
+    assert len(requested) == 2
+
+
+def test_backoff_delays_the_next_request(responses):
+    _, requested = responses
+    notifier = RecordingNotifier()
+    fetcher = build_fetcher(notifier, max_wait=1.0)
+    asyncio.run(fetcher.fetch_async(2))
+    assert (NotificationType.API_BACKOFF, {"seconds": 10}) in notifier.events
+    assert fetcher.budget.wait_time() > 9
+    # Waiting 10s is longer than max_wait: the fetch fails without a request.
+    assert asyncio.run(fetcher.fetch_async(1)) is None
+    assert len(requested) == 1
+    assert NotificationType.API_QUOTA_EXHAUSTED in notifier.types()
+
+
+def test_exhausted_quota_blocks_until_the_daily_reset(responses, fixtures_dir):
+    served, requested = responses
+    served[1] = (fixtures_dir / "api_questions_python_quota_exhausted.json").read_text(encoding="utf-8")
+    notifier = RecordingNotifier()
+    fetcher = build_fetcher(notifier)
+    assert StackExchangeApiParser().parse(asyncio.run(fetcher.fetch_async(1))) == []
+    assert fetcher.budget.quota_remaining == 0
+    assert 0 < fetcher.budget.wait_time() <= 24 * 3600
+    assert asyncio.run(fetcher.fetch_async(1)) is None
+    assert len(requested) == 1
+    assert NotificationType.API_QUOTA_EXHAUSTED in notifier.types()
+
+
+def test_non_json_body_is_a_failed_fetch(responses):
+    served, _ = responses
+    served[1] = "<html><body>502 Bad Gateway</body></html>"
+    notifier = RecordingNotifier()
+    fetcher = build_fetcher(notifier)
+    assert asyncio.run(fetcher.fetch_async(1)) is None
+    assert NotificationType.FETCH_FAILED in notifier.types()
+
+
+def test_fromdate_follows_the_committed_watermark(responses):
+    _, requested = responses
+    fetcher = build_fetcher(RecordingNotifier(), fromdate_slack=300)
+    committed = ["2024-05-01 10:20:33Z"]  # 1714558833, e.g. loaded from the state store
+    fetcher.committed_timestamp = lambda: committed[0]
+    asyncio.run(fetcher.fetch_async(1))
+    assert requested[-1].endswith("&page=1&fromdate=1714558533")
+    # Served but not committed questions do not move the filter.
+    committed[0] = ""
+    asyncio.run(fetcher.fetch_async(1))
+    assert "fromdate" not in requested[-1]
+
+
+def test_fromdate_falls_back_to_served_questions(responses):
+    served, requested = responses
+    newest = max(item["creation_date"] for item in json.loads(served[1])["items"])
+    fetcher = build_fetcher(RecordingNotifier(), fromdate_slack=0)
+    asyncio.run(fetcher.fetch_async(1))
+    assert "fromdate" not in requested[-1]
+    asyncio.run(fetcher.fetch_async(1))
+    assert requested[-1].endswith(f"&fromdate={newest}")
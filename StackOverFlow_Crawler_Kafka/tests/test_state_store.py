@@ -0,0 +1,200 @@
+# test_state_store.py
+
+import asyncio
+import os
+import sqlite3
+
+import pytest
+
+from Crawler.coordination import PostgresLeaseManager
+from Crawler.db_adapter import PostgresAdapter
+from Crawler.notification_handler import Notifier
+from Crawler.state_store import (FileStateStore, PostgresStateStore, SeenWindow, SQLiteStateStore,
+                                 StateStoreError)
+from Crawler.watcher import QuestionWatcher
+from models import QuestionRecord, WatcherState
+
+
+def make_questions(ids):
+    return [QuestionRecord(question_id, f"Question {question_id}", f"/questions/{question_id}",
+                           "excerpt", ["python"], f"2025-01-01 00:00:{question_id % 60:02d}Z", 0, 0, 1)
+            for question_id in ids]
+
+
+@pytest.fixture
+def sqlite_store(tmp_path):
+    store = SQLiteStateStore(str(tmp_path / "state.db"))
+    yield store
+    store.close()
+
+
+def test_seen_window_evicts_oldest_ids_into_the_floor():
+    window = SeenWindow(3)
+    assert [window.add(question_id) for question_id in (10, 12, 11)] == [True, True, True]
+    assert window.add(12) is False
+
+    window.add(15)
+    assert list(window) == [12, 11, 15]
+    assert window.floor == 10
+    # Anything at or below the floor counts as seen, even ids never added.
+    assert 9 in window and 10 in window
+    assert 13 not in window
+    assert window.add(7) is False
+
+    window.add(13)
+    assert window.floor == 12
+    assert 11 in window and len(window) == 3
+
+
+def test_seen_window_keeps_the_newest_ids_when_restored():
+    window = SeenWindow(2, floor=5, ids=[9, 3, 8, 7])
+    assert list(window) == [8, 9]
+    assert window.floor == 7
+
+
+def test_file_store_round_trips_state(tmp_path):
+    store = FileStateStore(tmp_path / "state.json")
+    assert store.load("python") is None
+
+    state = WatcherState(last_id=42, floor=30, seen=[35, 42], newest_timestamp="2025-01-01 00:00:00Z")
+    store.commit("python", state, added=[35, 42])
+    assert store.load("python") == state
+
+
+def test_file_store_reads_the_legacy_last_id_file(tmp_path):
+    path = tmp_path / "last_seen_id.txt"
+    path.write_text("1234\n")
+    assert FileStateStore(path).load("python") == WatcherState(last_id=1234, floor=1234)
+
+
+def test_file_store_commit_failure_keeps_the_previous_state(tmp_path, monkeypatch):
+    store = FileStateStore(tmp_path / "state.json")
+    committed = WatcherState(last_id=10, floor=10)
+    store.commit("python", committed, added=[])
+
+    def failing_fsync(fd):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(os, "fsync", failing_fsync)
+    with pytest.raises(OSError):
+        store.commit("python", WatcherState(last_id=20, floor=20), added=[])
+
+    assert store.load("python") == committed
+    assert [path.name for path in tmp_path.iterdir()] == ["state.json"]
+
+
+def test_sqlite_store_round_trips_state_and_prunes_below_the_floor(sqlite_store):
+    assert sqlite_store.load("python") is None
+
+    sqlite_store.commit("python", WatcherState(last_id=12, floor=0, seen=[10, 11, 12]), added=[10, 11, 12])
+    sqlite_store.commit("python", WatcherState(last_id=14, floor=11, seen=[12, 13, 14],
+                                               newest_timestamp="2025-01-02"), added=[13, 14])
+    sqlite_store.commit("django", WatcherState(last_id=5, floor=0, seen=[5]), added=[5])
+
+    assert sqlite_store.load("python") == WatcherState(last_id=14, floor=11, seen=[12, 13, 14],
+                                                       newest_timestamp="2025-01-02")
+    assert sqlite_store.load("django").seen == [5]
+    ids = [row[0] for row in sqlite_store.conn.execute("SELECT id FROM seen_ids WHERE key = 'python'")]
+    assert ids == [12, 13, 14]
+
+
+def test_sqlite_store_commit_is_all_or_nothing(sqlite_store):
+    sqlite_store.commit("python", WatcherState(last_id=10, floor=0, seen=[10]), added=[10])
+    sqlite_store.conn.execute('''
+        CREATE TRIGGER reject_id BEFORE INSERT ON seen_ids WHEN NEW.id = 13
+        BEGIN SELECT RAISE(ABORT, 'rejected'); END
+    ''')
+
+    with pytest.raises(sqlite3.Error):
+        sqlite_store.commit("python", WatcherState(last_id=13, floor=10, seen=[11, 12, 13]),
+                            added=[11, 12, 13])
+
+    # Neither the watermark nor the pruning nor the first ids of the batch were applied.
+    assert sqlite_store.load("python") == WatcherState(last_id=10, floor=0, seen=[10])
+
+
+def test_watcher_restores_what_it_persisted(sqlite_store, tmp_path):
+    def make_watcher():
+        return QuestionWatcher(tmp_path / "last_seen_id.txt", Notifier(), state_store=sqlite_store,
+                               state_key="python", seen_window=3)
+
+    watcher = make_watcher()
+    assert [q.id for q in watcher.watch(make_questions([5, 3, 8, 6]))] == [5, 3, 8, 6]
+    watcher.persist_state()
+    # Seen but never persisted: a restart must see these as new again.
+    watcher.watch(make_questions([9]))
+
+    restored = make_watcher()
+    assert restored.last_id == 8
+    # 5 arrived first, so it was evicted into the floor when 6 arrived.
+    assert restored.seen.floor == 5 and list(restored.seen) == [6, 8]
+    assert [q.id for q in restored.watch(make_questions([9, 8, 7, 4]))] == [9, 7]
+
+    # restore_state drops everything since the last commit.
+    asyncio.run(restored.restore_state())
+    assert restored.last_id == 8 and list(restored.seen) == [6, 8]
+
+
+def with_postgres_store(dsn, scenario, lease_owner=None, keys=()):
+    """Run `scenario(store, adapter)` with a PostgresStateStore on the adapter's pool."""
+    async def main():
+        adapter = PostgresAdapter(dsn=dsn)
+        await adapter.init()
+        try:
+            store = PostgresStateStore(adapter, lease_owner=lease_owner)
+            await store.init(keys)
+            return await scenario(store, adapter)
+        finally:
+            await adapter.close()
+    return asyncio.run(main())
+
+
+def test_postgres_store_serves_the_startup_state_synchronously(postgres_dsn):
+    async def commit(store, adapter):
+        await store.commit_async("python", WatcherState(last_id=12, floor=10, seen=[11, 12]), added=[11, 12])
+
+    async def reload(store, adapter):
+        return store.load("python"), store.load("django"), await store.load_async("python")
+
+    with_postgres_store(postgres_dsn, commit)
+    snapshot, missing, fresh = with_postgres_store(postgres_dsn, reload, keys=["python", "django"])
+    assert snapshot == fresh == WatcherState(last_id=12, floor=10, seen=[11, 12])
+    assert missing is None
+
+
+def test_postgres_store_watermarks_only_move_forward(postgres_dsn):
+    async def scenario(store, adapter):
+        await store.commit_async("python", WatcherState(last_id=20, floor=15, seen=[18, 20]), added=[18, 20])
+        await store.commit_async("python", WatcherState(last_id=12, floor=10, seen=[12]), added=[12])
+        return await store.load_async("python")
+
+    # A stale replica's commit keeps the newer watermark; its ids above the floor are still recorded.
+    assert with_postgres_store(postgres_dsn, scenario) == WatcherState(last_id=20, floor=15, seen=[18, 20])
+
+
+def test_postgres_store_only_accepts_commits_from_the_lease_holder(postgres_dsn):
+    async def scenario(store, adapter):
+        leases = PostgresLeaseManager(adapter, replica_id="a", ttl=30, notifier=Notifier())
+        await leases.init()
+        with pytest.raises(StateStoreError):
+            await store.commit_async("python", WatcherState(last_id=5, floor=5), added=[])
+        await leases.try_acquire("python")
+        await store.commit_async("python", WatcherState(last_id=5, floor=5), added=[])
+        return await store.load_async("python")
+
+    assert with_postgres_store(postgres_dsn, scenario, lease_owner="a").last_id == 5
+
+
+def test_postgres_store_reports_blocking_commits_instead_of_deadlocking(postgres_dsn, tmp_path):
+    async def scenario(store, adapter):
+        with pytest.raises(StateStoreError):
+            store.commit("python", WatcherState(last_id=5, floor=5), added=[])
+        watcher = QuestionWatcher(tmp_path / "last_seen_id.txt", Notifier(), state_store=store,
+                                  state_key="python")
+        watcher.watch(make_questions([5]))
+        watcher.persist_state()  # Reported as a failed commit; the ids stay queued
+        assert watcher._unpersisted_ids == [5]
+        await watcher.persist_state_async()
+        return await store.load_async("python")
+
+    assert with_postgres_store(postgres_dsn, scenario).seen == [5]
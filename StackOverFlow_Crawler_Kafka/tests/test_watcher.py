@@ -0,0 +1,102 @@
+# test_watcher.py
+
+import asyncio
+
+import pytest
+
+from Crawler.notification_handler import Notifier
+from Crawler.scraper import StackOverflowScraperFacade
+from Crawler.state_store import FileStateStore
+from Crawler.watcher import QuestionWatcher
+from models import QuestionRecord, WatcherState
+
+PAGE_SIZE = 50
+NEWEST_ID = 1_000_000
+
+
+def make_page(page):
+    first = NEWEST_ID - (page - 1) * PAGE_SIZE
+    return [QuestionRecord(question_id, f"Question {question_id}", f"/questions/{question_id}",
+                           "excerpt", ["python"], "2025-01-01 00:00:00Z", 0, 0, 1)
+            for question_id in range(first, first - PAGE_SIZE, -1)]
+
+
+class ListingFetcher:
+    """Serves an endless newest-first listing and records the pages requested."""
+    def __init__(self):
+        self.requested = []
+
+    async def fetch_async(self, page):
+        self.requested.append(page)
+        return f"page-{page}"
+
+
+class PageParser:
+    async def parse_async(self, html):
+        return make_page(int(html.split("-")[1]))
+
+
+@pytest.fixture
+def fetcher():
+    return ListingFetcher()
+
+
+@pytest.fixture
+def scraper(fetcher):
+    # One page at a time, so the pages requested are exactly the pages needed.
+    return StackOverflowScraperFacade(fetcher, PageParser(), max_questions=50,
+                                      notifier=None, concurrency=1, page_size_hint=PAGE_SIZE)
+
+
+def make_watcher(tmp_path, last_id=None, **kwargs):
+    path = tmp_path / "state.json"
+    if last_id is not None:
+        FileStateStore(path).commit("python", WatcherState(last_id=last_id, floor=last_id), added=[])
+    return QuestionWatcher(path, Notifier(), **kwargs)
+
+
+def test_first_run_takes_a_single_batch(tmp_path, fetcher, scraper):
+    watcher = make_watcher(tmp_path)
+    new = asyncio.run(watcher._poll(scraper))
+
+    assert len(new) == watcher.initial_limit == 50
+    assert fetcher.requested == [1]
+
+
+def test_pages_back_past_the_initial_limit_down_to_the_watermark(tmp_path, fetcher, scraper):
+    # 180 questions arrived since the last commit: the watermark sits in page 4.
+    watermark = NEWEST_ID - 180
+    watcher = make_watcher(tmp_path, last_id=watermark)
+    new = asyncio.run(watcher._poll(scraper))
+
+    assert [q.id for q in new] == list(range(NEWEST_ID, watermark, -1))
+    assert fetcher.requested == [1, 2, 3, 4]
+    # The known questions on the last page are kept aside for their counters.
+    assert [q.id for q in watcher.rescraped] == list(range(watermark, NEWEST_ID - 200, -1))
+    assert watcher.last_id == NEWEST_ID
+
+
+def test_watermark_on_a_page_boundary_stops_at_the_next_page(tmp_path, fetcher, scraper):
+    # Pages 1-2 are all new; only page 3 shows that nothing older is needed.
+    watcher = make_watcher(tmp_path, last_id=NEWEST_ID - 100)
+    new = asyncio.run(watcher._poll(scraper))
+
+    assert len(new) == 100
+    assert fetcher.requested == [1, 2, 3]
+
+
+def test_a_quiet_cycle_costs_one_page(tmp_path, fetcher, scraper):
+    watcher = make_watcher(tmp_path, last_id=NEWEST_ID)
+    new = asyncio.run(watcher._poll(scraper))
+
+    assert new == []
+    assert fetcher.requested == [1]
+    assert len(watcher.rescraped) == PAGE_SIZE
+
+
+def test_max_backlog_bounds_a_runaway_backlog(tmp_path, fetcher, scraper):
+    watcher = make_watcher(tmp_path, last_id=1, max_backlog=120)
+    new = asyncio.run(watcher._poll(scraper))
+
+    assert len(new) == 120
+    assert fetcher.requested == [1, 2, 3]
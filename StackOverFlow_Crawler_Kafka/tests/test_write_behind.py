@@ -0,0 +1,188 @@
+# test_write_behind.py
+
+import asyncio
+import json
+
+from Crawler.notification_handler import NotificationType
+from Crawler.write_behind import WriteBehindBuffer
+from models import QuestionRecord
+
+
+class RecordingNotifier:
+    def __init__(self):
+        self.events = []
+
+    def notify(self, notification_type, **kwargs):
+        self.events.append((notification_type, kwargs))
+
+    def flush(self):
+        pass
+
+    def types(self):
+        return [notification_type for notification_type, _ in self.events]
+
+
+class FlakyAdapter:
+    """Database stand-in that fails every insert while `down` is set."""
+    def __init__(self, down=False):
+        self.down = down
+        self.batches = []
+
+    async def insert_questions(self, questions):
+        if self.down:
+            raise ConnectionError("database is down")
+        self.batches.append([q.id for q in questions])
+
+    def ids(self):
+        return [question_id for batch in self.batches for question_id in batch]
+
+
+def make_questions(ids):
+    return [QuestionRecord(question_id, f"Question {question_id}", f"/questions/{question_id}",
+                           "excerpt", ["python"], "2025-01-01 00:00:00Z", 0, 0, 1)
+            for question_id in ids]
+
+
+def make_buffer(tmp_path, adapter, notifier=None, **kwargs):
+    options = dict(max_batch=10, max_age=0.01, retry_delay=0.01, max_retry_delay=0.05)
+    options.update(kwargs)
+    return WriteBehindBuffer(adapter, journal_path=tmp_path / "journal.jsonl",
+                             notifier=notifier or RecordingNotifier(), **options)
+
+
+def journaled_ids(path):
+    return [json.loads(line)["id"] for line in path.read_text().splitlines()] if path.exists() else []
+
+
+async def wait_until(condition, timeout=2.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not condition():
+        assert loop.time() < deadline, "condition not met in time"
+        await asyncio.sleep(0.005)
+
+
+def test_direct_mode_flushes_and_removes_the_journal(tmp_path):
+    adapter = FlakyAdapter()
+
+    async def run():
+        buffer = make_buffer(tmp_path, adapter)
+        await buffer.start()
+        await buffer.insert_questions(make_questions(range(1, 26)))
+        assert journaled_ids(buffer.journal_path) == list(range(1, 26))
+        await wait_until(lambda: len(adapter.ids()) == 25)
+        await buffer.close()
+        return buffer
+
+    buffer = asyncio.run(run())
+    assert adapter.batches == [list(range(1, 11)), list(range(11, 21)), list(range(21, 26))]
+    assert not buffer.journal_path.exists()
+    assert not buffer.replay_path.exists()
+
+
+def test_spills_to_the_journal_while_the_database_is_down(tmp_path):
+    adapter, notifier = FlakyAdapter(down=True), RecordingNotifier()
+
+    async def run():
+        buffer = make_buffer(tmp_path, adapter, notifier, retry_delay=10, max_retry_delay=10)
+        await buffer.start()
+        await buffer.insert_questions(make_questions(range(1, 6)))
+        await wait_until(lambda: buffer._spilling)
+        await buffer.insert_questions(make_questions(range(6, 9)))
+        assert not buffer._pending
+        buffer._closing = True  # Stop without the final replay attempt
+        buffer._wakeup.set()
+        await buffer._task
+        return buffer
+
+    buffer = asyncio.run(run())
+    assert adapter.ids() == []
+    assert journaled_ids(buffer.replay_path) + journaled_ids(buffer.journal_path) == list(range(1, 9))
+    deferred = [kwargs for notification_type, kwargs in notifier.events
+                if notification_type is NotificationType.DB_WRITE_DEFERRED]
+    assert deferred[0]["count"] == 5 and deferred[0]["target"] == "db"
+
+
+def test_replays_the_journal_once_the_database_is_back(tmp_path):
+    adapter, notifier = FlakyAdapter(down=True), RecordingNotifier()
+
+    async def run():
+        buffer = make_buffer(tmp_path, adapter, notifier)
+        await buffer.start()
+        await buffer.insert_questions(make_questions(range(1, 6)))
+        await wait_until(lambda: buffer._spilling)
+        await buffer.insert_questions(make_questions(range(6, 9)))
+        adapter.down = False
+        await wait_until(lambda: not buffer._spilling)
+        # Direct mode again: new questions are queued in memory.
+        await buffer.insert_questions(make_questions(range(9, 11)))
+        await wait_until(lambda: len(adapter.ids()) == 10)
+        await buffer.close()
+        return buffer
+
+    buffer = asyncio.run(run())
+    assert adapter.ids() == list(range(1, 11))
+    assert NotificationType.DB_SPILL_REPLAYED in notifier.types()
+    assert not buffer.journal_path.exists()
+    assert not buffer.replay_path.exists()
+
+
+def test_backpressure_spills_instead_of_growing_the_queue(tmp_path):
+    adapter = FlakyAdapter()
+
+    async def run():
+        # A long max_age keeps the first batch queued so the second one overflows.
+        buffer = make_buffer(tmp_path, adapter, max_batch=100, max_age=10, max_pending=5)
+        await buffer.start()
+        await buffer.insert_questions(make_questions(range(1, 4)))
+        await buffer.insert_questions(make_questions(range(4, 8)))
+        assert buffer._spilling and not buffer._pending
+        await wait_until(lambda: not buffer._spilling)
+        await buffer.close()
+
+    asyncio.run(run())
+    assert adapter.ids() == list(range(1, 8))
+
+
+def test_resumes_a_replay_file_left_by_a_crash(tmp_path):
+    # Crashed after rotating the journal but before the replay was inserted,
+    # with more questions journaled after the rotation and a torn last line.
+    replay_path = tmp_path / "journal.jsonl.replay"
+    journal_path = tmp_path / "journal.jsonl"
+    replay_path.write_bytes(b"".join(q.to_json() + b"\n" for q in make_questions(range(1, 4))))
+    journal_path.write_bytes(b"".join(q.to_json() + b"\n" for q in make_questions(range(4, 6)))
+                             + b'{"id": 6, "tit')
+    adapter, notifier = FlakyAdapter(), RecordingNotifier()
+
+    async def run():
+        buffer = make_buffer(tmp_path, adapter, notifier)
+        assert buffer._spilling
+        await buffer.start()
+        await buffer.insert_questions(make_questions([7]))
+        await wait_until(lambda: not buffer._spilling)
+        await buffer.close()
+
+    asyncio.run(run())
+    assert adapter.ids() == [1, 2, 3, 4, 5, 7]
+    replayed = [kwargs["count"] for notification_type, kwargs in notifier.events
+                if notification_type is NotificationType.DB_SPILL_REPLAYED]
+    assert replayed == [3, 3]
+    assert not journal_path.exists() and not replay_path.exists()
+
+
+def test_close_keeps_unwritten_questions_for_the_next_start(tmp_path):
+    adapter = FlakyAdapter(down=True)
+
+    async def run(buffer, questions):
+        await buffer.start()
+        await buffer.insert_questions(questions)
+        await buffer.close()
+
+    asyncio.run(run(make_buffer(tmp_path, adapter, max_age=10), make_questions(range(1, 4))))
+    assert adapter.ids() == []
+
+    adapter.down = False
+    buffer = make_buffer(tmp_path, adapter)
+    asyncio.run(run(buffer, []))
+    assert adapter.ids() == [1, 2, 3]
+    assert not buffer.journal_path.exists() and not buffer.replay_path.exists()